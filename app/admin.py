@@ -5,8 +5,74 @@ from django.contrib import admin
 from .models import Citation
 from .models import Submission
 from .models import Changelog
+from .models import StoredCitation
+from .models import ApiQuota
+from .models import CircuitBreaker
+from .models import CaseDailyCount
+from .models import JurisdictionDailyCount
+from .models import CitationJob
+from .models import CitationJobItem
+from .models import PrefetchCheckpoint
 
 admin.site.register(Citation)
 admin.site.register(Submission)
 admin.site.register(Changelog)
+admin.site.register(StoredCitation)
 
+
+@admin.register(ApiQuota)
+class ApiQuotaAdmin(admin.ModelAdmin):
+    list_display = ('name', 'calls_made', 'calls_throttled', 'calls_today',
+                    'day', 'tokens', 'updated')
+    readonly_fields = ('calls_made', 'calls_throttled', 'calls_today', 'day',
+                       'tokens', 'updated')
+
+
+@admin.register(CircuitBreaker)
+class CircuitBreakerAdmin(admin.ModelAdmin):
+    list_display = ('name', 'state', 'failure_count', 'times_opened',
+                    'opened_at', 'last_failure', 'last_error')
+    readonly_fields = ('state', 'failure_count', 'times_opened', 'opened_at',
+                       'last_failure', 'last_error')
+
+
+@admin.register(CaseDailyCount)
+class CaseDailyCountAdmin(admin.ModelAdmin):
+    list_display = ('day', 'canonical_key', 'count')
+    list_filter = ('day',)
+    search_fields = ('canonical_key',)
+    date_hierarchy = 'day'
+    readonly_fields = ('day', 'canonical_key', 'count')
+
+
+@admin.register(JurisdictionDailyCount)
+class JurisdictionDailyCountAdmin(admin.ModelAdmin):
+    list_display = ('day', 'jurisdiction', 'count')
+    list_filter = ('jurisdiction',)
+    date_hierarchy = 'day'
+    readonly_fields = ('day', 'jurisdiction', 'count')
+
+
+@admin.register(CitationJob)
+class CitationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'ip_address', 'created', 'started', 'finished')
+    list_filter = ('status',)
+    date_hierarchy = 'created'
+    readonly_fields = ('started', 'finished')
+
+
+@admin.register(CitationJobItem)
+class CitationJobItemAdmin(admin.ModelAdmin):
+    list_display = ('job', 'position', 'url', 'status', 'attempts', 'error')
+    list_filter = ('status',)
+    search_fields = ('url',)
+    readonly_fields = ('attempts', 'locked_until', 'citation', 'pinpoint_citation',
+                       'error', 'finished')
+
+
+@admin.register(PrefetchCheckpoint)
+class PrefetchCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('database_id', 'language', 'offset', 'cases_listed',
+                    'cases_saved', 'cases_failed', 'updated', 'finished')
+    readonly_fields = ('cases_listed', 'cases_saved', 'cases_failed', 'started',
+                       'updated', 'finished')
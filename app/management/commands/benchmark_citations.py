@@ -0,0 +1,105 @@
+'''
+Offline benchmark for the McGill formatting pipeline (see
+app/scripts/benchmark.py).
+'''
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.scripts.benchmark import (STAGES, compare, environment, load_recorded_cases,
+                                   run_benchmarks, run_import_benchmarks,
+                                   synthetic_cases)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the McGill formatting functions over sample and " \
+        "synthetic caseBrowse payloads, without calling CanLII. Reports " \
+        "throughput, p50/p99 latency and memory allocated per citation, and " \
+        "flags regressions against a saved baseline. With --imports, times " \
+        "module imports instead."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', type=int, default=2000,
+                            help="Number of synthetic cases to add to the corpus")
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Seed for the synthetic cases")
+        parser.add_argument('--repeat', type=int, default=3,
+                            help="Number of timed passes over the corpus")
+        parser.add_argument('--stage', action='append', choices=list(STAGES),
+                            help="Stage to run (repeatable); all by default")
+        parser.add_argument('--baseline', default='benchmark_baseline.json',
+                            help="Baseline file to compare against or save to")
+        parser.add_argument('--save-baseline', action='store_true',
+                            help="Save this run as the baseline")
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help="Relative change that counts as a regression")
+        parser.add_argument('--json', action='store_true',
+                            help="Print the results as JSON")
+        parser.add_argument('--imports', action='store_true',
+                            help="Time module imports and the memory they add, "
+                            "each in a fresh interpreter, instead")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        if options['imports']:
+            return self.handle_imports(options)
+
+        cases = load_recorded_cases() + synthetic_cases(options['synthetic'],
+                                                        options['seed'])
+        results = run_benchmarks(cases, options['repeat'], options['stage'])
+        run = {
+            'environment': environment(),
+            'corpus': {'cases': len(cases), 'seed': options['seed']},
+            'results': results,
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(run, indent=2))
+        else:
+            self.stdout.write(f"{len(cases)} cases, {options['repeat']} passes")
+            self.stdout.write(f"{'stage':<28}{'calls/s':>12}{'p50 us':>10}"
+                              f"{'p99 us':>10}{'bytes':>10}")
+            for stage, metrics in results.items():
+                self.stdout.write(
+                    f"{stage:<28}{metrics['throughput']:>12.0f}"
+                    f"{metrics['p50_us']:>10.1f}{metrics['p99_us']:>10.1f}"
+                    f"{metrics['alloc_bytes']:>10.0f}")
+
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            baseline_path.write_text(json.dumps(run, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline to {baseline_path}"))
+            return
+
+        if not baseline_path.exists():
+            return
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get('corpus') != run['corpus'] or \
+                baseline.get('environment') != run['environment']:
+            self.stderr.write(self.style.WARNING(
+                "The baseline was made with a different corpus or environment"))
+
+        regressions = compare(results, baseline.get('results', {}),
+                              options['threshold'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(self.style.ERROR(regression))
+            raise CommandError(f"{len(regressions)} regressions against {baseline_path}")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {baseline_path}"))
+
+    def handle_imports(self, options):
+        results = run_import_benchmarks(options['repeat'])
+        if options['json']:
+            self.stdout.write(json.dumps(
+                {'environment': environment(), 'imports': results}, indent=2))
+            return
+
+        self.stdout.write(f"{options['repeat']} runs per import")
+        self.stdout.write(f"{'import':<28}{'p50 ms':>10}{'max ms':>10}{'rss KB':>10}")
+        for name, metrics in results.items():
+            self.stdout.write(
+                f"{name:<28}{metrics['p50_ms']:>10.1f}{metrics['max_ms']:>10.1f}"
+                f"{metrics['rss_kb']:>10.0f}")
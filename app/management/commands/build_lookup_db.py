@@ -0,0 +1,50 @@
+'''
+Compiles the McGill tables into the read-only lookup database (see
+app/scripts/lookup_db.py).
+'''
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.scripts.lookup_db import attach_lookup_db, build_lookup_db, check_sources
+
+
+class Command(BaseCommand):
+    help = "Validates the McGill reporter, neutral citation and appendix " \
+        "tables and compiles them into a read-only SQLite lookup database."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None,
+                            help="Where to write the database (MCGILL_LOOKUP_DB "
+                            "by default)")
+        parser.add_argument('--check', action='store_true',
+                            help="Only validate the tables")
+
+    def handle(self, *args, **options):
+        if options['check']:
+            problems = check_sources()
+            if problems:
+                raise CommandError("\n".join(problems))
+            self.stdout.write(self.style.SUCCESS("The McGill tables are valid"))
+            return
+
+        output = options['output'] or settings.MCGILL_LOOKUP_DB
+        if not output:
+            raise CommandError("MCGILL_LOOKUP_DB is not set; pass --output")
+
+        try:
+            counts = build_lookup_db(output)
+        except ValueError as error:
+            raise CommandError(f"The McGill tables are invalid:\n{error}")
+        if output == settings.MCGILL_LOOKUP_DB:
+            # Lookups made in this process (eg when called from the shell)
+            # use the new database too
+            attach_lookup_db()
+
+        size = Path(output).stat().st_size
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {counts['reporters']} reporter keys, "
+            f"{counts['neutral_courts']} neutral courts and "
+            f"{counts['appendix']} appendix rows to {output} ({size // 1024} KB)"))
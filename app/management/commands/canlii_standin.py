@@ -0,0 +1,58 @@
+'''
+Runs a local stand-in for the CanLII API (see app/scripts/canlii_standin.py).
+'''
+from django.core.management.base import BaseCommand, CommandError
+
+from app.scripts.canlii_standin import StandinConfig, make_server
+
+
+class Command(BaseCommand):
+    help = "Serves recorded and generated caseBrowse responses with " \
+        "configurable latency, errors and rate limiting. Set " \
+        "CANLII_API_BASE_URL=http://HOST:PORT/v1 to use it."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--latency', type=float, default=0.1,
+                            help="Mean response time in seconds")
+        parser.add_argument('--jitter', type=float, default=0.05,
+                            help="Maximum deviation from the mean response time")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Fraction of requests answered with a 500")
+        parser.add_argument('--rate-limit', type=float, default=0.0,
+                            help="Requests per second before answering 429 "
+                            "(0 for no limit)")
+        parser.add_argument('--retry-after', type=int, default=1,
+                            help="Retry-After header sent with 429s, in seconds")
+        parser.add_argument('--cases-per-database', type=int, default=100,
+                            help="Number of cases listed in each database")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--verbose', action='store_true',
+                            help="Log every request")
+
+    def handle(self, *args, **options):
+        if not 0 <= options['error_rate'] <= 1:
+            raise CommandError("--error-rate must be between 0 and 1")
+
+        config = StandinConfig(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            rate_limit=options['rate_limit'],
+            retry_after=options['retry_after'],
+            cases_per_database=options['cases_per_database'],
+            seed=options['seed'],
+        )
+        server = make_server(options['host'], options['port'], config,
+                             options['verbose'])
+        self.stdout.write(f"CanLII stand-in listening on "
+                          f"http://{options['host']}:{options['port']}/v1")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served {server.counters}")
@@ -0,0 +1,45 @@
+'''
+Retention policy for raw Submission rows.
+'''
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.scripts.analytics import compact_submissions, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Deletes raw submissions older than SUBMISSION_RETENTION_DAYS. " \
+        "Their daily counts are kept. With --rebuild, the daily counts are " \
+        "first recomputed from the raw submissions that are still stored."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            default=settings.SUBMISSION_RETENTION_DAYS,
+                            help="Number of days of raw submissions to keep")
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Recompute the daily counts before compacting")
+        parser.add_argument('--since',
+                            help="With --rebuild, only recompute from this day "
+                            "(YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1")
+
+        if options['rebuild']:
+            since = None
+            if options['since']:
+                try:
+                    since = date.fromisoformat(options['since'])
+                except ValueError:
+                    raise CommandError(f"Invalid date: {options['since']}")
+            rebuilt = rebuild_rollups(since)
+            self.stdout.write(f"Rebuilt daily counts for {rebuilt} days")
+
+        before = timezone.localdate() - timedelta(days=options['days'])
+        deleted = compact_submissions(before)
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} submissions from before {before}"))
@@ -0,0 +1,39 @@
+'''
+Streaming export of the Citation table (see app/scripts/citation_transfer.py).
+'''
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.scripts.citation_transfer import CHUNK_SIZE, export_citations, open_jsonl
+
+
+class Command(BaseCommand):
+    help = "Writes every stored citation to a JSONL file, gzip-compressed if " \
+        "the file name ends in .gz, or to stdout with -. Load it elsewhere " \
+        "with import_citations."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file, or - for stdout")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help="Number of rows read from the database at a time")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        # Progress goes to stderr when the citations go to stdout
+        log = self.stderr if options['path'] == '-' else self.stdout
+        started = time.monotonic()
+
+        def report(count):
+            elapsed = time.monotonic() - started
+            log.write(f"{count} rows ({count / elapsed:.0f} rows/s)")
+
+        with open_jsonl(options['path'], 'w') as f:
+            count = export_citations(f, options['chunk_size'], report)
+
+        elapsed = time.monotonic() - started
+        log.write(self.style.SUCCESS(
+            f"Exported {count} citations in {elapsed:.1f}s "
+            f"({count / elapsed if elapsed else 0:.0f} rows/s)"))
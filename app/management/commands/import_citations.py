@@ -0,0 +1,50 @@
+'''
+Streaming import of the Citation table (see app/scripts/citation_transfer.py).
+'''
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.scripts.citation_transfer import CHUNK_SIZE, import_citations, open_jsonl
+
+
+class Command(BaseCommand):
+    help = "Loads citations from a JSONL file written by export_citations, " \
+        "gzip-compressed if the file name ends in .gz, or from stdin with -. " \
+        "Citations already stored under the same canonical key are updated, " \
+        "or kept with --skip-existing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or - for stdin")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help="Number of rows inserted at a time")
+        parser.add_argument('--skip-existing', action='store_true',
+                            help="Keep stored citations instead of updating them")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        started = time.monotonic()
+
+        def report(count):
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"{count} rows ({count / elapsed:.0f} rows/s)")
+
+        try:
+            with open_jsonl(options['path'], 'r') as f:
+                imported, skipped, incomplete = import_citations(
+                    f, options['chunk_size'], options['skip_existing'], report)
+        except FileNotFoundError:
+            raise CommandError(f"{options['path']} does not exist")
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        elapsed = time.monotonic() - started
+        if incomplete:
+            self.stderr.write(self.style.WARNING(
+                f"Skipped {incomplete} partial lines for citations that aren't stored"))
+        read = imported + skipped + incomplete
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} citations, skipped {skipped}, in {elapsed:.1f}s "
+            f"({read / elapsed if elapsed else 0:.0f} rows/s)"))
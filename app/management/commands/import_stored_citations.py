@@ -0,0 +1,36 @@
+'''
+One-time importer for the pickled stored_citations.txt file.
+'''
+import pickle
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import StoredCitation
+
+CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Imports the URLs in a pickled stored_citations.txt file into the " \
+        "StoredCitation table. URLs that are already stored are skipped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='stored_citations.txt')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as f:
+                stored_citations = pickle.load(f)
+        except FileNotFoundError:
+            raise CommandError(f"{options['path']} does not exist")
+
+        urls = list(dict.fromkeys(stored_citations))
+        before = StoredCitation.objects.count()
+        for start in range(0, len(urls), CHUNK_SIZE):
+            StoredCitation.objects.bulk_create(
+                [StoredCitation(url=url) for url in urls[start:start + CHUNK_SIZE]],
+                ignore_conflicts=True)
+        imported = StoredCitation.objects.count() - before
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} of {len(urls)} URLs"))
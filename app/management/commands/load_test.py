@@ -0,0 +1,81 @@
+'''
+Load test for a running deployment (see app/scripts/load_test.py).
+'''
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.scripts.load_test import compare_load, run_load
+
+
+class Command(BaseCommand):
+    help = "Sends concurrent citation requests to a running server and " \
+        "reports throughput and latency. Run the server with " \
+        "CANLII_API_BASE_URL pointing at the canlii_standin command to keep " \
+        "CanLII out of the test. With --compare-url, runs the same load " \
+        "against a second server, eg WSGI against ASGI workers."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help="Base URL of the server under test")
+        parser.add_argument('--compare-url', default=None,
+                            help="Base URL of a second server to compare with")
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--cases', type=int, default=200,
+                            help="Number of distinct cases to draw from; fewer "
+                            "cases means more cache hits")
+        parser.add_argument('--mode', choices=['text', 'batch'], default='text')
+        parser.add_argument('--batch-size', type=int, default=10)
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', action='store_true',
+                            help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1 or options['cases'] < 1:
+            raise CommandError("--requests, --concurrency and --cases must be positive")
+
+        if options['compare_url']:
+            return self.handle_compare(options)
+
+        results = run_load(options['url'], options['requests'], options['concurrency'],
+                           options['cases'], options['mode'], options['batch_size'],
+                           options['timeout'], options['seed'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{results['requests']} {results['mode']} requests, "
+            f"{results['concurrency']} clients, {results['duration']:.1f}s")
+        self.stdout.write(f"Throughput: {results['throughput']:.1f} requests/s")
+        self.stdout.write(f"Latency: p50 {results['p50'] * 1000:.0f} ms, "
+                          f"p90 {results['p90'] * 1000:.0f} ms, "
+                          f"p99 {results['p99'] * 1000:.0f} ms")
+        for status, count in sorted(results['statuses'].items()):
+            self.stdout.write(f"  {status}: {count}")
+
+    def handle_compare(self, options):
+        runs = compare_load({options['url']: options['url'],
+                             options['compare_url']: options['compare_url']},
+                            options['requests'], options['concurrency'],
+                            options['cases'], options['mode'],
+                            options['batch_size'], options['timeout'],
+                            options['seed'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(runs, indent=2))
+            return
+        self.stdout.write(f"{options['requests']} {options['mode']} requests, "
+                          f"{options['concurrency']} clients per server")
+        self.stdout.write(f"{'server':<32}{'req/s':>8}{'p50 ms':>9}{'p90 ms':>9}"
+                          f"{'p99 ms':>9}  statuses")
+        for base_url, results in runs.items():
+            statuses = ", ".join(f"{status}: {count}" for status, count
+                                 in sorted(results['statuses'].items()))
+            self.stdout.write(
+                f"{base_url:<32}{results['throughput']:>8.1f}"
+                f"{results['p50'] * 1000:>9.0f}{results['p90'] * 1000:>9.0f}"
+                f"{results['p99'] * 1000:>9.0f}  {statuses}")
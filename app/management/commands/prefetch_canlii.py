@@ -0,0 +1,68 @@
+'''
+Bulk prefetch of CanLII databases (see app/scripts/prefetch.py).
+'''
+from django.core.management.base import BaseCommand, CommandError
+
+from app.scripts.api_calls import get_database_id
+from app.scripts.prefetch import (CHUNK_SIZE, PAGE_SIZE, PrefetchError,
+                                  case_databases, prefetch_database)
+
+
+class Command(BaseCommand):
+    help = "Stores every case in the given CanLII databases (eg skca skpc " \
+        "csc-scc) that isn't stored yet, so that they're served from the " \
+        "database on the first request. An interrupted prefetch resumes " \
+        "where it stopped. Set CANLII_API_BASE_URL to prefetch from another " \
+        "server."
+
+    def add_arguments(self, parser):
+        parser.add_argument('databases', nargs='+',
+                            help="CanLII databaseIDs, or their URL aliases "
+                            "(eg scc)")
+        parser.add_argument('--language', choices=('en', 'fr'), default='en')
+        parser.add_argument('--page-size', type=int, default=PAGE_SIZE,
+                            help="Number of cases listed per API call")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help="Number of rows per INSERT")
+        parser.add_argument('--max-pages', type=int,
+                            help="Stop each database after this many pages")
+        parser.add_argument('--restart', action='store_true',
+                            help="Start from the beginning of each list "
+                            "instead of the last checkpoint")
+
+    def handle(self, *args, **options):
+        if options['page_size'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--page-size and --chunk-size must be at least 1")
+
+        language = options['language']
+        try:
+            jurisdictions = case_databases(language)
+        except PrefetchError as error:
+            raise CommandError(str(error))
+
+        database_ids = [get_database_id(database_id)
+                        for database_id in options['databases']]
+        unknown = [database_id for database_id in database_ids
+                   if database_id not in jurisdictions]
+        if unknown:
+            raise CommandError(f"Unknown databases: {', '.join(unknown)}")
+
+        def report(checkpoint):
+            self.stdout.write(
+                f"{checkpoint.database_id}: {checkpoint.cases_listed} listed, "
+                f"{checkpoint.cases_saved} saved, {checkpoint.cases_failed} failed")
+
+        for database_id in database_ids:
+            try:
+                checkpoint = prefetch_database(
+                    database_id, jurisdictions[database_id], language,
+                    options['page_size'], options['chunk_size'],
+                    options['max_pages'], options['restart'], report)
+            except PrefetchError as error:
+                raise CommandError(str(error))
+
+            if checkpoint.finished is not None:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{database_id}: finished, {checkpoint.cases_saved} cases saved"))
+            else:
+                self.stdout.write(f"{database_id}: stopped at case {checkpoint.offset}")
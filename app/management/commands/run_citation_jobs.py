@@ -0,0 +1,54 @@
+'''
+Worker for background citation jobs (see app/scripts/jobs.py).
+'''
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.scripts.jobs import run_worker
+from app.scripts.submission_log import flush_submissions
+
+
+class Command(BaseCommand):
+    help = "Resolves the items of queued citation jobs. Runs until stopped " \
+        "with SIGTERM or Ctrl-C, finishing the batch in progress first. " \
+        "Several workers can run at once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Stop once no items are ready instead of "
+                            "waiting for more")
+        parser.add_argument('--batch-size', type=int, default=settings.JOB_BATCH_SIZE,
+                            help="Number of items to resolve at a time")
+        parser.add_argument('--poll-interval', type=float,
+                            default=settings.JOB_POLL_INTERVAL,
+                            help="Seconds to wait when no items are ready")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        stop = threading.Event()
+
+        def request_stop(signum, frame):
+            self.stdout.write("Stopping after the current batch")
+            stop.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        def report(counts):
+            self.stdout.write(
+                f"{counts['done']} done, {counts['failed']} failed, "
+                f"{counts['queued']} to retry")
+
+        try:
+            totals = run_worker(options['batch_size'], options['poll_interval'],
+                                options['once'], stop, report)
+        finally:
+            flush_submissions()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Resolved {totals['done']} items, {totals['failed']} failed"))
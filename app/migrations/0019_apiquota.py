@@ -0,0 +1,27 @@
+# Generated by Django 4.1.13 on 2026-10-18 18:56
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_auto_20230205_2117'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiQuota',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('tokens', models.FloatField(default=0)),
+                ('updated', models.DateTimeField(default=django.utils.timezone.now)),
+                ('day', models.DateField(default=django.utils.timezone.localdate)),
+                ('calls_today', models.PositiveIntegerField(default=0)),
+                ('calls_made', models.PositiveBigIntegerField(default=0)),
+                ('calls_throttled', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-18 18:57
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0020_circuitbreaker'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredCitation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(unique=True)),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
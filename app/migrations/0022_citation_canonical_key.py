@@ -0,0 +1,99 @@
+# Generated by Django 4.1.13 on 2026-10-18 18:59
+
+import logging
+
+from django.db import migrations, models
+
+
+logger = logging.getLogger(__name__)
+
+# The parsing below is a copy of api_calls.canonical_key as it stood when
+# this migration was written, so that later changes to the live function
+# can't change which keys the backfill assigns.
+HYPHENATED_DATABASE_IDS = {
+    "cbsc": "cbsc-ccnr", "ccnr": "cbsc-ccnr",
+    "citt": "citt-tcce", "tcce": "citt-tcce",
+    "csc-a": "csc-scc-al", "scc-l": "csc-scc-al",
+    "cci": "cci-tcc", "tcc": "cci-tcc",
+    "csc": "csc-scc", "scc": "csc-scc",
+    "casa": "casa-cala", "cala": "casa-cala",
+    "sst": "sst-tss", "tss": "sst-tss",
+    "cmac": "cmac-cacm", "cacm": "cmac-cacm",
+    "cart": "cart-crac", "crac": "cart-crac",
+    "pcc": "pcc-cvpc", "cvpc": "pcc-cvpc",
+    "sct": "sct-trp", "trp": "sct-trp",
+    "cer": "cer-rec", "rec": "cer-rec",
+    "exchc": "exchc-cech", "cech": "exchc-cech",
+    "nlsc": "nlsctd",
+}
+
+
+def canonical_key(url):
+    '''
+    Returns language/databaseId/caseId for a long CanLII case URL, or None.
+    '''
+    if "canlii.org" not in url:
+        return None
+    url = url.strip().split('?')[0].split('#')[0]
+    components = [component for component in url.split('/') if component]
+    for index, component in enumerate(components):
+        if "canlii.org" in component:
+            components = components[index + 1:index + 7]
+            break
+    if len(components) < 6 or components[3] != "doc":
+        return None
+    language, _, court, _, _, case_id = components
+    if not case_id[:4].isdigit():
+        return None
+    return f"{language}/{HYPHENATED_DATABASE_IDS.get(court, court)}/{case_id}"
+
+
+def set_canonical_keys(apps, schema_editor):
+    '''
+    Fills in canonical_key for existing citations. Where the same case was
+    stored more than once, the oldest row gets the key, blank fields in it are
+    filled in from the later copies and the copies are deleted.
+    '''
+    Citation = apps.get_model('app', 'Citation')
+    fields = [field.name for field in Citation._meta.concrete_fields
+              if field.name not in ('id', 'canonical_key')]
+
+    kept = {}
+    duplicates = []
+    for citation in Citation.objects.order_by('id').iterator():
+        key = canonical_key(citation.url)
+        if key is None:
+            continue
+        if key not in kept:
+            citation.canonical_key = key
+            kept[key] = citation
+            continue
+        original = kept[key]
+        for field in fields:
+            if not getattr(original, field) and getattr(citation, field):
+                setattr(original, field, getattr(citation, field))
+        duplicates.append(citation.id)
+
+    # The copies go first, so that the kept rows can't clash with them
+    Citation.objects.filter(id__in=duplicates).delete()
+    for citation in kept.values():
+        citation.save()
+    if duplicates:
+        logger.warning("Merged and deleted %d duplicate citations: %s",
+                       len(duplicates), duplicates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0021_storedcitation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='citation',
+            name='canonical_key',
+            field=models.CharField(blank=True, max_length=250, null=True, unique=True),
+        ),
+        migrations.RunPython(set_canonical_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:03
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# The parsing below is a copy of api_calls.canonical_key and
+# case_jurisdiction as they stood when this migration was written, so that
+# later changes to the live functions can't change how submissions are counted.
+HYPHENATED_DATABASE_IDS = {
+    "cbsc": "cbsc-ccnr", "ccnr": "cbsc-ccnr",
+    "citt": "citt-tcce", "tcce": "citt-tcce",
+    "csc-a": "csc-scc-al", "scc-l": "csc-scc-al",
+    "cci": "cci-tcc", "tcc": "cci-tcc",
+    "csc": "csc-scc", "scc": "csc-scc",
+    "casa": "casa-cala", "cala": "casa-cala",
+    "sst": "sst-tss", "tss": "sst-tss",
+    "cmac": "cmac-cacm", "cacm": "cmac-cacm",
+    "cart": "cart-crac", "crac": "cart-crac",
+    "pcc": "pcc-cvpc", "cvpc": "pcc-cvpc",
+    "sct": "sct-trp", "trp": "sct-trp",
+    "cer": "cer-rec", "rec": "cer-rec",
+    "exchc": "exchc-cech", "cech": "exchc-cech",
+    "nlsc": "nlsctd",
+}
+
+
+def case_key(url):
+    '''
+    Returns the canonical key (language/databaseId/caseId) and jurisdiction
+    of a long CanLII case URL, or None.
+    '''
+    if "canlii.org" not in url:
+        return None
+    url = url.strip().split('?')[0].split('#')[0]
+    components = [component for component in url.split('/') if component]
+    for index, component in enumerate(components):
+        if "canlii.org" in component:
+            components = components[index + 1:index + 7]
+            break
+    if len(components) < 6 or components[3] != "doc":
+        return None
+    language, jurisdiction, court, _, _, case_id = components
+    if not case_id[:4].isdigit():
+        return None
+    database_id = HYPHENATED_DATABASE_IDS.get(court, court)
+    return f"{language}/{database_id}/{case_id}", jurisdiction
+
+
+def build_rollups(apps, schema_editor):
+    '''
+    Fills the daily counts from the submissions logged so far.
+    '''
+    Submission = apps.get_model('app', 'Submission')
+    CaseDailyCount = apps.get_model('app', 'CaseDailyCount')
+    JurisdictionDailyCount = apps.get_model('app', 'JurisdictionDailyCount')
+
+    case_counts = Counter()
+    jurisdiction_counts = Counter()
+    rows = Submission.objects.values('date', 'url').annotate(count=Count('id'))
+    for row in rows.order_by().iterator():
+        parsed = case_key(row['url'])
+        if parsed is None:
+            continue
+        key, jurisdiction = parsed
+        case_counts[row['date'], key] += row['count']
+        jurisdiction_counts[row['date'], jurisdiction] += row['count']
+
+    CaseDailyCount.objects.bulk_create([
+        CaseDailyCount(day=day, canonical_key=key, count=count)
+        for (day, key), count in case_counts.items()
+    ], batch_size=1000)
+    JurisdictionDailyCount.objects.bulk_create([
+        JurisdictionDailyCount(day=day, jurisdiction=jurisdiction, count=count)
+        for (day, jurisdiction), count in jurisdiction_counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0022_citation_canonical_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseDailyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('canonical_key', models.CharField(max_length=250)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='JurisdictionDailyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('jurisdiction', models.CharField(max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AddConstraint(
+            model_name='jurisdictiondailycount',
+            constraint=models.UniqueConstraint(fields=('day', 'jurisdiction'), name='unique_jurisdiction_day'),
+        ),
+        migrations.AddIndex(
+            model_name='casedailycount',
+            index=models.Index(fields=['canonical_key'], name='app_casedai_canonic_dbd7cd_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='casedailycount',
+            constraint=models.UniqueConstraint(fields=('day', 'canonical_key'), name='unique_case_day'),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
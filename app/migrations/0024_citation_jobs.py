@@ -0,0 +1,55 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0023_submission_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CitationJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done')], default='queued', max_length=10)),
+                ('ip_address', models.CharField(blank=True, max_length=200)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CitationJobItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('url', models.CharField(max_length=500)),
+                ('pinpoint', models.CharField(blank=True, max_length=50)),
+                ('pinpoint_type', models.CharField(default='none', max_length=4)),
+                ('parallel_citations', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('citation', models.TextField(blank=True)),
+                ('pinpoint_citation', models.TextField(blank=True)),
+                ('error', models.CharField(blank=True, max_length=200)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='app.citationjob')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='citationjobitem',
+            index=models.Index(fields=['status', 'available_at'], name='app_citatio_status_ce55ef_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='citationjobitem',
+            constraint=models.UniqueConstraint(fields=('job', 'position'), name='unique_job_position'),
+        ),
+    ]
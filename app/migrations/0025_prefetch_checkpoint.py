@@ -0,0 +1,33 @@
+# Generated by Django 4.1.13 on 2026-10-18 19:36
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0024_citation_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrefetchCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=2)),
+                ('database_id', models.CharField(max_length=200)),
+                ('offset', models.PositiveIntegerField(default=0)),
+                ('cases_listed', models.PositiveIntegerField(default=0)),
+                ('cases_saved', models.PositiveIntegerField(default=0)),
+                ('cases_failed', models.PositiveIntegerField(default=0)),
+                ('started', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='prefetchcheckpoint',
+            constraint=models.UniqueConstraint(fields=('language', 'database_id'), name='unique_prefetch_database'),
+        ),
+    ]
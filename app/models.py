@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.utils import timezone
 
@@ -21,6 +23,9 @@ class Citation(models.Model):
         ('nu', 'Nunavut'),
         )
     url = models.URLField(max_length=200)
+    # language/databaseId/caseId, see api_calls.canonical_key
+    canonical_key = models.CharField(max_length=250, unique=True, null=True,
+                                     blank=True)
     short_url = models.URLField(max_length=200)
     language = models.CharField(max_length=2)
     databaseId = models.CharField(max_length=200)
@@ -48,12 +53,205 @@ class Submission(models.Model):
     to determine which jurisdiction the request is coming from.
     '''
     url = models.URLField(max_length=200)
-    date = models.DateField()
+    date = models.DateField(db_index=True)
     ip_address = models.CharField(max_length=200)
 
     def __str__(self):
         return self.url
 
+class CaseDailyCount(models.Model):
+    '''
+    The number of submissions of a case on a given day, keyed by the case's
+    canonical key. Kept up to date as submissions are written (see
+    analytics.py), so that usage reports don't have to scan Submission.
+    '''
+    day = models.DateField()
+    canonical_key = models.CharField(max_length=250)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'canonical_key'],
+                                    name='unique_case_day'),
+        ]
+        indexes = [
+            models.Index(fields=['canonical_key']),
+        ]
+
+    def __str__(self):
+        return f"{self.canonical_key} ({self.day}): {self.count}"
+
+class JurisdictionDailyCount(models.Model):
+    '''
+    The number of submissions of cases from a jurisdiction on a given day.
+    '''
+    day = models.DateField()
+    jurisdiction = models.CharField(max_length=10)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'jurisdiction'],
+                                    name='unique_jurisdiction_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.jurisdiction} ({self.day}): {self.count}"
+
+class StoredCitation(models.Model):
+    '''
+    A record of every CanLII URL that has been serialized, along with the
+    serialized citation. Replaces the pickled stored_citations.txt file; the
+    unique index on url makes membership checks and inserts atomic and safe
+    to run from several workers at once.
+    '''
+    url = models.URLField(max_length=200, unique=True)
+    data = models.JSONField(null=True, blank=True)
+    created = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.url
+
+class ApiQuota(models.Model):
+    '''
+    A token bucket and daily budget for an external API. Every worker reads
+    and updates the same row, so the rate limit and the daily cap are shared
+    across processes. The counters record how many calls were made, how many
+    had to wait or were turned away, and how many were made today.
+    '''
+    name = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField(default=0)
+    updated = models.DateTimeField(default=timezone.now)
+    day = models.DateField(default=timezone.localdate)
+    calls_today = models.PositiveIntegerField(default=0)
+    calls_made = models.PositiveBigIntegerField(default=0)
+    calls_throttled = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+class CircuitBreaker(models.Model):
+    '''
+    The state of a circuit breaker around an external API. After repeated
+    failures the breaker opens and calls fail fast until the cool-down window
+    has passed. The row is shared by every worker.
+    '''
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    STATE_CHOICES = (
+        (CLOSED, 'Closed'),
+        (OPEN, 'Open'),
+        (HALF_OPEN, 'Half-open'),
+        )
+    name = models.CharField(max_length=50, unique=True)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=CLOSED)
+    failure_count = models.PositiveIntegerField(default=0)
+    opened_at = models.DateTimeField(null=True, blank=True)
+    last_failure = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=200, blank=True)
+    times_opened = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} ({self.state})"
+
+class CitationJob(models.Model):
+    '''
+    A list of cases resolved in the background by the run_citation_jobs
+    command, for bibliographies too long to resolve within a request. Clients
+    poll the job for progress and fetch the results of its items. The id is
+    random, so that a job's results can only be read by whoever submitted it.
+    '''
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    ip_address = models.CharField(max_length=200, blank=True)
+    created = models.DateTimeField(default=timezone.now)
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+class CitationJobItem(models.Model):
+    '''
+    A single case in a CitationJob. Workers claim queued items for a limited
+    time (locked_until), so that the items of a worker that dies are picked
+    up again once the lease runs out. Failed items that may succeed later
+    (eg because CanLII was unavailable) are queued again, up to
+    JOB_MAX_ATTEMPTS times.
+    '''
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+        )
+    job = models.ForeignKey(CitationJob, on_delete=models.CASCADE,
+                            related_name='items')
+    position = models.PositiveIntegerField()
+    url = models.CharField(max_length=500)
+    pinpoint = models.CharField(max_length=50, blank=True)
+    pinpoint_type = models.CharField(max_length=4, default='none')
+    parallel_citations = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    citation = models.TextField(blank=True)
+    pinpoint_citation = models.TextField(blank=True)
+    error = models.CharField(max_length=200, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'position'],
+                                    name='unique_job_position'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.url} ({self.status})"
+
+class PrefetchCheckpoint(models.Model):
+    '''
+    How far the prefetch_canlii command has walked a CanLII database's case
+    list. offset is the first case of the next page to read, so an
+    interrupted prefetch resumes where it stopped; finished is set once the
+    whole list has been read.
+    '''
+    language = models.CharField(max_length=2)
+    database_id = models.CharField(max_length=200)
+    offset = models.PositiveIntegerField(default=0)
+    cases_listed = models.PositiveIntegerField(default=0)
+    cases_saved = models.PositiveIntegerField(default=0)
+    cases_failed = models.PositiveIntegerField(default=0)
+    started = models.DateTimeField(default=timezone.now)
+    updated = models.DateTimeField(auto_now=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['language', 'database_id'],
+                                    name='unique_prefetch_database'),
+        ]
+
+    def __str__(self):
+        return f"{self.language}/{self.database_id} at {self.offset}"
+
 class Changelog(models.Model):
     '''
     A database that tracks the changes made to the app. It stores the date, the
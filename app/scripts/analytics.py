@@ -0,0 +1,149 @@
+'''
+Submission analytics.
+
+Submission holds one row per request, so counting usage from it means scanning
+the whole table. Instead, daily counts per case (by canonical key) and per
+jurisdiction are kept in CaseDailyCount and JurisdictionDailyCount. They are
+incremented in the same transaction that writes each batch of buffered
+submissions (see submission_log.py), and reports read from them alone. Raw
+submissions older than SUBMISSION_RETENTION_DAYS can then be deleted without
+losing the counts (see the compact_submissions command).
+'''
+from collections import Counter
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from ..models import CaseDailyCount, Citation, JurisdictionDailyCount, Submission
+from .api_calls import canonical_key, case_jurisdiction
+
+
+def count_submissions(submissions) -> tuple[Counter, Counter]:
+    '''
+    Counts submissions by (day, canonical key) and by (day, jurisdiction).
+    Takes an iterable of (date, url, count) tuples. Invalid URLs are skipped.
+    '''
+    case_counts = Counter()
+    jurisdiction_counts = Counter()
+    for day, url, count in submissions:
+        key = canonical_key(url)
+        if key is None:
+            continue
+        case_counts[day, key] += count
+        jurisdiction_counts[day, case_jurisdiction(url)] += count
+    return case_counts, jurisdiction_counts
+
+
+def _increment(model, field: str, counts: Counter) -> None:
+    '''
+    Adds counts to a daily count table, creating the rows that don't exist
+    yet. Safe to run from several workers at once.
+    '''
+    for (day, value), count in counts.items():
+        rows = model.objects.filter(day=day, **{field: value})
+        if rows.update(count=F("count") + count):
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(day=day, count=count, **{field: value})
+        except IntegrityError:
+            # Another worker created the row first
+            rows.update(count=F("count") + count)
+
+
+def record_submissions(submissions: list[Submission]) -> None:
+    '''
+    Adds a batch of submissions to the daily counts.
+    '''
+    case_counts, jurisdiction_counts = count_submissions(
+        (submission.date, submission.url, 1) for submission in submissions)
+    _increment(CaseDailyCount, "canonical_key", case_counts)
+    _increment(JurisdictionDailyCount, "jurisdiction", jurisdiction_counts)
+
+
+def rebuild_rollups(since: date | None = None) -> int:
+    '''
+    Recomputes the daily counts from the raw submissions that are still
+    stored, from since onwards (all of them by default). Days whose raw
+    submissions have already been compacted are left alone. Returns the
+    number of days rebuilt.
+    '''
+    submissions = Submission.objects.all()
+    if since is not None:
+        submissions = submissions.filter(date__gte=since)
+
+    with transaction.atomic():
+        days = list(submissions.order_by().values_list("date", flat=True).distinct())
+        rows = submissions.order_by().values("date", "url").annotate(count=Count("id"))
+        case_counts, jurisdiction_counts = count_submissions(
+            (row["date"], row["url"], row["count"]) for row in rows.iterator())
+
+        CaseDailyCount.objects.filter(day__in=days).delete()
+        JurisdictionDailyCount.objects.filter(day__in=days).delete()
+        CaseDailyCount.objects.bulk_create([
+            CaseDailyCount(day=day, canonical_key=key, count=count)
+            for (day, key), count in case_counts.items()
+        ], batch_size=1000)
+        JurisdictionDailyCount.objects.bulk_create([
+            JurisdictionDailyCount(day=day, jurisdiction=jurisdiction, count=count)
+            for (day, jurisdiction), count in jurisdiction_counts.items()
+        ], batch_size=1000)
+    return len(days)
+
+
+def compact_submissions(before: date, chunk_size: int = 1000) -> int:
+    '''
+    Deletes raw submissions from before the given day, in chunks so that no
+    single delete holds locks for long. Their counts are kept in the daily
+    count tables. Returns the number of submissions deleted.
+    '''
+    deleted = 0
+    while True:
+        ids = list(Submission.objects.filter(date__lt=before)
+                   .values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += Submission.objects.filter(id__in=ids).delete()[0]
+
+
+def _since(days: int) -> date:
+    return timezone.localdate() - timedelta(days=days - 1)
+
+
+def top_cases(days: int = 30, limit: int = 10) -> list[dict]:
+    '''
+    Returns the most submitted cases over the last number of days, with their
+    McGill citations where the case is stored.
+    '''
+    rows = list(CaseDailyCount.objects.filter(day__gte=_since(days))
+                .values("canonical_key").annotate(total=Sum("count"))
+                .order_by("-total", "canonical_key")[:limit])
+    citations = dict(Citation.objects
+                     .filter(canonical_key__in=[row["canonical_key"] for row in rows])
+                     .values_list("canonical_key", "mcgill_citation"))
+    return [{
+        "canonical_key": row["canonical_key"],
+        "citation": citations.get(row["canonical_key"]),
+        "count": row["total"],
+    } for row in rows]
+
+
+def jurisdiction_totals(days: int = 30) -> dict[str, int]:
+    '''
+    Returns the number of submissions per jurisdiction over the last number of
+    days, most submitted first.
+    '''
+    rows = JurisdictionDailyCount.objects.filter(day__gte=_since(days))\
+        .values("jurisdiction").annotate(total=Sum("count")).order_by("-total")
+    return {row["jurisdiction"]: row["total"] for row in rows}
+
+
+def daily_totals(days: int = 30) -> dict[str, int]:
+    '''
+    Returns the number of submissions per day over the last number of days.
+    '''
+    rows = JurisdictionDailyCount.objects.filter(day__gte=_since(days))\
+        .values("day").annotate(total=Sum("count")).order_by("day")
+    return {row["day"].isoformat(): row["total"] for row in rows}
@@ -2,14 +2,15 @@
 CanLII API calls
 '''
 # import datetime
-import requests
 from decouple import config
+from django.conf import settings
 
 # Short CanLII URLs use the .ca domain, while full CanLII URLs use the .org
 # domain
 CANLII_SHORT = "canlii.ca"
 CANLII_LONG = "canlii.org"
-REQ_CANLII_URL_COMPONENTS = 8
+# Language, jurisdiction, court, "doc", year and caseID
+REQ_CANLII_URL_COMPONENTS = 6
 
 def get_database_id(database_id: str) -> str:
     '''
@@ -58,6 +59,26 @@ def get_api_key() -> str:
     '''
     return config('CANLII_API_KEY')
 
+def split_url(url: str) -> list[str] | None:
+    '''
+    Splits a long CanLII URL into the path components that follow the domain:
+    language, jurisdiction, court, "doc", year and caseID. Query terms,
+    fragments (eg "#par12"), the document's file name and empty components
+    left by doubled or trailing slashes are ignored. Returns None if the URL
+    doesn't have the components of a case URL.
+    '''
+    url = url.strip().split('?')[0].split('#')[0]
+    components = [component for component in url.split('/') if component]
+    domains = [index for index, component in enumerate(components)
+               if CANLII_LONG in component]
+    if not domains:
+        return None
+    components = components[domains[0] + 1:][:REQ_CANLII_URL_COMPONENTS]
+
+    if len(components) < REQ_CANLII_URL_COMPONENTS or components[3] != "doc":
+        return None
+    return components
+
 def case_info(url: str) -> str:
     '''
     Verifies that the URL is a valid CanLII URL. Because CanLII throws a
@@ -75,18 +96,11 @@ def case_info(url: str) -> str:
         print("Invalid URL.")
         return None
 
-    # Removes query terms from the URL, if any
-    if "?" in url:
-        url = url.split('?')[0]
-    if "/" not in url:
-        return None
-    url = url.split('/')
-
-    if len(url) < REQ_CANLII_URL_COMPONENTS:
+    url = split_url(url)
+    if url is None:
         return None
-    case_id: str = url[-2]
-    database_id: str = get_database_id(url[-5])
-    language: str = url[-7]
+    language, _, court, _, _, case_id = url
+    database_id: str = get_database_id(court)
 
     # Rudimentary error checking
     # Verifies whether case_id begins with four digits
@@ -100,20 +114,72 @@ def case_info(url: str) -> str:
         print("Invalid URL")
         return None
 
-def call_api_jurisprudence(url: str) -> str:
+def canonical_key(url: str) -> str:
     '''
-    Calls the CanLII API and returns the JSON file.
+    Returns the canonical key for a CanLII URL, built from the language,
+    databaseID and caseID that case_info parses. The same case submitted with
+    or without the scheme, the subdomain, a query string or a paragraph anchor
+    gets the same key. Returns None if the URL isn't a valid CanLII URL.
     '''
-    api_key: str = get_api_key()
     api_elements = case_info(url)
     if api_elements is None:
         return None
     language, database_id, case_id = api_elements
+    return f"{language}/{database_id}/{case_id}"
+
+def case_jurisdiction(url: str) -> str:
+    '''
+    Returns the jurisdiction component of a CanLII case URL (eg "on"), or None
+    if the URL isn't a valid CanLII URL.
+    '''
+    if case_info(url) is None:
+        return None
+    return split_url(url)[1]
+
+def case_browse_url(language: str, database_id: str, case_id: str) -> str:
+    '''
+    Builds the CanLII API caseBrowse URL for a single case. The API's base
+    URL is settings.CANLII_API_BASE_URL.
+    '''
+    api_key: str = get_api_key()
+    base_url: str = settings.CANLII_API_BASE_URL.rstrip("/")
 
     # CanLII API URL call structure
-    url: str = f"https://api.canlii.org/v1/caseBrowse/{language}/"\
+    return f"{base_url}/caseBrowse/{language}/"\
         f"{database_id}/{case_id}/?api_key={api_key}"
-    response = requests.get(url, timeout=50)
-    # Converts the JSON file to a Python dictionary
-    data = response.json()
-    return data
+
+def case_databases_url(language: str) -> str:
+    '''
+    Builds the CanLII API caseBrowse URL listing the case databases.
+    '''
+    base_url: str = settings.CANLII_API_BASE_URL.rstrip("/")
+    return f"{base_url}/caseBrowse/{language}/?api_key={get_api_key()}"
+
+def case_list_url(language: str, database_id: str, offset: int,
+                  result_count: int) -> str:
+    '''
+    Builds the CanLII API caseBrowse URL for a page of a database's cases.
+    '''
+    base_url: str = settings.CANLII_API_BASE_URL.rstrip("/")
+    return f"{base_url}/caseBrowse/{language}/{database_id}/"\
+        f"?offset={offset}&resultCount={result_count}&api_key={get_api_key()}"
+
+def case_url(language: str, jurisdiction: str, database_id: str,
+             case_id: str) -> str:
+    '''
+    Builds a long CanLII URL for a case listed by the API, for cases that
+    weren't submitted by a user. The court component is the databaseID, so
+    the URL's canonical key is always language/databaseId/caseId.
+    '''
+    return f"https://www.canlii.org/{language}/{jurisdiction}/{database_id}/"\
+        f"doc/{case_id[:4]}/{case_id}/{case_id}.html"
+
+def call_api_jurisprudence(url: str) -> str:
+    '''
+    Calls the CanLII API and returns the JSON file as a dictionary, or None if
+    the case couldn't be retrieved. See fetcher.py for the pooled session and
+    for fetching several cases at once.
+    '''
+    from .fetcher import fetch_case
+
+    return fetch_case(url).data
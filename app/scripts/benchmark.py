@@ -0,0 +1,313 @@
+'''
+Offline benchmarks for the McGill formatting pipeline.
+
+Times process_parallel_citations, sort_citations, verify_year, verify_court
+and generate_citation over a corpus of caseBrowse payloads: the sample
+payloads in data/benchmark/cases.json plus synthetic cases generated from the
+reporter and neutral citation tables. Nothing is fetched from CanLII. For
+each stage, the benchmark reports throughput, p50 and p99 latency and the peak
+memory allocated per citation, and can compare a run against a saved baseline.
+
+It can also time how long the app's modules take to import, and how much
+memory they add, each in a fresh interpreter, as a proxy for worker boot time
+and per-worker memory. See the benchmark_citations command.
+'''
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import NamedTuple
+
+from .mcgill_jurisprudence_rules import (generate_citation, process_parallel_citations,
+                                         sort_citations, verify_court, verify_year)
+from .reporter_index import JURISDICTIONS, NEUTRAL_COURTS, REPORTER_INDEX
+
+RECORDED_CASES = Path(__file__).resolve().parent / "data" / "benchmark" / "cases.json"
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Statements timed by the import benchmark, each in a fresh interpreter
+IMPORTS = {
+    "appendices": "import app.scripts.data.mcgill.appendices",
+    "appendix_tables": "from app.scripts.data.mcgill import appendices\n"
+                       "for name in appendices.__all__: getattr(appendices, name)",
+    "reporter_index": "import app.scripts.reporter_index",
+    "numpy": "import numpy",
+    "worker": "import django\ndjango.setup()\nimport citator.urls",
+}
+
+# Runs a statement and reports its duration and the growth in resident memory.
+# Resident memory is read from /proc on Linux; elsewhere, the growth in peak
+# RSS is used instead.
+IMPORT_SCRIPT = """
+import json, os, resource, time
+
+def rss_kb():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+
+before = rss_kb()
+started = time.perf_counter()
+exec(compile(%r, "<import>", "exec"))
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "rss_kb": rss_kb() - before,
+}))
+"""
+
+# Metrics compared against a baseline, and whether a higher value is better
+COMPARED_METRICS = {
+    "throughput": True,
+    "p50_us": False,
+    "p99_us": False,
+    "alloc_bytes": False,
+}
+
+
+class BenchmarkCase(NamedTuple):
+    citation_data: dict
+    parallel_citations: str
+    pinpoint_result: str
+    sorted_citations: dict
+
+
+def make_case(citation_data: dict, parallel_citations: str, pinpoint: str) -> BenchmarkCase:
+    pinpoint_result = f" at para {pinpoint}" if pinpoint else ""
+    return BenchmarkCase(citation_data, parallel_citations, pinpoint_result,
+                         sort_citations(citation_data, parallel_citations))
+
+
+def load_recorded_cases(path: Path = RECORDED_CASES) -> list[BenchmarkCase]:
+    '''
+    Loads the sample caseBrowse payloads, along with the parallel citations
+    and pinpoint to format each one with.
+    '''
+    with open(path, encoding="utf-8") as f:
+        cases = json.load(f)
+    return [make_case(case["payload"], case["parallel_citations"], case["pinpoint"])
+            for case in cases]
+
+
+def synthetic_cases(count: int, seed: int = 0) -> list[BenchmarkCase]:
+    '''
+    Generates caseBrowse-shaped payloads with a mix of neutral citations,
+    CanLII citations for cases that predate neutral citations, and Supreme
+    Court Reports citations, each with up to four parallel citations. The same
+    seed always gives the same corpus.
+    '''
+    rng = random.Random(seed)
+    courts = sorted(NEUTRAL_COURTS)
+    # Neutral citations are only generated for years in which the court
+    # issued them
+    court_years = {
+        code: (min(court.start[0] for court in entries),
+               max(court.end[0] if court.end else 2023 for court in entries))
+        for code, entries in NEUTRAL_COURTS.items()
+    }
+    jurisdictions = sorted(JURISDICTIONS)
+    reporters = sorted({entry.abbreviation for entry in REPORTER_INDEX.values()})
+    parties = ("Smith", "Tremblay", "Canada (Attorney General)", "Ontario",
+               "Roy", "Nguyen", "Québec (Procureur général)", "Singh")
+
+    cases = []
+    for number in range(count):
+        year = rng.randint(1975, 2023)
+        language = rng.choice(("en", "en", "en", "fr"))
+        kind = rng.random()
+        if kind < 0.15:
+            year = max(year, court_years["SCC"][0])
+            citation = f"{year} SCC {rng.randint(1, 80)} (CanLII), " \
+                f"[{year}] {rng.randint(1, 4)} SCR {rng.randint(1, 999)}"
+        elif kind < 0.6:
+            court = rng.choice(courts)
+            first_year, last_year = court_years[court]
+            year = min(max(year, first_year), last_year)
+            citation = f"{year} {court} {rng.randint(1, 3000)} (CanLII)"
+        else:
+            citation = f"{year} CanLII {rng.randint(1, 99999)} " \
+                f"({rng.choice(jurisdictions)} {rng.choice(('CA', 'SC', 'QB', 'PC'))})"
+
+        parallels = []
+        for _ in range(rng.randint(0, 4)):
+            style = rng.random()
+            if style < 0.1:
+                parallels.append(f"[{year}] {rng.choice(('OJ', 'BCJ', 'AJ'))} "
+                                 f"No {rng.randint(1, 5000)} (QL)")
+            elif style < 0.2:
+                parallels.append(f"{year} Carswell{rng.choice(('Ont', 'BC', 'Que'))} "
+                                 f"{rng.randint(1, 9999)}")
+            elif style < 0.5:
+                parallels.append(f"[{year}] {rng.randint(1, 12)} "
+                                 f"{rng.choice(reporters)} {rng.randint(1, 999)}")
+            else:
+                parallels.append(f"{rng.randint(1, 500)} {rng.choice(reporters)} "
+                                 f"{rng.randint(1, 999)}")
+
+        citation_data = {
+            "databaseId": "bench",
+            "caseId": {language: f"{year}bench{number}"},
+            "url": f"https://canlii.ca/t/bench{number}",
+            "title": f"{rng.choice(parties)} v. {rng.choice(parties)}",
+            "citation": citation,
+            "language": language,
+            "docketNumber": str(number),
+            "decisionDate": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "keywords": "",
+        }
+        pinpoint = str(rng.randint(1, 200)) if rng.random() < 0.7 else ""
+        cases.append(make_case(citation_data, " — ".join(parallels), pinpoint))
+    return cases
+
+
+def format_case(case: BenchmarkCase):
+    '''
+    The whole pipeline for a single case, as the views run it.
+    '''
+    sorted_citations = sort_citations(case.citation_data, case.parallel_citations)
+    return generate_citation(case.citation_data, sorted_citations, case.pinpoint_result)
+
+
+STAGES = {
+    "process_parallel_citations":
+        lambda case: process_parallel_citations(case.parallel_citations),
+    "sort_citations":
+        lambda case: sort_citations(case.citation_data, case.parallel_citations),
+    # The rules are given the CanLII citation as sort_citations parsed it
+    "verify_year":
+        lambda case: verify_year(case.sorted_citations["unofficial"][0],
+                                 case.citation_data),
+    "verify_court":
+        lambda case: verify_court(case.sorted_citations["unofficial"][0],
+                                  case.citation_data),
+    "generate_citation":
+        lambda case: generate_citation(case.citation_data, case.sorted_citations,
+                                       case.pinpoint_result),
+    "pipeline": format_case,
+}
+
+
+def percentile(sorted_values: list, fraction: float):
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def measure(function, cases: list[BenchmarkCase], repeat: int = 3) -> dict:
+    '''
+    Runs function over every case repeat times. Latencies are timed per call
+    with the garbage collector disabled; allocations are measured in a
+    separate pass with tracemalloc, so that tracing doesn't skew the timings.
+    '''
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for case in cases:
+                call_started = time.perf_counter_ns()
+                function(case)
+                timings.append(time.perf_counter_ns() - call_started)
+        elapsed = time.perf_counter() - started
+    finally:
+        gc.enable()
+
+    allocated = 0
+    tracemalloc.start()
+    try:
+        for case in cases:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            function(case)
+            allocated += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "calls": len(timings),
+        "throughput": len(timings) / elapsed if elapsed else 0,
+        "p50_us": percentile(timings, 0.5) / 1000,
+        "p99_us": percentile(timings, 0.99) / 1000,
+        "alloc_bytes": allocated / len(cases),
+    }
+
+
+def run_benchmarks(cases: list[BenchmarkCase], repeat: int = 3,
+                   stages: list[str] | None = None) -> dict:
+    '''
+    Measures each stage (all of them by default) over the corpus.
+    '''
+    return {name: measure(STAGES[name], cases, repeat)
+            for name in stages or STAGES}
+
+
+def measure_import(statement: str, repeat: int = 3) -> dict:
+    '''
+    Runs an import statement repeat times, each in a new interpreter started
+    from the project root, and reports the median duration and memory growth.
+    '''
+    env = dict(os.environ)
+    env.setdefault("DJANGO_SETTINGS_MODULE", "citator.settings")
+    samples = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT % statement], cwd=PROJECT_ROOT,
+            env=env, capture_output=True, text=True, check=True)
+        samples.append(json.loads(completed.stdout.splitlines()[-1]))
+
+    seconds = sorted(sample["seconds"] for sample in samples)
+    rss = sorted(sample["rss_kb"] for sample in samples)
+    return {
+        "runs": repeat,
+        "p50_ms": percentile(seconds, 0.5) * 1000,
+        "max_ms": seconds[-1] * 1000,
+        "rss_kb": percentile(rss, 0.5),
+    }
+
+
+def run_import_benchmarks(repeat: int = 3, names: list[str] | None = None) -> dict:
+    '''
+    Measures each import statement (all of them by default).
+    '''
+    return {name: measure_import(IMPORTS[name], repeat)
+            for name in names or IMPORTS}
+
+
+def environment() -> dict:
+    '''
+    Describes the machine a run was made on, stored with baselines.
+    '''
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    '''
+    Compares a run with a baseline run and describes every metric that got
+    worse by more than threshold (eg 0.25 for 25%).
+    '''
+    regressions = []
+    for stage, metrics in results.items():
+        base = baseline.get(stage)
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = base.get(metric), metrics[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(
+                    f"{stage} {metric}: {old:.2f} -> {new:.2f} ({change:+.0%})")
+    return regressions
@@ -0,0 +1,154 @@
+'''
+Downloadable bibliographies.
+
+Every case a visitor cites through process_text or the batch form is
+remembered in their session (remember_citations). export_bibliography streams
+the McGill citations of those cases, or of any list of stored cases, as CSV,
+RTF or plain text. Rows come from a single queryset read in chunks and are
+written out as they're formatted, so a large bibliography starts downloading
+at once and its size doesn't affect the worker's memory.
+
+Under ASGI, aexport_bibliography streams the same lines, reading them a chunk
+at a time in a thread so that the ORM doesn't run on the event loop.
+
+Only stored cases are exported; nothing is fetched from CanLII. Entries are
+sorted by style of cause, as in a McGill bibliography, and carry neither
+pinpoints nor the parallel citations a visitor pasted.
+'''
+import csv
+import re
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.html import strip_tags
+
+from ..models import Citation
+from .formatted_cache import format_citation
+from .mcgill_jurisprudence_rules import CITATION_FIELDS
+
+HISTORY_SESSION_KEY = "citation_history"
+
+# Rows read from the database at a time
+CHUNK_SIZE = 200
+
+# Cases a single bibliography may list. Only stored cases are read, so this
+# can be far larger than a batch.
+MAX_CASES = 500
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "rtf": ("application/rtf", "rtf"),
+    "txt": ("text/plain; charset=utf-8", "txt"),
+}
+
+CSV_HEADER = ("citation", "title", "decision_date", "url")
+
+RTF_HEADER = "{\\rtf1\\ansi\\deff0{\\fonttbl{\\f0 Times New Roman;}}\\f0\\fs24\n"
+# McGill bibliographies use a hanging indent
+RTF_PARAGRAPH = "{\\pard\\fi-720\\li720\\sa240 %s\\par}\n"
+RTF_FOOTER = "}\n"
+
+EMPHASIS = re.compile(r"(</?em>)")
+
+
+def remember_citations(session, keys: list[str]) -> None:
+    '''
+    Adds cases to a session's history, by canonical key. A case cited again
+    moves to the end, and only the last BIBLIOGRAPHY_HISTORY_SIZE cases are
+    kept.
+    '''
+    history = [key for key in session.get(HISTORY_SESSION_KEY, []) if key not in keys]
+    history.extend(dict.fromkeys(key for key in keys if key))
+    session[HISTORY_SESSION_KEY] = history[-settings.BIBLIOGRAPHY_HISTORY_SIZE:]
+
+
+def citation_history(session) -> list[str]:
+    return session.get(HISTORY_SESSION_KEY, [])
+
+
+def bibliography_rows(keys: list[str]):
+    '''
+    Yields (citation, row) for every stored case among keys, sorted by style
+    of cause. The citation is HTML, with the style of cause in <em>.
+    '''
+    rows = Citation.objects.filter(canonical_key__in=keys).order_by("title", "pk")\
+        .values("canonical_key", "url", *CITATION_FIELDS)
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        (citation, _), _ = format_citation(row, "", "")
+        yield citation, row
+
+
+def rtf_text(html: str) -> str:
+    '''
+    Converts a citation to RTF, keeping its italics. Characters outside ASCII
+    are written as RTF Unicode escapes.
+    '''
+    parts = []
+    for part in EMPHASIS.split(html):
+        if part == "<em>":
+            parts.append("{\\i ")
+        elif part == "</em>":
+            parts.append("}")
+        else:
+            part = part.replace("\\", "\\\\").replace("{", "\\{").replace("}", "\\}")
+            for character in part:
+                if ord(character) < 128:
+                    parts.append(character)
+                else:
+                    # \u takes signed 16-bit values, so characters outside
+                    # the BMP are written as surrogate pairs
+                    encoded = character.encode("utf-16-le")
+                    for index in range(0, len(encoded), 2):
+                        unit = int.from_bytes(encoded[index:index + 2], "little", signed=True)
+                        parts.append(f"\\u{unit}?")
+    return "".join(parts)
+
+
+class Echo:
+    '''
+    A file-like object that returns what is written to it, so that csv.writer
+    can produce rows one at a time.
+    '''
+
+    def write(self, value):
+        return value
+
+
+def export_bibliography(keys: list[str], file_format: str):
+    '''
+    Yields a bibliography of the given cases in file_format (see FORMATS),
+    a line at a time.
+    '''
+    rows = bibliography_rows(keys)
+
+    if file_format == "csv":
+        writer = csv.writer(Echo())
+        yield writer.writerow(CSV_HEADER)
+        for citation, row in rows:
+            yield writer.writerow((strip_tags(citation), row["title"],
+                                   row["decisionDate"], row["url"]))
+    elif file_format == "rtf":
+        yield RTF_HEADER
+        for citation, row in rows:
+            yield RTF_PARAGRAPH % rtf_text(citation)
+        yield RTF_FOOTER
+    else:
+        for citation, row in rows:
+            yield strip_tags(citation) + "\n"
+
+
+async def aexport_bibliography(keys: list[str], file_format: str):
+    '''
+    Async version of export_bibliography. The lines are read CHUNK_SIZE at a
+    time with sync_to_async, always in the same thread, since the rows come
+    from a single database cursor.
+    '''
+    lines = export_bibliography(keys, file_format)
+    read_chunk = sync_to_async(lambda: list(islice(lines, CHUNK_SIZE)), thread_sensitive=True)
+    try:
+        while chunk := await read_chunk():
+            for line in chunk:
+                yield line
+    finally:
+        await sync_to_async(lines.close, thread_sensitive=True)()
@@ -1,13 +1,231 @@
-import os
-import pickle
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
 from django.core.cache import cache
 
+from ..models import StoredCitation
+from .metrics import cache_summary, count_cache_lookup
+
 '''
 These functions check to see if a citation has already been accessed and
 serialized. If so, the citation is retrieved from the cache. If not, a function
 calls the CanLII API and serializes the citation.
+
+Serialized citations are kept in the StoredCitation table, which has a unique
+index on the URL. Use the import_stored_citations management command to bring
+over URLs from the old pickled stored_citations.txt file.
+
+Citation data read from the database is cached in two tiers: a small LRU cache
+inside each worker, in front of the shared cache configured in settings.CACHES.
+A hit in the local tier costs no I/O at all; a hit in the shared tier saves a
+database query and warms the local tier.
 '''
 
+class LocalLRUCache:
+    '''
+    A thread-safe, size-capped LRU cache with a per-entry time to live. Once
+    the cache is full, the least recently used entry is evicted.
+    '''
+
+    def __init__(self, max_size: int, timeout: float):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+local_cache = LocalLRUCache(settings.CITATION_CACHE_LOCAL_SIZE,
+                            settings.CITATION_CACHE_LOCAL_TIMEOUT)
+
+TIERS = ('local', 'shared')
+
+
+def citation_cache_key(key: str) -> str:
+    '''
+    Builds the cache key for a case from its canonical key (see
+    api_calls.canonical_key). Canonical keys are hashed so that keys are a fixed
+    length and safe for every cache backend. The version is handled by
+    Django's cache versioning for the shared tier and added to the key for the
+    local tier.
+    '''
+    return "citation:" + hashlib.sha1(key.encode()).hexdigest()
+
+
+def get_cached_citation(canonical_key: str) -> dict | None:
+    '''
+    Returns the cached citation data for a case, or None on a miss in both
+    tiers.
+    '''
+    key = citation_cache_key(canonical_key)
+    version = settings.CITATION_CACHE_VERSION
+
+    citation_data = local_cache.get((version, key))
+    count_cache_lookup('local', citation_data is not None)
+    if citation_data is not None:
+        return citation_data
+
+    citation_data = cache.get(key, version=version)
+    count_cache_lookup('shared', citation_data is not None)
+    if citation_data is not None:
+        local_cache.set((version, key), citation_data)
+    return citation_data
+
+
+async def aget_cached_citation(canonical_key: str) -> dict | None:
+    '''
+    Async version of get_cached_citation. A hit in the local tier is served
+    without leaving the event loop.
+    '''
+    key = citation_cache_key(canonical_key)
+    version = settings.CITATION_CACHE_VERSION
+
+    citation_data = local_cache.get((version, key))
+    count_cache_lookup('local', citation_data is not None)
+    if citation_data is not None:
+        return citation_data
+
+    citation_data = await cache.aget(key, version=version)
+    count_cache_lookup('shared', citation_data is not None)
+    if citation_data is not None:
+        local_cache.set((version, key), citation_data)
+    return citation_data
+
+
+def get_cached_citations(canonical_keys: list[str]) -> dict:
+    '''
+    Batch version of get_cached_citation. Local misses are looked up in the
+    shared cache with a single get_many call. Returns a dictionary of the
+    canonical keys that were found.
+    '''
+    version = settings.CITATION_CACHE_VERSION
+    found = {}
+    shared_keys = {}
+    for canonical_key in canonical_keys:
+        key = citation_cache_key(canonical_key)
+        citation_data = local_cache.get((version, key))
+        if citation_data is not None:
+            found[canonical_key] = citation_data
+        else:
+            shared_keys[key] = canonical_key
+    count_cache_lookup('local', True, len(found))
+    count_cache_lookup('local', False, len(shared_keys))
+
+    if shared_keys:
+        shared = cache.get_many(list(shared_keys), version=version)
+        count_cache_lookup('shared', True, len(shared))
+        count_cache_lookup('shared', False, len(shared_keys) - len(shared))
+        for key, citation_data in shared.items():
+            local_cache.set((version, key), citation_data)
+            found[shared_keys[key]] = citation_data
+    return found
+
+
+def set_cached_citation(canonical_key: str, citation_data: dict) -> None:
+    '''
+    Stores citation data in both tiers.
+    '''
+    key = citation_cache_key(canonical_key)
+    version = settings.CITATION_CACHE_VERSION
+    local_cache.set((version, key), citation_data)
+    cache.set(key, citation_data, timeout=settings.CITATION_CACHE_TIMEOUT,
+              version=version)
+
+
+async def aset_cached_citation(canonical_key: str, citation_data: dict) -> None:
+    '''
+    Async version of set_cached_citation.
+    '''
+    key = citation_cache_key(canonical_key)
+    version = settings.CITATION_CACHE_VERSION
+    local_cache.set((version, key), citation_data)
+    await cache.aset(key, citation_data, timeout=settings.CITATION_CACHE_TIMEOUT,
+                     version=version)
+
+
+def set_cached_citations(citations: dict) -> None:
+    '''
+    Stores citation data for several cases, keyed by canonical key, with a
+    single set_many call.
+    '''
+    version = settings.CITATION_CACHE_VERSION
+    shared = {}
+    for canonical_key, citation_data in citations.items():
+        key = citation_cache_key(canonical_key)
+        local_cache.set((version, key), citation_data)
+        shared[key] = citation_data
+    if shared:
+        cache.set_many(shared, timeout=settings.CITATION_CACHE_TIMEOUT,
+                       version=version)
+
+
+def delete_cached_citation(canonical_key: str) -> None:
+    '''
+    Removes a case from both tiers. Other workers' local tiers expire on their
+    own after CITATION_CACHE_LOCAL_TIMEOUT seconds.
+    '''
+    key = citation_cache_key(canonical_key)
+    version = settings.CITATION_CACHE_VERSION
+    local_cache.delete((version, key))
+    cache.delete(key, version=version)
+
+
+def delete_cached_citations(canonical_keys) -> None:
+    '''
+    Removes several cases from both tiers, with a single delete_many call.
+    '''
+    version = settings.CITATION_CACHE_VERSION
+    keys = [citation_cache_key(canonical_key) for canonical_key in canonical_keys]
+    for key in keys:
+        local_cache.delete((version, key))
+    if keys:
+        cache.delete_many(keys, version=version)
+
+
+def cache_stats() -> dict:
+    '''
+    Returns the hit and miss counts and the hit ratio of each tier, as
+    counted by the citator_cache_lookups metric (see metrics.cache_summary),
+    and the size of this worker's local tier.
+    '''
+    stats = {tier: {'hits': 0, 'misses': 0, 'hit_ratio': None} for tier in TIERS}
+    stats.update(cache_summary())
+    stats['local']['size'] = len(local_cache)
+    return stats
+
+
 def check_cache(url) -> bool:
 
     if cache.get(url):
@@ -16,14 +234,8 @@ def check_cache(url) -> bool:
         return False
 
 def check_stored_citations(url) -> bool:
-    
-        with open('stored_citations.txt', 'rb') as f:
-            stored_citations = pickle.load(f)
-    
-        if url in stored_citations:
-            return True
-        else:
-            return False
+
+    return StoredCitation.objects.filter(url=url).exists()
 
 def serialize(url, data) -> dict:
     '''
@@ -47,15 +259,16 @@ def serialize(url, data) -> dict:
             'keywords': data['keywords'],
             }
 
-    with open('stored_citations.txt', 'rb') as f:
-        stored_citations = pickle.load(f)
+    # get_or_create falls back to a lookup if another worker inserts the
+    # same URL first, so concurrent calls can't store it twice
+    stored_citation, created = StoredCitation.objects.get_or_create(
+        url=url, defaults={'data': citation})
 
-    if url in stored_citations:
-        return citation
-    else:
-        stored_citations.append(url)
-        with open('stored_citations.txt', 'wb') as f:
-            pickle.dump(stored_citations, f)
+    if created:
         cache.set(url, citation)
-        return citation
-
+    elif stored_citation.data is None:
+        # URLs imported from stored_citations.txt have no citation yet
+        stored_citation.data = citation
+        stored_citation.save(update_fields=['data'])
+        cache.set(url, citation)
+    return citation
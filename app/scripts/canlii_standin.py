@@ -0,0 +1,222 @@
+'''
+A local stand-in for the CanLII caseBrowse API, for load tests.
+
+Serves the sample payloads in data/benchmark/cases.json and generates a
+plausible payload for any other case, so that the app can be load tested
+without spending CanLII quota. Latency, the rate of 500 errors and a request
+rate above which the server answers 429 are configurable. Point the app at it
+with CANLII_API_BASE_URL (see the canlii_standin and load_test commands).
+
+The routes mirror the real API:
+
+    /v1/caseBrowse/{language}/                          case databases
+    /v1/caseBrowse/{language}/{databaseId}/             cases, paginated with
+                                                        offset and resultCount
+    /v1/caseBrowse/{language}/{databaseId}/{caseId}/    a single case
+'''
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+DATA = Path(__file__).resolve().parent / "data"
+RECORDED_CASES = DATA / "benchmark" / "cases.json"
+CASE_DATABASES = DATA / "api.canlii.org.json"
+
+
+class StandinConfig(NamedTuple):
+    latency: float = 0.1
+    jitter: float = 0.05
+    error_rate: float = 0.0
+    # Requests per second allowed before answering 429; 0 for no limit
+    rate_limit: float = 0.0
+    retry_after: int = 1
+    cases_per_database: int = 100
+    seed: int = 0
+
+
+def load_recorded_cases() -> dict:
+    '''
+    Returns the sample payloads keyed by (databaseId, caseId).
+    '''
+    with open(RECORDED_CASES, encoding="utf-8") as f:
+        cases = json.load(f)
+    recorded = {}
+    for case in cases:
+        payload = case["payload"]
+        for case_id in payload["caseId"].values():
+            recorded[payload["databaseId"], case_id] = payload
+    return recorded
+
+
+def court_code(database_id: str) -> str:
+    return database_id.split("-")[-1].upper()
+
+
+def generated_case(language: str, database_id: str, case_id: str) -> dict:
+    '''
+    Builds a caseBrowse payload for a case that isn't recorded. Case IDs that
+    look like neutral citations (eg 2019onca123) get a neutral citation;
+    others get a CanLII citation.
+    '''
+    match = re.fullmatch(r"(\d{4})([a-z-]*?)(\d+)", case_id)
+    year = match.group(1) if match else "2000"
+    number = match.group(3) if match else "1"
+    if match and match.group(2) and match.group(2) != "canlii":
+        citation = f"{year} {court_code(database_id)} {number} (CanLII)"
+    else:
+        citation = f"{year} CanLII {number} ({court_code(database_id)})"
+
+    return {
+        "databaseId": database_id,
+        "caseId": {language: case_id},
+        "url": f"https://canlii.ca/t/{case_id}",
+        "title": f"R. v. Standin {number}" if language == "en"
+            else f"R. c. Standin {number}",
+        "citation": citation,
+        "language": language,
+        "docketNumber": number,
+        "decisionDate": f"{year}-01-15",
+        "keywords": "stand-in — generated",
+    }
+
+
+def case_list(language: str, database_id: str, offset: int, count: int,
+              total: int) -> dict:
+    '''
+    Returns a page of a database's case list. Every database holds total
+    generated cases.
+    '''
+    cases = []
+    for index in range(offset, min(offset + count, total)):
+        case_id = f"{2000 + index % 24}{database_id.replace('-', '')}{index + 1}"
+        case = generated_case(language, database_id, case_id)
+        cases.append({key: case[key] for key in
+                      ("databaseId", "caseId", "title", "citation")})
+    return {"cases": cases}
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: StandinConfig, verbose: bool = False):
+        super().__init__(address, StandinHandler)
+        self.config = config
+        self.verbose = verbose
+        self.recorded = load_recorded_cases()
+        with open(CASE_DATABASES, encoding="utf-8") as f:
+            self.case_databases = json.load(f)
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.tokens = config.rate_limit
+        self.updated = time.monotonic()
+        self.counters = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0,
+                         "not_found": 0}
+
+    def count(self, counter: str) -> None:
+        with self.lock:
+            self.counters[counter] += 1
+
+    def throttled(self) -> bool:
+        '''
+        Takes a token from an in-memory token bucket holding one second's
+        worth of requests. Returns True if the request should get a 429.
+        '''
+        rate = self.config.rate_limit
+        if not rate:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(rate, self.tokens + (now - self.updated) * rate)
+            self.updated = now
+            if self.tokens < 1:
+                return True
+            self.tokens -= 1
+            return False
+
+    def delay(self) -> float:
+        with self.lock:
+            jitter = self.random.uniform(-self.config.jitter, self.config.jitter)
+        return max(self.config.latency + jitter, 0)
+
+    def fails(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.config.error_rate
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    # Keeps connections open, as the real API does, so that the fetcher's
+    # pooled session is exercised
+    protocol_version = "HTTP/1.1"
+    server_version = "CanLIIStandin/1.0"
+
+    def send_json(self, status: int, body: dict, headers: dict | None = None) -> None:
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        server = self.server
+        server.count("requests")
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if "api_key" not in query:
+            server.count("errors")
+            return self.send_json(401, {"error": "Missing api_key"})
+
+        if server.throttled():
+            server.count("throttled")
+            return self.send_json(429, {"error": "Too many requests"},
+                                  {"Retry-After": str(server.config.retry_after)})
+
+        time.sleep(server.delay())
+        if server.fails():
+            server.count("errors")
+            return self.send_json(500, {"error": "Internal server error"})
+
+        path = [part for part in url.path.split("/") if part]
+        if "caseBrowse" not in path:
+            server.count("not_found")
+            return self.send_json(404, {"error": "Not found"})
+        path = path[path.index("caseBrowse") + 1:]
+
+        if len(path) == 1:
+            body = server.case_databases
+        elif len(path) == 2:
+            try:
+                offset = int(query.get("offset", ["0"])[0])
+                count = int(query.get("resultCount", ["100"])[0])
+            except ValueError:
+                server.count("errors")
+                return self.send_json(400, {"error": "Invalid offset or resultCount"})
+            body = case_list(path[0], path[1], max(offset, 0), min(max(count, 0), 10000),
+                             server.config.cases_per_database)
+        elif len(path) == 3:
+            language, database_id, case_id = path
+            body = server.recorded.get((database_id, case_id)) or \
+                generated_case(language, database_id, case_id)
+        else:
+            server.count("not_found")
+            return self.send_json(404, {"error": "Not found"})
+
+        server.count("ok")
+        self.send_json(200, body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(host: str, port: int, config: StandinConfig,
+                verbose: bool = False) -> StandinServer:
+    return StandinServer((host, port), config, verbose)
@@ -0,0 +1,117 @@
+'''
+Circuit breaker for the CanLII API.
+
+When CanLII is down or degraded, every call would otherwise wait out its
+timeouts and retries, tying up a worker each time. The breaker counts
+consecutive failed calls in the CircuitBreaker table. Once
+CANLII_BREAKER_THRESHOLD calls have failed in a row it opens, and calls fail
+immediately for CANLII_BREAKER_COOLDOWN seconds. After the cool-down the
+breaker is half-open: a single trial call is let through, and its outcome
+either closes the breaker or opens it for another cool-down. Other calls keep
+failing fast meanwhile. If the trial call never reports back (eg its worker
+died), another call is let through after CANLII_BREAKER_TRIAL_TIMEOUT seconds.
+A trial call that is given up on before reaching CanLII (eg by the rate
+limiter) releases its slot with release_trial, so the next call can be the
+trial straight away.
+'''
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import CircuitBreaker
+
+CANLII_BREAKER = "canlii"
+
+
+def allow_request(name: str = CANLII_BREAKER) -> datetime | bool:
+    '''
+    Checks whether a call may be made. Returns False while the breaker is open
+    and its cool-down hasn't passed, and while a half-open trial call is under
+    way. If the call is the half-open trial, returns when the trial started
+    (which is truthy), to be passed to release_trial if the call isn't made.
+    '''
+    breaker = CircuitBreaker.objects.filter(name=name).first()
+    if breaker is None or breaker.state == CircuitBreaker.CLOSED:
+        return True
+
+    # While half-open, opened_at is when the trial call started
+    now = timezone.now()
+    if breaker.state == CircuitBreaker.OPEN:
+        wait = settings.CANLII_BREAKER_COOLDOWN
+    else:
+        wait = settings.CANLII_BREAKER_TRIAL_TIMEOUT
+    if now < breaker.opened_at + timedelta(seconds=wait):
+        return False
+
+    # Only the caller whose update wins makes the trial call; opened_at
+    # changes with it, so the others' updates match no row
+    won = CircuitBreaker.objects.filter(
+        name=name, state=breaker.state, opened_at=breaker.opened_at,
+    ).update(state=CircuitBreaker.HALF_OPEN, opened_at=now) == 1
+    return now if won else False
+
+
+def release_trial(started: datetime | bool, name: str = CANLII_BREAKER) -> None:
+    '''
+    Gives up a half-open trial call that wasn't made, given the value
+    allow_request returned for it. The breaker goes back to open with its
+    cool-down over, so the next call becomes the trial. Does nothing if the
+    call wasn't the trial, or if its slot has already been taken over.
+    '''
+    if not isinstance(started, datetime):
+        return
+    CircuitBreaker.objects.filter(
+        name=name, state=CircuitBreaker.HALF_OPEN, opened_at=started,
+    ).update(state=CircuitBreaker.OPEN,
+             opened_at=timezone.now() - timedelta(seconds=settings.CANLII_BREAKER_COOLDOWN))
+
+
+def record_success(name: str = CANLII_BREAKER) -> None:
+    '''
+    Closes the breaker and resets its failure count. Only writes to the
+    database if there is something to reset.
+    '''
+    CircuitBreaker.objects.filter(name=name)\
+        .exclude(state=CircuitBreaker.CLOSED, failure_count=0)\
+        .update(state=CircuitBreaker.CLOSED, failure_count=0, opened_at=None)
+
+
+def record_failure(error: str, name: str = CANLII_BREAKER) -> None:
+    '''
+    Counts a failed call. Opens the breaker once the failure threshold is
+    reached, or straight away if the failure was a half-open trial call.
+    '''
+    with transaction.atomic():
+        breaker, _ = CircuitBreaker.objects.select_for_update()\
+            .get_or_create(name=name)
+        now = timezone.now()
+        breaker.failure_count += 1
+        breaker.last_failure = now
+        breaker.last_error = error[:200]
+
+        if breaker.state == CircuitBreaker.HALF_OPEN or (
+                breaker.state == CircuitBreaker.CLOSED and
+                breaker.failure_count >= settings.CANLII_BREAKER_THRESHOLD):
+            breaker.state = CircuitBreaker.OPEN
+            breaker.opened_at = now
+            breaker.times_opened += 1
+
+        breaker.save()
+
+
+def breaker_status(name: str = CANLII_BREAKER) -> dict:
+    '''
+    Returns the breaker's state for reporting.
+    '''
+    breaker = CircuitBreaker.objects.filter(name=name).first()
+    if breaker is None:
+        return {"state": CircuitBreaker.CLOSED, "failure_count": 0,
+                "times_opened": 0, "last_error": ""}
+    return {
+        "state": breaker.state,
+        "failure_count": breaker.failure_count,
+        "times_opened": breaker.times_opened,
+        "last_error": breaker.last_error,
+    }
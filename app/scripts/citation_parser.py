@@ -0,0 +1,206 @@
+'''
+Tokenizer for pasted parallel citations.
+
+Parallel citations copied from CanLII or Westlaw arrive as a block of text
+such as
+
+    [2016] 1 SCR 631 — 398 DLR (4th) 381 — [2016] OJ No 2345 (QL)
+
+The block is split on long dashes (—) and each citation is tokenized in a
+single pass with precompiled patterns. Every token is classified by its
+position relative to the reporter: a year or volume comes before it, a series
+such as "(4th)" follows it directly, a page follows the series, and anything
+in parentheses after the page is the court. ParsedCitation keeps the parts
+the McGill rules need, so that citations are parsed once per request.
+'''
+import re
+from typing import NamedTuple
+
+from .reporter_index import UNOFFICIAL, decision_month, is_neutral_court, reporter_tier
+
+# Token kinds
+YEAR = "year"
+VOLUME = "volume"
+REPORTER = "reporter"
+SERIES = "series"
+LABEL = "label"
+PAGE = "page"
+COURT = "court"
+
+# Parallel citations are separated by a long dash
+CITATION_SEPARATOR = re.compile(r"\s*—\s*")
+
+# A parenthesized group (kept whole, eg "(ON CA)"), or a run of characters up
+# to the next space or hyphen
+TOKEN = re.compile(r"\([^()]*\)[^\s()-]*|[^\s-]+")
+
+# Tokens dropped from the citation, eg the QuickLaw designation
+EXCLUDED_TOKENS = frozenset(("(QL)",))
+# Tokens that are part of the citation but not of the reporter's name
+LABEL_TOKENS = frozenset(("No", "no"))
+
+
+class CitationToken(NamedTuple):
+    kind: str
+    text: str
+
+
+def split_parallel_citations(other_citations: str) -> list[str]:
+    '''
+    Splits a block of pasted parallel citations into single citations.
+    '''
+    if not other_citations:
+        return []
+    return [citation for citation in CITATION_SEPARATOR.split(other_citations.strip())
+            if citation]
+
+
+def scan_citation(citation: str) -> tuple:
+    '''
+    Splits a single citation into (kind, text) pairs, in one pass. Each token
+    is classified by its shape and its position relative to the reporter.
+
+    Returns the tokens along with what ParsedCitation needs, picked out in the
+    same pass: the citation's text, the reporter's name and series without
+    periods (eg "Sask R" or "DLR (4th)"), and the first year, volume, page and
+    court. The brackets around a year are dropped from the text before a
+    Carswell reporter (see McGill 9e 3.8.3).
+    '''
+    tokens = []
+    parts = []
+    reporter_parts = []
+    year = volume = page = court = None
+    seen_reporter = False
+    seen_page = False
+    for text in TOKEN.findall(citation):
+        if text in EXCLUDED_TOKENS:
+            continue
+        bare = text.rstrip(",")
+        first = text[0]
+
+        if text in LABEL_TOKENS:
+            kind = LABEL
+        elif not seen_reporter:
+            if bare.isdigit():
+                if not tokens and len(bare) == 4:
+                    kind = YEAR
+                    year = bare
+                else:
+                    kind = VOLUME
+                    if volume is None:
+                        volume = bare
+            elif (first == "[" or first == "(") and text.strip("[](),").isdigit():
+                kind = YEAR
+                if year is None:
+                    year = text.strip("[](),")
+            elif first == "(":
+                kind = COURT
+            else:
+                kind = REPORTER
+                seen_reporter = True
+                reporter_parts.append(text.replace(".", ""))
+                if tokens and tokens[-1][0] == YEAR and first_bracketed(parts[-1]) \
+                        and text.startswith("Carswell"):
+                    parts[-1] = parts[-1][1:-1]
+        elif bare.isdigit():
+            kind = PAGE
+            seen_page = True
+            if page is None:
+                page = bare
+        elif seen_page:
+            kind = COURT
+            if court is None and first == "(":
+                court = text.strip("(),")
+        else:
+            kind = SERIES if first == "(" else REPORTER
+            reporter_parts.append(text.replace(".", ""))
+
+        tokens.append((kind, text))
+        parts.append(text)
+
+    return (tokens, " ".join(parts), " ".join(reporter_parts), year, volume, page,
+            court)
+
+
+def first_bracketed(text: str) -> bool:
+    return text[0] == "[" and text[-1] == "]"
+
+
+def tokenize_citation(citation: str) -> list[CitationToken]:
+    '''
+    Splits a single citation into classified tokens.
+    '''
+    return [CitationToken(kind, text) for kind, text in scan_citation(citation)[0]]
+
+
+def parse_parallel_citations(other_citations: str) -> list["ParsedCitation"]:
+    '''
+    Parses a block of pasted parallel citations.
+    '''
+    return [ParsedCitation.parse(citation)
+            for citation in split_parallel_citations(other_citations)]
+
+
+class ParsedCitation:
+    '''
+    A single citation, parsed once into the parts the McGill rules look at:
+    the year (digits only), volume, reporter (with its series, without
+    periods), first page, court and the reporter's tier. Converts to the
+    citation's text, so it can be used directly in templates and f-strings.
+    '''
+    __slots__ = ("text", "year", "volume", "reporter", "page", "court", "tier")
+
+    def __init__(self, text: str, year: str | None = None, volume: str | None = None,
+                 reporter: str = "", page: str | None = None, court: str | None = None,
+                 tier: str = UNOFFICIAL):
+        self.text = text
+        self.year = year
+        self.volume = volume
+        self.reporter = reporter
+        self.page = page
+        self.court = court
+        self.tier = tier
+
+    @classmethod
+    def parse(cls, citation: str) -> "ParsedCitation":
+        _, text, reporter, year, volume, page, court = scan_citation(citation)
+        return cls(text, year, volume, reporter, page, court,
+                   reporter_tier(reporter) if reporter else UNOFFICIAL)
+
+    @property
+    def is_neutral(self) -> bool:
+        '''
+        Whether this is a neutral citation, eg "2016 SCC 27", from a court that
+        issued neutral citations in the citation's year.
+        '''
+        return self.is_neutral_on(None)
+
+    def is_neutral_on(self, decision_date: str | None) -> bool:
+        '''
+        Whether this is a neutral citation from a court that issued neutral
+        citations when the case was decided. decision_date is a CanLII
+        decision date (eg "2016-07-08"); without one, the citation's year is
+        used.
+        '''
+        if self.year is None or self.volume is not None:
+            return False
+        decided = decision_month(decision_date)
+        if decided is None:
+            return is_neutral_court(self.reporter, int(self.year))
+        return is_neutral_court(self.reporter, *decided)
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"ParsedCitation({self.text!r})"
+
+    def __eq__(self, other):
+        if isinstance(other, ParsedCitation):
+            return self.text == other.text
+        if isinstance(other, str):
+            return self.text == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.text)
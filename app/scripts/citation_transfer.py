@@ -0,0 +1,176 @@
+'''
+Streaming export and import of the Citation table.
+
+Citations are written one JSON object per line (JSONL), gzip-compressed when
+the file name ends in .gz. Both directions stream: the export reads rows with
+a server-side iterator and writes them as they arrive, and the import reads a
+line at a time and inserts rows in chunks, so memory use doesn't grow with
+the size of the table.
+
+Rows are matched on their canonical key. By default, imported rows replace
+stored rows with the same key (an upsert), and the replaced cases are removed
+from the citation cache, since bulk inserts don't send the post_save signal
+that normally does so (see app/signals.py). Only the fields present on a line
+are written to a stored row; a line holding just a URL and a title corrects
+the title and leaves the rest of the row alone. Such partial lines can only
+update stored rows: a partial line for a case that isn't stored is skipped
+and counted as incomplete, rather than stored with blank fields. With
+skip_existing, stored rows are kept.
+'''
+import gzip
+import json
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import reset_queries
+
+from ..models import Citation
+from .api_calls import canonical_key
+from .cache import delete_cached_citations
+
+CHUNK_SIZE = 2000
+
+# Every field but the primary key, which differs between databases
+FIELDS = tuple(field.name for field in Citation._meta.concrete_fields
+               if not field.primary_key)
+UPDATE_FIELDS = tuple(field for field in FIELDS if field != "canonical_key")
+# The fields a line needs to hold to create a new row
+REQUIRED_FIELDS = frozenset(field.name for field in Citation._meta.concrete_fields
+                            if not field.blank)
+
+
+@contextmanager
+def open_jsonl(path: str, mode: str):
+    '''
+    Opens a JSONL file for reading ("r") or writing ("w") as text. Files
+    ending in .gz are gzip-compressed, and "-" is stdin or stdout.
+    '''
+    if path == "-":
+        yield sys.stdin if mode == "r" else sys.stdout
+    elif path.endswith(".gz"):
+        with gzip.open(path, mode + "t", encoding="utf-8") as f:
+            yield f
+    else:
+        with open(path, mode, encoding="utf-8") as f:
+            yield f
+
+
+def export_citations(f, chunk_size: int = CHUNK_SIZE, report=None) -> int:
+    '''
+    Writes every Citation to f as JSONL, in primary key order. report, if
+    given, is called with the number of rows written after every chunk.
+    Returns the number of rows written.
+    '''
+    rows = Citation.objects.order_by("pk").values_list(*FIELDS)
+    count = 0
+    for row in rows.iterator(chunk_size=chunk_size):
+        f.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False))
+        f.write("\n")
+        count += 1
+        if report is not None and count % chunk_size == 0:
+            report(count)
+    return count
+
+
+def read_citations(f):
+    '''
+    Yields (citation, fields) for every line of a JSONL file, where fields is
+    the set of fields the line holds. Fields missing from a line are left at
+    their defaults, and rows without a canonical key get the key of their URL.
+    Raises ValueError for lines that aren't JSON objects.
+    '''
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as error:
+            raise ValueError(f"Line {number}: {error}")
+        if not isinstance(data, dict):
+            raise ValueError(f"Line {number}: expected an object")
+
+        fields = {field for field in FIELDS if field in data}
+        citation = Citation(**{field: data[field] for field in fields})
+        if not citation.canonical_key:
+            citation.canonical_key = canonical_key(citation.url)
+        yield citation, fields
+
+
+def save_chunk(chunk: dict, skip_existing: bool) -> int:
+    '''
+    Saves a chunk of {canonical key: (citation, fields)}. Stored rows are
+    updated with the fields their line held, one upsert per set of fields.
+    Partial lines for cases that aren't stored are left out; returns how many
+    were.
+    '''
+    # With DEBUG on, Django keeps every query it runs; don't let them pile up
+    reset_queries()
+
+    partial = [key for key, (_, fields) in chunk.items() if not REQUIRED_FIELDS <= fields]
+    if partial:
+        stored = set(Citation.objects.filter(canonical_key__in=partial)
+                     .values_list("canonical_key", flat=True))
+        incomplete = {key for key in partial if key not in stored}
+        chunk = {key: line for key, line in chunk.items() if key not in incomplete}
+    else:
+        incomplete = set()
+
+    if skip_existing:
+        Citation.objects.bulk_create([citation for citation, _ in chunk.values()],
+                                     ignore_conflicts=True)
+        return len(incomplete)
+
+    groups = defaultdict(list)
+    for citation, fields in chunk.values():
+        update_fields = tuple(field for field in UPDATE_FIELDS if field in fields)
+        groups[update_fields].append(citation)
+    for update_fields, citations in groups.items():
+        if update_fields:
+            Citation.objects.bulk_create(
+                citations, update_conflicts=True,
+                unique_fields=["canonical_key"], update_fields=update_fields)
+        else:
+            # Nothing to update: only insert the rows that are new
+            Citation.objects.bulk_create(citations, ignore_conflicts=True)
+    delete_cached_citations(chunk)
+    return len(incomplete)
+
+
+def import_citations(f, chunk_size: int = CHUNK_SIZE, skip_existing: bool = False,
+                     report=None) -> tuple[int, int, int]:
+    '''
+    Inserts or updates the citations in a JSONL file, chunk_size rows at a
+    time. Rows without a valid CanLII URL or canonical key are skipped, and so
+    are partial rows for cases that aren't stored. report, if given, is called
+    with the number of rows read after every chunk. Returns the number of
+    rows imported, skipped and incomplete.
+    '''
+    imported = skipped = incomplete = 0
+    # Keyed by canonical key: a key may only appear once in an upsert
+    chunk = {}
+    for citation, fields in read_citations(f):
+        if citation.canonical_key is None:
+            skipped += 1
+            continue
+        if citation.canonical_key in chunk:
+            # Later lines for the same case win, field by field
+            earlier, earlier_fields = chunk[citation.canonical_key]
+            for field in fields:
+                setattr(earlier, field, getattr(citation, field))
+            earlier_fields |= fields
+            continue
+        chunk[citation.canonical_key] = citation, fields
+        if len(chunk) == chunk_size:
+            left_out = save_chunk(chunk, skip_existing)
+            imported += len(chunk) - left_out
+            incomplete += left_out
+            chunk = {}
+            if report is not None:
+                report(imported + skipped + incomplete)
+
+    if chunk:
+        left_out = save_chunk(chunk, skip_existing)
+        imported += len(chunk) - left_out
+        incomplete += left_out
+    return imported, skipped, incomplete
@@ -0,0 +1,987 @@
+'''
+Appendix A
+Codifies the jurisdictional abbreviations used in the McGill 9th edition as
+dictionaries and lists. Use the appendices module rather than importing this
+one: it loads these tables on first use and serves the tabular ones as numpy
+arrays.
+'''
+
+a1_canada_abbreviations_en = [
+    ["Jurisdiction", "Statutes and Gazettes", "Regulations",
+    "Courts and Journals", "Neutral Citation", "Law Reporters",
+    "Postal Abbreviation"],
+    ["Alberta", "A", "Alta", "Alta", "AB", "A or Alta", "AB"],
+    ["British Columbia", "BC", "BC", "BC", "BC", "BC", "BC"],
+    ["Canada", "C", "C", "C or Can", "Can", "Can","-"],
+    ["Lower Canada", "LC", "LC", "LC", "-", "LC","-"],
+    ["Manitoba", "M", "Man", "Man", "MB", "Man", "MB"],
+    ["New Brunswick", "NB", "NB", "NB", "NB", "NB", "NB"],
+    ["Newfoundland", "N", "Nfld", "Nfld", "NF", "Nfld", "NL"],
+    ["Newfoundland & Labrador", "NL", "NL", "NL", "NL", "Nfld", "NL"],
+    ["Nova Scotia", "NS", "NS", "NS", "NS", "NS", "NS"],
+    ["Northwest Territories", "NWT", "NWT", "NWT", "NWT or NT", "NWT", "NT"],
+    ["Nunavut", "Nu", "Nu", "Nu", "NU", "Nu", "NU"],
+    ["Ontario", "O", "O or Ont", "Ont", "ON", "O", "ON"],
+    ["Prince Edward Island", "PEI", "PEI", "PEI", "PE", "PEI", "PE"],
+    ["Province of Canada", "Prov C", "Prov C", "Prov C", "-", "-", "-"],
+    ["Quebec", "Q", "Q", "Q (Journals) or Qc (Courts)", "QC", "Q", "QC"],
+    ["Saskatchewan", "S", "S or Sask", "Sask", "SK", "Sask", "SK"],
+    ["Upper Canada", "UC", "UC", "UC", "-", "UC", "-"],
+    ["Yukon", "Y", "Y", "Y", "YK", "Y", "YT"],
+]
+
+a1_canada_abbreviations_fr = [
+    ["Indication geographique", "Lois et gazettes", "Règlements",
+    "Cours et revues", "Référence neutre", "Recueils de droit",
+    "Abréviation postale"],
+    ["Alberta", "A", "Alta", "Alta", "AB", "A or ALta", "AB"],
+    ["British Columbia", "BC", "BC", "BC", "BC", "BC", "BC"],
+    ["Canada", "C", "C", "C or Can", "Can", "Can", "-"],
+    ["Lower Canada", "B-C", "B-C", "B-C", "-", "B-C", "-"],
+    ["Manitoba", "M", "Man", "Man", "MB", "Man", "MB"],
+    ["New Brunswick", "N-B", "N-B", "N-B", "NB", "N-B", "NB"],
+    ["Newfoundland", "N", "Nfld", "Nfld", "NF", "Nfld", "NL"],
+    ["Newfoundland & Labrador", "NL", "NL", "NL", "NL", "Nfld", "NL"],
+    ["Nova Scotia", "NS", "NS", "NS", "NS", "NS", "NS"],
+    ["Northwest Territories", "TN-O", "TN-O", "TN-O", "NWT or NT", "TN-O",
+     "NT"],
+    ["Nunavut", "Nu", "Nu", "Nu", "NU", "Nu", "NU"],
+    ["Ontario", "O", "O or Ont", "Ont", "ON", "O", "ON"],
+    ["Prince Edward Island", "PEI", "PEI", "PEI", "PE", "PEI", "PE"],
+    ["Province of Canada", "Prov C", "Prov C", "Prov C", "-", "-", "-"],
+    ["Quebec", "Q", "Q", "Q (Journals) or Qc (Courts)", "QC", "Q", "QC"],
+    ["Saskatchewan", "S", "S or Sask", "Sask", "SK", "Sask", "SK"],
+    ["Upper Canada", "UC", "UC", "UC", "-", "UC", "-"],
+    ["Yukon", "Y", "Y", "Y", "YK", "Y", "YT"],
+]
+
+a2_us_abbreviations_en = {
+    "Alabama": "Ala", "Alaska": "Alaska", "Arizona": "Ariz", "Arkansas": "Ark",
+    "California": "Cal", "Colorado": "Colo", "Connecticut": "Conn",
+    "Delaware": "Del", "District of Columbia": "DC", "Florida": "Fla",
+    "Georgia": "Ga", "Hawaii": "Hawaii", "Idaho": "Idaho", "Illinois": "Ill",
+    "Indiana": "Ind", "Iowa": "Iowa", "Kansas": "Kan", "Kentucky": "Ky",
+    "Louisiana": "La", "Maine": "Me", "Maryland": "Md", "Massachusetts": "Mass",
+    "Michigan": "Mich", "Minnesota": "Minn", "Mississippi": "Miss",
+    "Missouri": "Mo", "Montana": "Mont", "Nebraska": "Neb", "Nevada": "Nev",
+    "New Hampshire": "NH", "New Jersey": "NJ", "New Mexico": "N Mex",
+    "New York": "NY", "North Carolina": "NC", "North Dakota": "N Dak",
+    "Ohio": "Ohio", "Oklahoma": "Okla", "Oregon": "Or", "Pennsylvania": "Pa",
+    "Rhode Island": "RI", "South Carolina": "SC", "South Dakota": "S Dak",
+    "Tennessee": "Tenn", "Texas": "Tex", "United States": "US", "Utah": "Utah",
+    "Vermont": "Vt", "Virginia": "Va", "Washington": "Wash",
+    "West Virginia": "W Va", "Wisconsin": "Wis", "Wyoming": "Wyo"
+}
+
+a2_us_abbreviations_fr = {"Alabama": "Ala", "Alaska": "Alaska", "Arizona": "Ariz",
+    "Arkansas": "Ark", "California": "Cal", "Caroline du Nord": "NC",
+    "Caroline du Sud": "SC", "Colorado": "Colo", "Connecticut": "Conn",
+    "Dakota du Nord": "N Dak", "Dakota du Sud": "S Dak", "Delaware": "Del",
+    "District de Columbia": "DC", "Étas-Unis": "US", "Floride": "Fla",
+    "Géorgie": "Ga", "Hawaï": "Hawaii", "Idaho": "Idaho", "Illinois": "Ill",
+    "Indiana": "Ind", "Iowa": "Iowa", "Kansas": "Kan", "Kentucky": "Ky",
+    "Louisiane": "La", "Maine": "Me", "Maryland": "Md",
+    "Massachusetts": "Mass", "Michigan": "Mich", "Minnesota": "Minn",
+    "Mississippi": "Miss", "Missouri": "Mo", "Montana": "Mont",
+    "Nebraska": "Neb", "Nevada": "Nev", "New Hampshire": "NH",
+    "New Jersey": "NJ", "New York": "NY", "Nouveau-Mexique": "N Mex",
+    "Ohio": "Ohio", "Oklahoma": "Okla", "Oregon": "Or", "Pennsylvanie": "Pa",
+    "Rhode Island": "RI", "Tennessee": "Tenn", "Texas": "Tex",
+    "Utah": "Utah", "Vermont": "Vt", "Virginie": "Va", "Washington": "Wash",
+    "Virginie occidentale": "W Va", "Wisconsin": "Wis", "Wyoming": "Wyo"
+}
+
+a3_australia_abbreviations_en = [
+    ["Jurisdiction", "Legislation and Courts", "Neutral citation"],
+    ["Australia", "Austl", "-"],
+    ["Commonwealth", "Cth", "-"],
+    ["Australian Capital Territory", "ACT", "-"],
+    ["New South Wales", "NSW", "NSW"],
+    ["Northern Territory", "NT", "NT"],
+    ["Queensland", "Qld", "Q"],
+    ["South Australia", "SA", "SA"],
+    ["Tasmania", "Tas", "TAS"],
+    ["Victoria", "Vic", "V"],
+    ["Western Australia", "WA", "WA"]
+]
+
+a3_australia_abbreviations_fr = [
+    ["Indication géographique", "Législation et cours", "Référence neutre"],
+    ["Australie", "Austl", "-"],
+    ["Commonwealth", "Cth", "-"],
+    ["Territoire de la capitale australienne", "ACT", "-"],
+    ["Nouvelle-Galles du Sud", "NSW", "NSW"],
+    ["Territoire du Nord", "NT", "NT"],
+    ["Queensland", "Qld", "Q"],
+    ["Australie-Méridionale", "SA", "SA"],
+    ["Tasmanie", "Tas", "TAS"],
+    ["Victoria", "Vic", "V"],
+    ["Australie-Occidentale", "WA", "WA"]
+]
+
+a4_other_abbreviations_en = {
+    "European Union": "EU", "Hong Kong": "HK", "Ireland": "Irl",
+    "New Zealand": "NZ", "Northern Ireland": "NI", "Scotland": "Scot",
+    "Singapore": "Sing", "South Africa": "S Afr", "United Kingdom": "UK",
+    "United States": "US"
+}
+
+a4_other_abbreviations_fr = {
+    "Afrique du Sud": "S Afr", "Écosse": "Scot", "États-Unis": "US",
+    "Hong Kong": "HK", "Irlande": "Irl", "Irlande du nord": "IN",
+    "Nouvelle-Zélande": "N-Z", "Royaume-Uni": "UK", "Singapour": "Sing",
+    "Union européenne": "UE"
+}
+
+a5_international_material_abbreviations = {
+    "Assemblée consultative (Conseil de l'Europe)": "AC",
+    "Assemblée générale (NU)": "AG",
+    "Agence internationale de l'énergie atomique (NU)": "AIEA",
+    "Assemblée parlementaire (Conseil de l'Europe)": "AP",
+    "Asia Pacific Economic Cooperation": "APEC",
+    "Australia Treaty National INterest Analysis": "ATNIA",
+    "Australian Treaty not yet in force": "ATNIF",
+    "Australian Treaty Series": "ATS",
+    "African Union": "AU",
+    "Bureau (NU)": "Bur",
+    "First Committee (UN) / Première Commission (NU)": "C1",
+    "Second Committee (UN) / Deuxième Commission (NU)": "C2",
+    "Third Committee (UN) / Troisième Commission (NU)": "C3",
+    "Consultative Assembly (Council of Europe)": "CA",
+    "Canada Treaty Series": "Can TS",
+    "Conseil du commerce et du développement (NU)": "CCED",
+    "Commission des droits de l'homme (NU)": "CDH",
+    "Communautés européennes": "CE",
+    "Conseil économique et social (NU)": "CES",
+    "Cour internationale de justice": "CIJ",
+    "Tribunal de première instance (CE)": "CJ (1re inst)",
+    "Cour de justice des Communautés européennes": "CJE",
+    "Conférence des Nations Unies sur le commerce et le développement":
+        "CNUCED",
+    "Commission des Nations Unies pour le droit commercial international":
+        "CNUDCI",
+    "Commission européenne des DroiTs de l'Homme": "Comm Eur DH",
+    "Commission interaméricaine des Droits de l'Homme": "Comm Interam DH",
+    "Conseil de L'Europe": "Conseil de l'Europe",
+    "Counsel of Europe": "Counsel of Europe",
+    "Cour européenne des Droits de l'Homme": "Cour Eur DH",
+    "Cour interamericaine des Droits de l'Homme": "Cour Interam DH",
+    "Cour permanente de justice internationale": "CPJI",
+    "Conseil de sécurité (NU)": "CS",
+    "Conseil de tutele (NU)": "CT",
+    "Consolidated Treaty Series": "CTS",
+    "Decision": "Dec",
+    "Décision": "Déc",
+    "Document": "Doc",
+    "Document officiel": "Doc off",
+    "European Communities": "EC",
+    "European Court of First Instance": "ECFI",
+    "Court of Justice of the European Communities": "ECJ",
+    "Emergency": "Emer",
+    "Economic and Social Council (UN)": "ESC",
+    "European Treaty Series": "ETS",
+    "European Union": "EU",
+    "European Commission of Human Rights": "Eur Comm HR",
+    "European Court of Human Rights": "Eur Ct HR",
+    "Extraordinaires": "Extra",
+    "Fonds monétaire international (NU)": "FMI",
+    "General Assembly (GA)": "GA",
+    "Accord général sur les tarifs douaniers et le commerce": "GATT",
+    "General Committee (UN)": "GC",
+    "Haut-Commissariat aux droits de l'homme (NU)": "HCDH",
+    "Haut-Commissariat des Nations Unies pour les réfugiés": "HCR",
+    "Human Rights Committee (UN)": "HRC",
+    "International Atomic Energy Agency (UN)": "IAEA",
+    "International Civil Aviation Organization (NU)": "ICAO",
+    "International Court of Justice": "ICJ",
+    "International Criminal Tribunal for Rwanda": "ICTR",
+    "International Criminal Tribunal for the former Yugoslavia (UN)": "ICTY",
+    "International Legal Materials": "ILM",
+    "International Labor Organization (UN)": "ILO",
+    "International Monetary Fund (UN)": "IMF",
+    "Inter-American Commission on Human Rights": "Inter-Am Comm HR",
+    "Inter-American Court of Human Rights": "Inter-Am Ct HR",
+    "League of Nations Treaty Series": "LNTS",
+    "Mimeograph(ed)": "Mimeo",
+    "Miméographié": "Miméo",
+    "Meeting": "Mtg",
+    "North Atlantic Treaty Organization": "NATO",
+    "Nations Unies": "NU",
+    "Conferérence des Nations Unies sur le commerce et le développement":
+        "NUCED",
+    "Organization de l'aviation civile internationale (NU)": "OACI",
+    "Organization of American States": "OAS",
+    "Organization of American States Treaty Series": "OASTS",
+    "Organization des États américains": "OÉA",
+    "United Nations High Commissioner for Human Rights, Office of the (UN)":
+        "OHCHR",
+    "Organisation international du travail (NU)": "OIT",
+    "Organisation mondiale du commerce": "OMC",
+    "Organisation mondiale de la propriété intellectuelle": "OMPI",
+    "Official Records": "OR",
+    "Organisation du Traité de l'Atlantique Nord": "OTAN",
+    "Parliamentary Assembly (Council of Europe)": "PA",
+    "Permanent Court of International Justice": "PCIJ",
+    "Plenary": "Plen",
+    "Plénière": "Plén",
+    "Recommendation/Recomandation": "Rec",
+    "Regulation": "Reg",
+    "Resolution": "Res",
+    "Résolution": "Rés",
+    "Recueil des traités de la France": "RTF",
+    "Recueil des traité des Nations Unies": "RTNU",
+    "Recueil des traités du Canada": "RT Can",
+    "Security Council": "SC",
+    "Session": "Sess",
+    "Special": "Spec",
+    "Spécial": "Spéc",
+    "Supplement": "Supp",
+    "Série des traités européens": "STE",
+    "Trusteeship Council": "TC",
+    "Trade and Development Board (UN)": "TDB",
+    "Treaties and other International Agreements of the United States of \
+        America 1776-1949": "TI Agree",
+    "United States Treaties and Other International Acts Series": "TIAS",
+    "Tribunal pénal international pour le Rwanda": "TPR",
+    "Tribunal pénal international pour l'ex-Yougoslavie": "TPIY",
+    "Union africaine": "UA",
+    "Union européenne": "UE",
+    "British and Foreign State Papers": "UKFS",
+    "United Kingdom Treaty Series": "UKTS",
+    "United Nations": "UN",
+    "United Nations Commission on International Trade Law": "UNCITRAL",
+    "United Nations Conference on Trade and Development": "UNCTAD",
+    "United Nations High Commissioner for Refugees": "UNHCR",
+    "United Nations Treaty Series": "UNTS",
+    "Urgence": "Urg",
+    "United States Treaties and Other International Agreements": "USTA",
+    "Banque mondiale/World Bank Organization": "WBO",
+    "World Intellectual Property Organization": "WIPO",
+    "World Trade Organization": "WTO"
+}
+
+'''
+Appendix B
+Codifies the court and tribunal abbreviations used in the McGill 9th edition as
+dictionaries and numpy arrays.
+'''
+
+b2_1_frequent_court_abbreviations = {
+    "Cour d'appel": "CA",
+    "Cour provinciale": "CP",
+    "Cour supérieure": "CS",
+    "Cour suprême du Canada": "CSC",
+    "Court of Appeal": "CA",
+    "Court of Justice": "CJ",
+    "Federal Court of Appeal": "FCA",
+    "High Court": "HC",
+    "Provincial Court": "Prov Ct",
+    "Superior Court": "Sup Ct",
+    "Traffic Court": "Traffic Ct",
+    "Youth Court": "Youth Ct"
+}
+
+b2_2_canadian_court_abbreviations = {
+    "Coroners Court": "Cor Ct",
+    "Cour canadienne de l'impôt": "CCI",
+    "Cour d'appel": "CA",
+    "Cour d'appel de la cour maritale": "CACM",
+    "Cour d'appel fédérale": "CAF",
+    "Cour de comité": "Cc",
+    "Cour de l'Ontario, division générale": "Div gén Ont",
+    "Cour des divorces et des causes matrimoniales": "C div & causes mat",
+    "Cours des juges de la Cour de comté siégeant au criminel": "C j Cc crim",
+    "Cours des petites créances": "C pet cré",
+    "Cours des successions": "C succ",
+    "Cour divisionnaire": "C div",
+    "Cour du Banc de la Reine": "BR",
+    "Cour du Banc de la Reine (Division de la famille)": "BR (div fam)",
+    "Cour du Banc de la Reine (Division de première instance)":
+        "BR (1re inst)",
+    "Cour du Québec": "CQ",
+    "Cour du Québec, Chambre civile": "CQ civ",
+    "Cour du Québec, Chambre civile (Divisilon des petites créances)":
+        "CQ civ (div pet cré)",
+    "Cour du Québec, Chambre criminelle et pénale": "CQ crim & pén",
+    "Cour du Québec, Chambre des jeunes": "CQ jeun",
+    "Cour fédérale, première instance": "CF (1re inst)",
+    "Cour municipale": "CM",
+    "Cour provincial": "CP",
+    "Cour provinciale (Division civile)": "CP Div civ",
+    "Cour provinciale (Division criminelle)": "CP Div crim",
+    "Cour provinciale (Division de la famille)": "CP Div fam",
+    "Cour supérieure": "CS",
+    "Cour supérieure (Chambre administrative)": "CS adm",
+    "Cour supérieure (Chambre civile)": "CS civ",
+    "Cour supérieure (Chambre criminel et pénale)": "CS crim & pén",
+    "Cour supérieure (Chambre de la faillite et de l'insolvabilité)":
+        "CS fail & ins",
+    "Cour supérieure (Chambre de la famille)": "CS fam",
+    "Cour supérieure (Division des petites créances)": "CS pet cré",
+    "Cour suprême (Division d'appel)": "C supr A",
+    "Cour suprême (Division de la famille)": "C supr fam",
+    "Cour suprême (Division du Banc de la Reine)": "C supr BR",
+    "Cour suprême du Canada": "CSC",
+    "Court Martial Appeal Court": "Ct Martial App Ct",
+    "Court of Appeal": "CA",
+    "Court of Appeal in Equity": "CA Eq",
+    "Court of Justice (General Division)": "Ct J (Gen Div)",
+    "Court of Justice (General Division, Family Court)":
+        "Ct J (Gen Di Fam Ct)",
+    "Court of Justice (General Division, Small Claims Court)":
+        "Ct J (Gen Div, Sm Cl Ct)",
+    "Court of Justice (Provincial Division)": "Ct J (Prov Div)",
+    "Court of Justice (Provincial Division, Youth Court)":
+        "Ct J (Prov Div, Youth Ct)",
+    "Court of King's Bench": "KB",
+    "Court of King's Bench (Family Division)": "KB (Fam Div)",
+    "Court of King's Bench (Trial Division)": "KB (TD)",
+    "Court of Quebec": "CQ",
+    "Court of Quebec (Civil Division)": "CQ (Civ Div)",
+    "Court of Quebec (Civil Division, Small Claims)": "CQ (Civ Div Sm Cl)",
+    "Court of Quebec (Criminal & Penal Division)": "CQ (Crim & Pen Div)",
+    "Court of Quebec (Youth Division)": "CQ (Youth Div)",
+    "Court of Queen's Bench": "QB",
+    "Court of Queen's Bench (Family Division)": "QB (Fam Div)",
+    "Court of Queen's Bench (Trial Division)": "QB (TD)",
+    "Divisional Court": "Div Ct",
+    "Divorce and Matrimonial Causes Court": "Div & Mat Causes Ct",
+    "Federal Court (Trial Division)": "FCTD",
+    "Federal Court of Appeal": "FCA",
+    "High Court of Justice": "H Ct J",
+    "Municipal Court": "Mun Ct",
+    "Probate Court": "Prob Ct",
+    "Provincial Court (Civil Division)": "Prov Ct (Civ Div)",
+    "Provincial Court (Civil Division, Small Claims Court)":
+        "Prov Ct (Civ Div Sm Cl Ct)",
+    "Provincial Court (Criminal Division)": "Prov Ct (Crim Div)",
+    "Provincial Court (Family Court)": "Prov Ct (Fam Ct)",
+    "Provincial Court (Family Division)": "Prov Ct (Fam Div)",
+    "Provincial Court (Juvenile Division)": "Prov Ct (Juv Div)",
+    "Provincial Court (Small Claims Division)": "Prov Ct (Sm Cl Div)",
+    "Provincial Court (Youth Court)": "Prov Ct (Youth Ct)",
+    "Provincial Court (Youth Division)": "Prov Ct (Youth Div)",
+    "Provincial Offences Court": "Prov Off Ct",
+    "Small Claims Court": "Sm Cl Ct",
+    "Superior Court (Administrative Division)": "Sup Ct (Adm Div)",
+    "Superior Court (Bankruptcy and Insolvency Division)":
+        "Sup Ct (Bank & Ins Div)",
+    "Superior Court (Canada)": "Sup Ct",
+    "Superior Court (Civil Division)": "Sup Ct (Civ Div)",
+    "Superior Court (Criminal and Penal Division)": "Sup Ct (Crim & Pen Div)",
+    "Superior Court (Family Division)": "Sup Ct (Fam Div)",
+    "Superior Court (Small Claims Division)": "Sup Ct (Sm Cl Div)",
+    "Supreme Court (Appellate Division) (Can provincial/Can Provinciale)":
+        "SC (AD)",
+    "Supreme Court (Family Division)": "SC (Fam Div)",
+    "Supreme Court (Queen's Bench Division)": "SC (QB Div)",
+    "Supreme Court (Trial Division)": "SC (TD)",
+    "Supreme Court of Canada": "SCC",
+    "Tax Court of Canada": "TCC",
+    "Tax Review Board": "T Rev B",
+    "Territorial Court": "Terr Ct",
+    "Territorial Court (Youth Court)": "Terr Ct Youth Ct"
+}
+
+b2_3_uk_courts = {
+    "Chancery Court": "Ch",
+    "Court of Justice (Scotland/Écosse)": "Ct Just",
+    "Court of Sessions (Scotland/Écosse)": "Ct Sess",
+    "High Court: Chancery Division (UK/R-U)": "ChD",
+    "High Court; Family Division (UK/R-U)": "FamD",
+    "High Court: Queen's Bench Division (UK/R-U)": "QBD",
+    "High Court of Admiralty": "HC Adm",
+    "High Court of Justice": "HCJ",
+    "House of Lords (England/Angleterre)": "HL (Eng)",
+    "House of Lords (Scotland/Écosse)": "HL (Scot)",
+    "Judicial Committee of the Privy Council": "PC",
+    "Stipendary Magistrate's Court": "Stip Mag Ct"
+}
+
+b2_4_us_courts = {
+    "Administrative Court": "Admin Ct",
+    "Admirality [Court, Division]": "Adm",
+    "Alderman's Court": "Alder Ct",
+    "Appeals Court": "App Ct",
+    "Appellate Court": "App Ct",
+    "Appellate Division": "App Div",
+    "Bankruptcy [Court, Judge]": "Bankr",
+    "Bankruptcy Appellate Panel": "BAP",
+    "Board of Tax Appeals (US/É-U)": "BTA",
+    "Borough Court": "[name] Bor Ct",
+    "Chancery [Court, Division]": "Ch",
+    "Children's Court": "Child Ct",
+    "Circuit Court": "Cir Ct",
+    "Circuit Court and Family Court": "Cir Ct & Fam Ct",
+    "Circuit Court of Appeals (federal US/fédéral, É-U)": "Cir",
+    "Circuit Court of Appeals (state)": "Cir Ct App",
+    "Citizenship Appeals Court (US/É-U)": "Cit AC",
+    "City and Parish Courts": "City & Parish Ct",
+    "City Court": "[name] City Ct",
+    "Civil Appeals": "Civ App",
+    "Civil Court": "Civ Ct",
+    "Civil Court of Record": "Civ Ct Rec",
+    "Claims Court": "Cl Ct",
+    "Commerce Court": "Comm Ct",
+    "Common Pleas": "CP",
+    "Commonwealth Court": "Commw Ct",
+    "Conciliation Court": "Concil Ct",
+    "Constitutional County Court": "Const County Ct",
+    "County Court": "Co Ct",
+    "County Court at Law": "County Ct at Law",
+    "County Court Judges' Criminal Court": "Co Ct J Crim Ct",
+    "County Judge's Court": "County J Ct",
+    "County Recorder's Court": "County Rec Ct",
+    "Court of [General, Special] Sessions": "Ct [Gen, Spec] Sess",
+    "Court of Appeal[s] (state)": "Ct App",
+    "Court of Appeals (federal)": "Cir",
+    "Court of Chancery": "Ct Ch",
+    "Court of Civil Appeals": "Ct Civ App",
+    "Court of Claims": "Ct Cl",
+    "Court of Common Pleas": "Ct Com Pl",
+    "Court of Criminal Appeals": "Ct Crim App",
+    "Court of Customs and Patent Appeals": "CCPA",
+    "Court of Customs Appeals": "Ct Cust App",
+    "Court of Errors": "Ct Err",
+    "Court of Errors and Appeals": "Ct Err & App",
+    "Court of Federal Claims": "Ct Fed Cl",
+    "Court of First Instance": "Ct First Inst",
+    "Court of International Trade": "Ct Intl Trade",
+    "Court of Review": "Ct Rev",
+    "Court of Special Appeals": "Ct Spec App",
+    "Court of Tax Review": "Ct T Rev",
+    "Criminal appeals": "Crim App",
+    "Criminal District Court": "Crim Dist Ct",
+    "Customs Court": "Cust Ct",
+    "District Court (US Federal/É-U fédéral)": "D",
+    "District Court (US states/États des É-U)": "Dist Ct",
+    "District Court of Appeal[s]": "Dist Ct App",
+    "District Justice Court": "Dist Just Ct",
+    "Domestic Relations Court": "Dom Rel Ct",
+    "Emergency Court of Appeal[s]": "Emer Ct App",
+    "Environmental Court": "Env Ct",
+    "Equity [Court, Division]": "Eq",
+    "Family Court": "Fam Ct",
+    "General Sessions Court": "Gen Sess Ct",
+    "High Court": "High Ct",
+    "Housing Court": "Housing Ct",
+    "Intermediate Court of Appeals": "Intermed Ct App",
+    "Justice Court": "J Ct",
+    "Justice of the Peace's Court": "JP Ct",
+    "Juvenile and Family Court": "Juv & Fam Ct",
+    "Juvenile Court": "Juv Ct",
+    "Juvenile Delinquency Court": "Juv Del Ct",
+    "Land Court": "Land Ct",
+    "Law Court": "Law Ct",
+    "Magistrate Court": "Magis Ct",
+    "Magistrate Division": "Magis Div",
+    "Mayor's Court": "Mayor's Ct",
+    "Municipal Court": "[name] Mun Ct",
+    "Municipal Court not of Record": "Mun Ct not Rec",
+    "Municipal Criminal Court of Record": "Mun Crim Ct Rec",
+    "Orphans' Court": "Orphans' Ct",
+    "Parish Court": "[name] Parish Ct",
+    "Police Justice Court": "Police J Ct",
+    "Prerogative Court": "Prerog Ct",
+    "Probate Court": "Prob Ct",
+    "Recorder's Court": "Rec Ct",
+    "Small Claims Court": "Small Cl Ct",
+    "State Court": "State Ct",
+    "Superior Court (US/É-U)": "Super Ct",
+    "Supreme Court (federal)": "US",
+    "Supreme Court (state, US/État, É-U)": "Sup Ct",
+    "Supreme Court, Appellate Division (state, US/État, É-U)":
+        "Sup Ct App Div",
+    "Supreme Court of Appeals": "Sup Ct App",
+    "Supreme Court of Errors": "Sup Ct Err",
+    "Supreme Court of the United States": "USSC",
+    "Supreme Judicial Court": "Sup Jud Ct",
+    "Surrogate Court": "Surr Ct",
+    "Tax Appeals Court": "Tax App Ct",
+    "Tax Court": "TC",
+    "Teen Court": "Teen Ct",
+    "Town Court": "Town Ct",
+    "Traffic Court": "Traffic Ct",
+    "Tribal Court": "[name] Tribal Ct",
+    "Unified Family Court": "Unif Fam Ct",
+    "Water Court": "Water Ct",
+    "Workers Compensation Court": "Workers' Comp Ct",
+    "Youth Court": "Youth Ct"
+}
+
+b2_5_french_courts = {
+    "Conseil constitutionnel (France)": "Cons const",
+    "Conseil d'État (France)": "Cons État",
+    "Cour de cassation: Assemblée plénière (France)": "Cass Ass plén",
+    "Cour de cassation: Chambre commerciale (France)": "Cass com",
+    "Cour de cassation: Chambre criminelle (France)": "Cass crim",
+    "Cour de cassation: Chambre des requêtes (France)": "Cass req",
+    "Cour de cassation: Chambre mixte (France)": "Cass Ch mixte",
+    "Cour de cassation: Chambre sociale (France)": "Cass soc",
+    "Cour de cassation: Chambres réunies (France)": "Cass Ch réun",
+    "Cour de cassation: Deuxième chambre civile (France)": "Cass civ 2e",
+    "Cour de cassation: Première chambre civile (France)": "Cass civ 1e",
+    "Cour de cassation: Troisième chambre civile (France)": "Cass civ 3e",
+    "Cour de magistrat": "C mag",
+    "Cour de révision": "C rév",
+    "Haute Cour de justice": "HCJ",
+    "Justice de Paix (before 1958/avant 1958)": "JP",
+}
+
+b2_6_australian_new_zealand_courts = {
+    "Coroners Court": "Cor Ct",
+    "District Court of Southern Australia": "SADC",
+    "Environment Court": "Env Ct",
+    "Family Court of New Zealand": "Fam Ct NZ",
+    "Federal Court of Australia": "FCA",
+    "High Court of Australia": "HCA",
+    "Labour Court": "Lab Ct",
+    "Magistrates' Court": "Mag Ct",
+    "Magistrates' Court of New Zealand": "Mag Ct NZ",
+    "Maori Appellate Court": "Maori AC",
+    "Maori Land Court": "Maori Land Ct",
+    "New Zealand Court of Appeal": "NZCA",
+    "New Zealand Employment Court": "NZ Emp Ct",
+    "New Zealand High Court": "NZHC",
+    "New Zealand Supreme Court": "NZSC",
+    "New Zealand Youth Court": "NZYC",
+    "Privy Council": "PC",
+    "Supreme Court of New South Wales": "NSWSC",
+    "Supreme Court of New South Wales - Court of Appeal": "NSWCA",
+    "Supreme Court of Queensland": "QSC",
+    "Supreme Court of Queensland - Court of Appeal": "QCA",
+    "Supreme Court of Southern Australia": "SASC",
+    "Supreme Court of Tasmania": "TASSC",
+    "Supreme Court of the Australian Capital Territory": "ACTSC",
+    "Supreme Court of the Northern Territory": "NTSC",
+    "Supreme Court of Victoria": "VSC",
+    "Supreme Court of Victoria - Court of Appeal": "VSCA",
+    "Supreme Court of Western Australia": "WASC",
+    "Supreme Court of Western Australia - Court of Appeal": "WASCA",
+    "Waitangi Tribunal": "Waitangi Trib"
+}
+
+b2_7_south_african_courts = {
+    "Constitutional Court of South Africa": "S Afr Const Ct",
+    "Electoral Court of South Africa": "S Afr Electoral Ct",
+    "High Court of South Africa": "S Afr HC",
+    "Labour Court of Appeal of South Africa": "S Afr Labour CA",
+    "Labour Court of South Africa": "S Afr Labour Ct",
+    "Land Claims Court of South Africa": "S Afr Land Claims Ct",
+    "Supreme Court of Appeal of South Africa": "S Afr SC"
+}
+
+b3_neutral_citations_en = [
+    ["Jurisdiction", "Name of the court", "Abbreviation", "Implementation"],
+    ["Canada", "Supreme Court of Canada", "SCC", "2000-01"],
+    ["Canada", "Federal Court", "FC", "2001-02"],
+    ["Canada", "Federal Court of Appeal", "FCA", "2001-02"],
+    ["Canada", "Tax Court of Canada", "TCC", "2003-01"],
+    ["Canada", "Court Martial Appeal Court of Canada", "CMAC", "2001-10"],
+    ["Alberta", "Court of Appeal", "ABCA", "1998-01"],
+    ["Alberta", "Supreme Court of Alberta Appeal Division", "ALTASCAD",
+        "1970-01"],
+    ["Alberta", "Court of Queen's Bench", "QB", "1998-01"],
+    ["Alberta", "Provincial Court", "ABPC", "1998-01"],
+    ["British Columbia", "Court of Appeal", "BCCA", "1999-01"],
+    ["British Columbia", "Supreme Court of British Columbia", "BCSC", "2000-01"],
+    ["British Columbia", "Provincial Court", "BCPC", "1999-02"],
+    ["Manitoba", "Court of Appeal", "MBCA", "2000-03"],
+    ["Manitoba", "Court of Queen's Bench", "MBQB", "2000-04"],
+    ["Manitoba", "Provincial Court", "MBPC", "2007-01"],
+    ["New Brunswick", "Court of Appeal", "NBCA", "2001-05"],
+    ["New Brunswick", "Court of Queen's Bench", "NBQB", "2002-01"],
+    ["New Brunswick", "Provincial Court", "NBPC", "2002-12"],
+    ["Newfoundland", "Supreme Court of Newfoundland, Court of Appeal", "NFCA",
+        "2001-01"],
+    ["Newfoundland and Labrador",
+        "Supreme Court of Newfoundland, Court of Appeal", "NLCA", "2001-01"],
+    ["Newfoundland and Labrador",
+     "Supreme Court of Newfoundland and Laborador, Trial Division", "NLSCTD",
+        "2003-07 - 2004-11"],
+    ["Newfoundland and Labrador",
+        "Supreme Court of Newfoundland and Laborador, Trial Division", "NLTD",
+        "2004-11"],
+    ["Northwest Territories", "Court of Appeal for the Northwest Territories",
+        "NWTCA", "1999-12"],
+    ["Northwest Territories", "Supreme Court of the Northwest Territories",
+        "NWTSC", "1999-10"],
+    ["Northwest Territories", "Territorial Court of the Northwest Territories",
+        "NWTTC", "1999-10"],
+    ["Nova Scotia", "Court of Appeal", "NSCA", "1999-09"],
+    ["Nova Scotia", "Supreme Court of Nova Scotia", "NSSC", "2000-12"],
+    ["Nova Scotia", "Nova Scotia Family Court", "NSFC", "2006-01"],
+    ["Nova Scotia", "Provincial Court", "NSPC", "2001-03"],
+    ["Nunavut", "Nunavut Court of Justice", "NUCJ", "2001-01"],
+    ["Nunavut", "Court of Appeal for Nunavut", "NUCA", "2006-05"],
+    ["Ontario", "Court of Appeal", "ONCA", "2007-07"],
+    ["Ontario", "Superior Court of Justice", "ONSC", "2010-01"],
+    ["Ontario", "Ontario Court of Justice", "ONCJ", "2004-01"],
+    ["Prince Edward Island", "Supreme Court, Appeal Division", "PECA",
+        "2000-01"],
+    ["Prince Edward Island", "Supreme Court, Trial Division", "PESC",
+        "2000-01"],
+    ["Quebec", "Court of Appeal of Quebec", "QCCA", "2005-01"],
+    ["Quebec", "Superior Court of Quebec", "QCCS", "2006-01"],
+    ["Quebec", "Court of Quebec", "QCCQ", "2006-01"],
+    ["Quebec", "Tribunal des professions du Quebec", "QCTP", "1999-01"],
+    ["Saskatchewan", "Court of Appeal for Saskatchewan", "SKCA", "2000-01"],
+    ["Saskatchewan", "Court of Queen's Bench", "SKQB", "1999-01"],
+    ["Saskatchewan", "Provincial Court", "SKPC", "2002-01"],
+    ["Yukon", "Court of Appeal", "YKCA", "2000-03"],
+    ["Yukon", "Supreme Court of the Yukon Territory", "YKSC", "2000-03"],
+    ["Yukon", "Territorial Court of Yukon", "YKTC", "1999-12"],
+    ["Yukon", "Small Claims Court", "YKSM", "2004-05"]
+]
+
+b3_neutral_citations_fr = [
+    ["Juridiction", "Nom de la cour", "Abréviation", "En vigueur"],
+    ["Canada", "Cour suprême du Canada", "CSC", "2000-01"],
+    ["Canada", "Cour fédérale", "CF/CFPI", "2001-02"],
+    ["Canada", "Cour d'appel fédérale", "CAF", "2001-02"],
+    ["Canada", "Cour canadienne de l'impôt", "CCI", "2003-01"],
+    ["Canada", "Cour d'appel de la cour martiale du Canada", "CACMC",
+        "2001-10"],
+    ["Alberta", "Court of Appeal", "ABCA", "1998-01"],
+    ["Alberta", "Court of Queen's Bench", "ABQB", "1998-01"],
+    ["Alberta", "Provincial Court", "ABPC", "1998-01"],
+    ["Colombie-Britannique", "Court of Appeal", "BCCA", "1999-01"],
+    ["Colombie-Britannique", "Supreme Court of British Columbia", "BCSC",
+        "2000-01"],
+    ["Colombie-Britannique", "Provincial Court", "BCPC", "1999-02"],
+    ["Île-du-Prince-Édouard", "Supreme Court, Appeal Division", "PECA",
+        "2000-01"],
+    ["Île-du-Prince-Édouard", "Supreme Court, Trial Division", "PESC",
+        "2000-01"],
+    ["Manitoba", "Cour d'appel", "MBCA", "2000-03"],
+    ["Manitoba", "Cour du Banc de la Reine", "MBQB", "2000-04"],
+    ["Manitoba", "Cour provinciale du Manitoba", "MBPC", "2007-01"],
+    ["Nouveau-Brunswick", "Cour d'appel du Nouveau-Brunswick", "NBCA",
+        "2001-05"],
+    ["Nouveau-Brunswick", "Cour du Banc de la Reine du Nouveau-Brunswick",
+        "NBQB", "2002-01"],
+    ["Nouveau-Brunswick", "Cour provinciale", "NBPC", "2002-12"],
+    ["Nouvelle-Écosse", "Nova Scotia Court of Appeal", "NSCA", "1999-09"],
+    ["Nouvelle-Écosse", "Supreme Court of Nova Scotia", "NSSC", "2000-12"],
+    ["Nouvelle-Écosse", "Nova Scotia Family Court", "NSFC", "2006-01"],
+    ["Nouvelle-Écosse", "Cour provinciale", "NSPC", "2001-03"],
+    ["Nunavut", "Cour de justice du Nunavut", "NUCJ", "2001-01"],
+    ["Nunavut", "Cour d'appel du Nunavut", "NUCA", "2006-05"],
+    ["Ontario", "Cour d'appel de l'Ontario", "ONCA", "2007-07"],
+    ["Ontario", "Cour supérieure l'Ontario", "ONSC", "2010-01"],
+    ["Ontario", "Cour de justice de l'Ontario", "ONCJ", "2004-01"],
+    ["Québec", "Court of Appeal of Québec", "QCCA", "2005-01"],
+    ["Québec", "Cour d'appel du Québec", "QCCA", "2005-01"],
+    ["Québec", "Cour supérieure du Québec", "QCCS", "2006-01"],
+    ["Québec", "Cour du Québec", "QCCQ", "2006-01"],
+    ["Québec", "Tribunal des professions du Québec", "QCTP", "1999-01"],
+    ["Saskatchewan", "Court of Appeal for Saskatchewan", "SKCA", "2000-01"],
+    ["Saskatchewan", "Court of Queen's Bench", "SKQB", "1999-01"],
+    ["Saskatchewan", "Provincial Court", "SKPC", "2002-01"],
+    ["Terre-Neuve",
+        "Supreme Court of Newfoundland and Labrador, Court of Appeal", "NFCA",
+        '2001-01 - 2002-01'],
+    ["Terre-Neuve-et-Labrador",
+        "Supreme Court of Newfoundland and Labrador, Court of Appeal", "NLCA",
+        "2001-01"],
+    ["Terre-Neuve-et-Labrador",
+     "Supreme Court of Newfoundland and Laborador, Trial Division", "NLSCTD",
+        "2003-07 - 2004-11"],
+    ["Terre-Neuve-et-Labrador",
+        "Supreme Court of Newfoundland and Labor, Trial Division", "NLTD",
+        "2004-11"],
+    ["Territoires du Nord-Ouest", "Cour d'appel des Territoires du Nord-Ouest",
+        "NWTCA", "1999-12"],
+    ["Territoires du Nord-Ouest", "Cour suprême des Territoires du Nord-Ouest",
+        "NWTSC", "1999-10"],
+    ["Territoires du Nord-Ouest",
+        "Cour territoriale des Territoires du Nord-Ouest", "NWTTC", "1999-10"],
+    ["Yukon", "Cour d'appel", "YKCA", "2000-03"],
+    ["Yukon", "Cour suprême du territoire du Yukon", "YKSC", "2000-03"],
+    ["Yukon", "Cour territoriale du Yukon", "YKTC", "1999-12"],
+    ["Yukon", "Cour des petites créances", "YKSM", "2004-05"]
+]
+
+'''
+Appendix C
+Codifies the caselaw reporter abbreviations used in the McGill 9th edition as
+numpy arrays.
+'''
+
+c1_canadian_official_reporters = {
+    "Canada Law Reports: Exchequer Court of Canada": "Ex CR",
+    "Reports of the Exchequer Court of Canada": "Ex CR",
+    "Federal Court Reports": "FCR",
+    "Canada Supreme Court Reports": "SCR",
+    "Canada Law Reports: Supreme Court of Canada": "SCR",
+    "Recueils des arrêts de la Cour de l'Échiquier": "RC de l'É",
+    "Rapports judiciaires du Canada: Cour de l'Échiquier": "RC de l'É",
+    "Recueils des arrêts de la Cour fédérale du Canada": "RCF",
+    "Recueils de arrêts de la Cour suprême du Canada": "RCS",
+    "Rapports judiciares du Canada : Cour suprême": "RCS"
+}
+
+c2_canadian_preferred_reporters = [
+    ["Alta LR", "Alberta Law Reports", "Can (AB)"],
+    ["AR", "Alberta Reports", "Can (AB)"],
+    ["BCLR", "British Columbia Law Reports", "Can (BC)"],
+    ["BCLR (2d)", "British Columbia Law Reports (Second Series)"],
+    ["BCLR (3d)", "British Columbia Law Reports (Third Series)"],
+    ["BCLR (3d)", "British Columbia Law Reports (Third Series)",
+        "Can (BC)"],
+    ["BCLR (4th)", "British Columbia Law Reports (Fourth Series)",
+        "Can (BC)"],
+    ["BCLR (5th)", "British Columbia Law Reports (Fifth Series)",
+        "Can (BC)"],
+    ["A", "Atlantic Reporter", "US/É-U", "No/Non"],
+    ["BR", 
+        "Recueils de jurisprudence du Québec: Cour du Banc de la Reine/du Roi",
+        "Can (QC)"],
+    ["BR", 
+        "Rapports judiciaires officiels de Québec: Cour du Banc de la Reine/du\
+        Roi", "Can (QC)"],
+    ["CA", "Recueil de jurisprudence du Québec: Cour d'appel", "Can (QC)",
+        "Yes/Oui"],
+    ["CBES", "Recueils de jurisprudence du Québec: Cour du bien-être social",
+        "Can (QC)"],
+    ["CF", "Recueil des arrêts de la Cour fédérale", "Can (FC)"],
+    ["CS", "Rapports judiciaires de Québec: Cour supérieure", "Can (QC)",
+        "Yes/Oui"],
+    ["CS", "Recueils de jurisprudence du Québec: Cour supérieure", "Can (QC)",
+        "Yes/Oui"],
+    ["CSP", "Recueils de jurisprudence du Québec: Cour des Sessions de la paix",
+        "Can (QC)"],
+    ["DLR", "Dominion Law Reports", "Can"],
+    ["DLR (2d)", "Dominion Law Reports (Second Series)", "Can"],
+    ["DLR (3d)", "Dominion Law Reports (Third Series)", "Can"],
+    ["DLR (4th)", "Dominion Law Reports (Fourth Series)", "Can"],
+    ["Ex CR", "Exchequer Court of Canada Reports", "Can"],
+    ["Ex CR", "Canada Law Reports: Exchequer Court", "Can"],
+    ["FC", "Canada Federal Court Reports", "Can"],
+    ["FCR", "Federal Court Reports", "Can"],
+    ["Man R", "Manitoba Reports", "Can (MB)"],
+    ["Man R (2d)", "Manitoba Reports (Second Series)", "Can (MB)"],
+    ["NBR", "New Brunswick Reports", "Can (NB)"],
+    ["NBR (2d)", "New Brunswick Reports (Second Series)", "Can (NB)"],
+    ["Nfld & PEIR", "Newfoundland and Prince Edward Island Reports",
+        "Can (NL/PE)"],
+    ["Nfld LR", "Newfoundland Law Reports", "Can (NL)"],
+    ["NSR", "Nova Scotia Reports", "Can (NS)"],
+    ["NSR (2d)", "Nova Scotia Reports (Second Series)", "Can (NS)"],
+    ["NWTR", "Northwest Territories Reports", "Can (NT)"],
+    ["OAR", "Ontario Appeal Reports", "Can (ON)"],
+    ["OLR", "Ontario Law Reports", "Can (ON)"],
+    ["OR", "Ontario Reports", "Can (ON)"],
+    ["OR (2d)", "Ontario Reports (Second Series)", "Can (ON)"],
+    ["OR (3d)", "Ontario Reports (Third Series)", "Can (ON)"],
+    ["RC de l'É", "Recueils des arrêts de la Cour de l'Échiquier",
+        "Can"],
+    ["RC de l'É", "Rapports judiciaires du Canada: Cour de l'Échiquier",
+        "Can"],
+    ["RCFC", "Recueil des decisions des Cour fédérales", "Can"],
+    ["RCS", "Rapports judiciaires du Canada: cour suprême", "Can"],
+    ["RCS", "Recueil des arrêts de la Cour suprême du Canada", "Can",
+        "Yes/Oui"],
+    ["RJQ", "Recueils de jurisprudence du Québec", "Can (QC)"],
+    ["RNB (2d)", "Recueil des arrêts du Nouveau Brunswick (deuxième série)\
+        (1825-1928: voir *New Brunswick Reports*)", "Can (NB)"],
+    ["Sask LR", "Saskatchewan Law Reports", "Can (SK)"],
+    ["Sask R", "Saskatchewan Reports", "Can (SK)"],
+    ["SCR", "Canada Law Reports: Supreme Court of Canada", "Can"],
+    ["SCR", "Canada Supreme Court Reports", "Can"],
+    ["Terr LR", "Territories Law Reports", "Can (NT)"],
+    ["TJ", "Recueils de jurisprudence du Québec: Tribunal de la jeunesse",
+        "Can (QC)"],
+    ["WWR", "Western Weekly Reports", "Can"],
+    ["WWR (NS)", "Western Weekly Reports (New Series)", "Can"],
+    ["YR", "Yukon Reports", "Can (YT)"],
+]
+
+c2_authoritative_reporters = [
+
+]
+'''
+Start with the starred reporters and add the rest later.
+'''
+
+c2_unofficial_reporters = [
+    ["Abbreviation/Abréviation", "Title of Reporter/Titre du recueil",
+        "Jurisdiction/Indication géographique", "Preferred"],
+    ["Alta LR", "Alberta Law Reports", "Can (AB)"],
+    ["AR", "Alberta Reports", "Can (AB)"],
+    ["BCLR", "British Columbia Law Reports", "Can (BC)"],
+    ["BCLR (2d)", "British Columbia Law Reports (Second Series)",
+        "Can (BC)"],
+    ["BCLR (3d)", "British Columbia Law Reports (Third Series)",
+        "Can (BC)"],
+    ["BCLR (4th)", "British Columbia Law Reports (Fourth Series)",
+        "Can (BC)"],
+    ["BCLR (5th)", "British Columbia Law Reports (Fifth Series)",
+        "Can (BC)"],
+    ["A", "Atlantic Reporter", "US/É-U", "No/Non"],
+    ["BR",
+        "Recueils de jurisprudence du Québec: Cour du Banc de la Reine/du Roi",
+        "Can (QC)"],
+    ["BR",
+        "Rapports judiciaires officiels de Québec: Cour du Banc de la Reine/du\
+        Roi", "Can (QC)"],
+    ["CA", "Recueil de jurisprudence du Québec: Cour d'appel", "Can (QC)",
+        "Yes/Oui"],
+    ["CBES", "Recueils de jurisprudence du Québec: Cour du bien-être social",
+        "Can (QC)"],
+    ["CF", "Recueil des arrêts de la Cour fédérale", "Can (FC)"],
+    ["CS", "Rapports judiciaires de Québec: Cour supérieure", "Can (QC)",
+        "Yes/Oui"],
+    ["CS", "Recueils de jurisprudence du Québec: Cour supérieure", "Can (QC)",
+        "Yes/Oui"],
+    ["CSP", "Recueils de jurisprudence du Québec: Cour des Sessions de la paix",
+        "Can (QC)"],
+    ["DLR", "Dominion Law Reports", "Can"],
+    ["DLR (2d)", "Dominion Law Reports (Second Series)", "Can"],
+    ["DLR (3d)", "Dominion Law Reports (Third Series)", "Can"],
+    ["DLR (4th)", "Dominion Law Reports (Fourth Series)", "Can"],
+    ["Ex CR", "Exchequer Court of Canada Reports", "Can"],
+    ["Ex CR", "Canada Law Reports: Exchequer Court", "Can"],
+    ["FC", "Canada Federal Court Reports", "Can"],
+    ["FCR", "Federal Court Reports", "Can"],
+    ["Man R", "Manitoba Reports", "Can (MB)"],
+    ["Man R (2d)", "Manitoba Reports (Second Series)", "Can (MB)"],
+    ["NBR", "New Brunswick Reports", "Can (NB)"],
+    ["NBR (2d)", "New Brunswick Reports (Second Series)", "Can (NB)"],
+    ["Nfld & PEIR", "Newfoundland and Prince Edward Island Reports",
+        "Can (NL/PE)"],
+    ["Nfld LR", "Newfoundland Law Reports", "Can (NL)"],
+    ["NSR", "Nova Scotia Reports", "Can (NS)"],
+    ["NSR (2d)", "Nova Scotia Reports (Second Series)", "Can (NS)"],
+    ["NWTR", "Northwest Territories Reports", "Can (NT)"],
+    ["OAR", "Ontario Appeal Reports", "Can (ON)"],
+    ["OLR", "Ontario Law Reports", "Can (ON)"],
+    ["OR", "Ontario Reports", "Can (ON)"],
+    ["OR (2d)", "Ontario Reports (Second Series)", "Can (ON)"],
+    ["OR (3d)", "Ontario Reports (Third Series)", "Can (ON)"],
+    ["RC de l'É", "Recueils des arrêts de la Cour de l'Échiquier",
+        "Can"],
+    ["RC de l'É", "Rapports judiciaires du Canada: Cour de l'Échiquier",
+        "Can"],
+    ["RCFC", "Recueil des decisions des Cour fédérales", "Can"],
+    ["RCS", "Rapports judiciaires du Canada: cour suprême", "Can"],
+    ["RCS", "Recueil des arrêts de la Cour suprême du Canada", "Can",
+        "Yes/Oui"],
+    ["RJQ", "Recueils de jurisprudence du Québec", "Can (QC)"],
+    ["RNB (2d)", "Recueil des arrêts du Nouveau Brunswick (deuxième série)\
+        (1825-1928: voir *New Brunswick Reports*)", "Can (NB)"],
+    ["Sask LR", "Saskatchewan Law Reports", "Can (SK)"],
+    ["Sask R", "Saskatchewan Reports", "Can (SK)"],
+    ["SCR", "Canada Law Reports: Supreme Court of Canada", "Can"],
+    ["SCR", "Canada Supreme Court Reports", "Can"],
+    ["Terr LR", "Territories Law Reports", "Can (NT)"],
+    ["TJ", "Recueils de jurisprudence du Québec: Tribunal de la jeunesse",
+        "Can (QC)"],
+    ["WWR", "Western Weekly Reports", "Can"],
+    ["WWR (NS)", "Western Weekly Reports (New Series)", "Can"],
+    ["YR", "Yukon Reports", "Can (YT)"],
+    ["A (2d)", "Atlantic Reporter (Second Series)", "US/É-U", "No/Non"],
+    ["A (3d)", "Atlantic Reporter (Third Series)", "US/É-U", "No/Non"],
+    ["A & N", "Alcock and Napier's Reports", "I", "No/Non"],
+    ["A Crim R", "Australian Criminal Reports", "Austl", "No/Non"],
+    ["A Intl LC", "American International Law Cases", "US/É-U", "No/Non"],
+    ["A Intl LC (2d)", "American International Law Cases (Second Series)",
+        "US/É-U", "No/Non"],
+    ["A Intl LC (3d)", "American International Law Cases (Third Series)",
+        "US/É-U", "No/Non"],
+    ["A Intl LC (4th)", "American International Law Cases (Fourth Series)",
+        "US/É-U", "No/Non"],
+    ["AALR", "Australian Argus Law Reports", "Austl", "No/Non"],
+    ["AAR", "Administrative Appeal Reports", "Austl", "No/Non"],
+    ["AAS", "Arbitrage — Santé et services sociaux", "Can (QC)", "No/Non"],
+    ["ABC", "Australian Bankruptcy Cases", "Austl", "No/Non"],
+    ["ABD", "Canada, Public Service Commission, Appeals and Investigation\
+        Branch, Appeal Board Decisions", "Can", "No/Non"],
+    ["AC", "Law Reports, Appeal Cases", "UK/R-U", "No/Non"],
+    ["ACA", "Australian Corporate Affairs Reporter", "Austl", "No/Non"],
+    ["ACF", "Jugements de la Cour fédérale du Canada (QL)", "Can", "No/Non"],
+    ["ACI", "Jugements de la Cour canadienne de l'impôt (QL)", "Can", "No/Non"],
+    ["ACLC", "Australia Company Law Cases", "Austl", "No/Non"],
+    ["ACLR", "Australian Company Law Reports", "Austl", "No/Non"],
+    ["ACLR", "Australian Construction Law Reporter", "Austl", "No/Non"],
+    ["ACS", "Jugements de la Cour suprême du Canada (QL)", "Can", "No/Non"],
+    ["ACSR", "Australian Corporations and Securities Reports", "Austl",
+        "No/Non"],
+    ["Act", "Acton's Prize Cases (ER vol 12)", "US/É.-U.", "No/Non"],
+    ["ACTR", "Australian Capital Territory Reports", "Austl (ACT)", "No/Non"],
+    ["ACWS", "All Canada Weekly Summaries", "Can", "No/Non"],
+    ["ACWS (2d)", "All Canada Weekly Summaries (Second Series)", "Can",
+        "No/Non"],
+    ["ACWS (3d)", "All Canada Weekly Summaries (Third Series)", "Can",
+        "No/Non"],
+    ["AD", "South African Law Reports, Appellate Division", "S Afr/Afr du Sud",
+        "No/Non"],
+    ["Ad & El", "Adolphus & Ellis's Reports (ER vols 110-113)", "US/É-U",
+        "No/Non"],
+    ["Adam", "Adam's Justiciary Cases", "Scot", "No/Non"],
+    ["Add", "Addams's Reports (ER vol 162)", "US/É-U", "No/Non"],
+    ["ADIL", "Annual Digest and Reports of Public International Law Cases",
+        "Intl", "No/Non"],
+    ["Admin LR", "Administrative Law Reports", "Can", "No/Non"],
+    ["Admin LR (2d)", "Administrative Law Reports (Second Series)", "Can",
+        "No/Non"],
+    ["Admin LR (3d)", "Administrative Law Reports (Third Series)", "Can",
+        "No/Non"],
+    ["Admin LR (4th)", "Administrative Law Reports (Fourth Series)", "Can",
+        "No/Non"],
+    ["Admin LR (5th)", "Administrative Law Reports (Fifth Series)", "Can",
+        "No/Non"],
+    ["ADR", "Australian De Facto Relationship Law", "Austl", "No/Non"],
+    ["AEBCBN", "Australian Business & Estate Planning Case Notes", "Austl",
+        "No/Non"],
+    ["AEBR", "Australian Business & Assets Planning Reporter", "Austl",
+        "No/Non"],
+    ["AEUB", "Alberta Energy and Utilities Board Decisions", "Can (AB)",
+        "No/Non"],
+    ["Afr LR (Comm)", "African Law Reports: Commercial", "Afr", "No/Non"],
+    ["Afr LR (Mal)", "African Law Reports: Malawi Series",
+        "E Afr/Afr de l'est", "No/Non"],
+    ["Afr LR (SL)", "African Law Reports: Sierra Leone Series",
+        "W Afr/Afr de l'ouest", "No/Non"],
+    ["AFTR", "Australian Federal Tax Reporter", "Austl", "No/Non"],
+    ["AIA", "Affaires d'immigration en appel", "Can", "No/Non"],
+    ["AIA (2e)", "Affaires d'imigration en appel (nouvelle série)", "Can",
+        "No/Non"],
+    ["AILR", "Australian Indigenous Law Reporter", "Austl", "No/Non"],
+    ["AIN", "Australian Industrial and Intellectual Property Cases",
+        "Austl", "No/Non"],
+    ["AJ", "Alberta Judgments (QL)", "Can (AB)", "No/Non"],
+    ["AJDA", "Actualité juridique, droit administratif", "France", "No/Non"],
+    ["AJDI", "Actualité juridique, droit immobilier", "France", "No/Non"],
+    ["AJDQ", "Annuaire de jurisprudence et de doctrine du Québec", "Can (QC)",
+        "No/Non"],
+    ["AJPI", "Actualité juridique, propriété immobelière", "France", "No/Non"],
+    ["AJQ", "Annuaire de jurisprudence du Québec", "Can (QC)", "No/Non"],
+    ["Al", "Aleyn's Select Cases (ER vol 82)", "UK/R-U", "No/Non"],
+    ["Ala", "Alabama Reports", "US/É-U", "No/Non"],
+    ["Ala (NS)", "Alabama Reports (New Series)", "US/É-U", "No/Non"],
+    ["Alaska Fed", "Alaska Federal Reports", "US/É-U", "No/Non"],
+    ["Alaska R", "Alaska Reports", "US/É-U", "No/Non"],
+    ["ALD", "Administrative Law Decisions", "Austl", "No/Non"],
+    ["ALJR", "Australian Law Journal Reports", "Austl", "No/Non"],
+    ["All ER", "All England Reports", "UK/R-U", "No/Non"],
+    ["All ER (Comm)", "All England Law Reports (Commercial Cases)", "UK/R-U",
+        "No/Non"],
+    ["All ER (EC)", "All England Law Reports (European Cases)", "UK/R-U",
+        "No/Non"],
+    ["All ER Rep", "All England Reports Reprints", "UK/R-U", "No/Non"],
+    ["All ER Rep Ext", "All England Reprints Extension Volumes", "UK/R-U",
+        "No/Non"],
+    ["ALLR", "Australian Labour Law Reporter", "Austl", "No/Non"],
+    ["ALMD", "Australian Legal Monthly Digest", "Austl", "No/Non"],
+    ["ALR", "American Law Reports", "US/É-U", "No/Non"],
+    ["ALR (2d)", "American Law Reports (Second Series)", "US/É-U", "No/Non"],
+    ["ALR (3d)", "American Law Reports (Third Series)", "US/É-U", "No/Non"],
+    ["ALR (4th)", "American Law Reports (Fourth Series)", "US/É-U", "No/Non"],
+    ["ALR (5th)", "American Law Reports (Fifth Series)", "US/É-U", "No/Non"],
+    ["ALR", "Argus Law Reports", "Austl", "No/Non"],
+    ["ALR", "Australian Law Reports", "Austl", "No/Non"],
+    ["Alta BAA", "Alberta Board of Arbitration, Arbitrations under the Alberta\
+        Labour Act", "Can (AB)", "No/Non"],
+
+]
@@ -1,33 +1,44 @@
 from ..models import Citation
+from .api_calls import canonical_key, split_url
 
-def save_citation(citation_data, url, result):
+def citation_attributes(citation_data, url, result):
     '''
-    Save the data from the API call to the Django database.
+    Returns the Citation fields for a case's CanLII API data, the URL it was
+    requested with and its McGill citation.
     '''
-    
-    # Create a new citation object.
-    citation = Citation()
-    url_split = url.split("/")
+
+    _, jurisdiction, court, *_ = split_url(url)
 
     # Set the citation's attributes.
-    citation.url = url
-    citation.short_url = citation_data["url"]
-    citation.language = citation_data["language"]
-    citation.databaseId = citation_data["databaseId"]
-    citation.case_jurisdiction = url_split[4]
-    citation.court = url_split[5]
-    citation.caseId = citation_data["caseId"]
-    citation.citation = citation_data["citation"]
-    citation.decisionDate = citation_data["decisionDate"]
-    citation.title = citation_data["title"]
-    citation.docketNumber = citation_data["docketNumber"]
-    citation.keywords = citation_data["keywords"].split(" — ")
-    citation.mcgill_citation = result
+    return {
+        "url": url,
+        "short_url": citation_data["url"],
+        "language": citation_data["language"],
+        "databaseId": citation_data["databaseId"],
+        "case_jurisdiction": jurisdiction,
+        "court": court,
+        "caseId": citation_data["caseId"],
+        "citation": citation_data["citation"],
+        "decisionDate": citation_data["decisionDate"],
+        "title": citation_data["title"],
+        "docketNumber": citation_data["docketNumber"],
+        "keywords": citation_data["keywords"].split(" — "),
+        "mcgill_citation": result,
+    }
+
+def save_citation(citation_data, url, result):
+    '''
+    Save the data from the API call to the Django database. If the case is
+    already stored, the existing row is returned instead; the insert is an
+    atomic get-or-create on the canonical key, so two workers saving the same
+    case at once can't create duplicate rows.
+    '''
+    attributes = citation_attributes(citation_data, url, result)
 
-    # Save the citation to the database.
-    citation.save()
+    # Save the citation to the database, or fetch the row another request
+    # saved first.
+    citation, created = Citation.objects.get_or_create(
+        canonical_key=canonical_key(url), defaults=attributes)
 
     # Return the citation object.
     return citation
-
-
@@ -0,0 +1,336 @@
+'''
+Concurrent CanLII fetcher.
+
+Every CanLII call goes through a single pooled HTTP session, so that repeated
+calls reuse open connections instead of paying for a new TLS handshake each
+time. Batches of cases are fetched in parallel by a bounded pool of worker
+threads, so a batch of misses takes roughly as long as its slowest call. Every
+call is metered by the shared rate limiter in rate_limit.py, retried with
+backoff when CanLII is briefly unavailable, and guarded by the circuit breaker
+in circuit_breaker.py.
+
+afetch_case is the async version used by the ASGI request path. It sends calls
+through an httpx client shared by every request on the event loop, so a call
+waiting on CanLII costs a coroutine rather than a thread.
+'''
+import asyncio
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .api_calls import case_browse_url, case_info
+from .circuit_breaker import allow_request, record_failure, record_success, release_trial
+from .metrics import count_canlii_error, observe_canlii_request
+from .rate_limit import RateLimitExceeded, aacquire, acquire
+
+# Responses worth retrying: rate limited or a server-side error
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+# One httpx client per event loop, since clients can't be shared between loops
+_async_clients = weakref.WeakKeyDictionary()
+
+
+class FetchResult(NamedTuple):
+    '''
+    The outcome of a single caseBrowse call. On success, data holds the
+    decoded JSON and error is None. On failure, data is None and error
+    describes what went wrong.
+    '''
+    url: str
+    data: dict | None
+    status: int | None
+    error: str | None
+    elapsed: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def get_session() -> requests.Session:
+    '''
+    Returns the process-wide CanLII session, creating it on first use. The
+    connection pool is sized to match the fetcher's worker pool.
+    '''
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = settings.CANLII_FETCH_WORKERS
+                session = requests.Session()
+                # http:// is only used by stand-in servers in load tests
+                for prefix in ("https://", "http://"):
+                    session.mount(prefix, HTTPAdapter(
+                        pool_connections=1, pool_maxsize=pool_size))
+                _session = session
+    return _session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    '''
+    Returns the running event loop's CanLII client, creating it on first use.
+    Under an ASGI worker there is a single loop, so every request shares the
+    client's connection pool.
+    '''
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(limits=httpx.Limits(
+            max_connections=settings.CANLII_ASYNC_CONNECTIONS,
+            max_keepalive_connections=settings.CANLII_FETCH_WORKERS))
+        _async_clients[loop] = client
+    return client
+
+
+def get_timeout() -> tuple[float, float]:
+    '''
+    Returns the (connect, read) timeout used for CanLII calls.
+    '''
+    return settings.CANLII_CONNECT_TIMEOUT, settings.CANLII_READ_TIMEOUT
+
+
+def backoff_delay(attempt: int, retry_after: float | None = None) -> float:
+    '''
+    Returns how long to wait before a retry. The delay grows exponentially
+    with each attempt and is jittered so that workers retrying at the same
+    time spread out. A Retry-After header from CanLII is respected.
+    '''
+    delay = min(settings.CANLII_BACKOFF_MAX,
+                settings.CANLII_BACKOFF * 2 ** (attempt - 1))
+    delay = random.uniform(delay / 2, delay)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def get_retry_after(response) -> float | None:
+    '''
+    Reads a Retry-After header given in seconds, if any.
+    '''
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+def fetch_case(url: str, timeout: tuple[float, float] | None = None) -> FetchResult:
+    '''
+    Fetches a single case's metadata from the CanLII API. Never raises for
+    network or decoding errors; they are reported in the result instead.
+
+    Timeouts, connection errors, 429s and 5xx responses are retried up to
+    CANLII_MAX_RETRIES times. Calls fail fast while the circuit breaker is open
+    (see circuit_breaker.py).
+    '''
+    api_elements = case_info(url)
+    if api_elements is None:
+        return FetchResult(url, None, None, "Invalid CanLII URL", 0)
+    return fetch_api(url, case_browse_url(*api_elements), timeout)
+
+
+def fetch_api(url: str, api_url: str,
+              timeout: tuple[float, float] | None = None) -> FetchResult:
+    '''
+    Calls the CanLII API at api_url, with the retries, rate limiting and
+    circuit breaker described in fetch_case. The result is reported under
+    url, eg the CanLII URL of the case being fetched.
+    '''
+    started = time.monotonic()
+
+    def failed(error, status=None, reason=None):
+        if reason is not None:
+            count_canlii_error(reason)
+        return FetchResult(url, None, status, error, time.monotonic() - started)
+
+    allowed = allow_request()
+    if not allowed:
+        return failed("CanLII is unavailable, try again shortly",
+                      reason="breaker_open")
+
+    status = None
+    for attempt in range(settings.CANLII_MAX_RETRIES + 1):
+        # Waits for the shared rate limiter (see rate_limit.py)
+        try:
+            acquire()
+        except RateLimitExceeded as limit_error:
+            # Gives up like when the retries run out, but if CanLII wasn't
+            # called at all a half-open trial has no outcome to report
+            if attempt == 0:
+                release_trial(allowed)
+            else:
+                record_failure(error)
+            return failed(str(limit_error), status, reason="rate_limited")
+
+        retry_after = None
+        request_started = time.monotonic()
+        try:
+            response = get_session().get(api_url, timeout=timeout or get_timeout())
+        except requests.Timeout:
+            observe_canlii_request(None, time.monotonic() - request_started)
+            error = "CanLII timed out"
+            reason = "timeout"
+        except requests.RequestException as request_error:
+            observe_canlii_request(None, time.monotonic() - request_started)
+            error = f"CanLII request failed: {request_error.__class__.__name__}"
+            reason = "connection"
+        else:
+            status = response.status_code
+            observe_canlii_request(status, time.monotonic() - request_started)
+            if status not in RETRY_STATUSES:
+                break
+            error = f"CanLII returned {status}"
+            reason = f"http_{status}"
+            retry_after = get_retry_after(response)
+
+        if attempt == settings.CANLII_MAX_RETRIES:
+            record_failure(error)
+            return failed(error, status, reason)
+
+        delay = backoff_delay(attempt + 1, retry_after)
+        if delay > settings.CANLII_BACKOFF_MAX:
+            # CanLII asked for a longer pause than a request can afford
+            record_failure(error)
+            return failed(error, status, reason)
+        time.sleep(delay)
+
+    if status != 200:
+        record_success()
+        return failed(f"CanLII returned {status}", status, f"http_{status}")
+
+    # Converts the JSON file to a Python dictionary
+    try:
+        data = response.json()
+    except ValueError:
+        record_failure("CanLII returned invalid JSON")
+        return failed("CanLII returned invalid JSON", status, "invalid_json")
+
+    record_success()
+    return FetchResult(url, data, status, None, time.monotonic() - started)
+
+
+def fetch_cases(urls: list[str], max_workers: int | None = None,
+                timeout: tuple[float, float] | None = None,
+                fetch=None) -> dict[str, FetchResult]:
+    '''
+    Fetches many cases in parallel and returns a dictionary mapping each
+    unique URL to its FetchResult. Each URL is fetched with fetch_case, or
+    with fetch if given (eg single_flight.fetch_citation).
+    '''
+    unique_urls = list(dict.fromkeys(urls))
+    if not unique_urls:
+        return {}
+    if fetch is None:
+        def fetch(url):
+            return fetch_case(url, timeout)
+
+    max_workers = min(max_workers or settings.CANLII_FETCH_WORKERS, len(unique_urls))
+    if max_workers == 1:
+        return {url: fetch(url) for url in unique_urls}
+
+    def fetch_in_worker(url):
+        # The rate limiter opens a database connection in each worker thread;
+        # close it rather than leaving it to the garbage collector
+        try:
+            return fetch(url)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=max_workers,
+                            thread_name_prefix="canlii-fetch") as executor:
+        results = executor.map(fetch_in_worker, unique_urls)
+        return dict(zip(unique_urls, results))
+
+
+async def afetch_case(url: str, timeout: tuple[float, float] | None = None) -> FetchResult:
+    '''
+    Async version of fetch_case, with the same retries, rate limiting and
+    circuit breaker. Waits for CanLII, for the rate limiter and between
+    retries suspend the caller instead of blocking a thread.
+    '''
+    started = time.monotonic()
+
+    def failed(error, status=None, reason=None):
+        if reason is not None:
+            count_canlii_error(reason)
+        return FetchResult(url, None, status, error, time.monotonic() - started)
+
+    api_elements = case_info(url)
+    if api_elements is None:
+        return failed("Invalid CanLII URL")
+    language, database_id, case_id = api_elements
+    api_url = case_browse_url(language, database_id, case_id)
+
+    allowed = await sync_to_async(allow_request)()
+    if not allowed:
+        return failed("CanLII is unavailable, try again shortly",
+                      reason="breaker_open")
+
+    connect_timeout, read_timeout = timeout or get_timeout()
+    client_timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+    status = None
+    for attempt in range(settings.CANLII_MAX_RETRIES + 1):
+        try:
+            await aacquire()
+        except RateLimitExceeded as limit_error:
+            if attempt == 0:
+                await sync_to_async(release_trial)(allowed)
+            else:
+                await sync_to_async(record_failure)(error)
+            return failed(str(limit_error), status, reason="rate_limited")
+
+        retry_after = None
+        request_started = time.monotonic()
+        try:
+            response = await get_async_client().get(api_url, timeout=client_timeout)
+        except httpx.TimeoutException:
+            observe_canlii_request(None, time.monotonic() - request_started)
+            error = "CanLII timed out"
+            reason = "timeout"
+        except httpx.RequestError as request_error:
+            observe_canlii_request(None, time.monotonic() - request_started)
+            error = f"CanLII request failed: {request_error.__class__.__name__}"
+            reason = "connection"
+        else:
+            status = response.status_code
+            observe_canlii_request(status, time.monotonic() - request_started)
+            if status not in RETRY_STATUSES:
+                break
+            error = f"CanLII returned {status}"
+            reason = f"http_{status}"
+            retry_after = get_retry_after(response)
+
+        if attempt == settings.CANLII_MAX_RETRIES:
+            await sync_to_async(record_failure)(error)
+            return failed(error, status, reason)
+
+        delay = backoff_delay(attempt + 1, retry_after)
+        if delay > settings.CANLII_BACKOFF_MAX:
+            await sync_to_async(record_failure)(error)
+            return failed(error, status, reason)
+        await asyncio.sleep(delay)
+
+    if status != 200:
+        await sync_to_async(record_success)()
+        return failed(f"CanLII returned {status}", status, f"http_{status}")
+
+    try:
+        data = response.json()
+    except ValueError:
+        await sync_to_async(record_failure)("CanLII returned invalid JSON")
+        return failed("CanLII returned invalid JSON", status, "invalid_json")
+
+    await sync_to_async(record_success)()
+    return FetchResult(url, data, status, None, time.monotonic() - started)
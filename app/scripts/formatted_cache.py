@@ -0,0 +1,63 @@
+'''
+Memoized McGill citations.
+
+A formatted citation is a pure function of the case's stored data, the parallel
+citations the user pasted and the pinpoint. Rather than sorting and generating
+the citation again for every request, the result is kept in a small LRU cache
+inside each worker, keyed by a hash of exactly those inputs.
+
+The key includes the stored fields the rules read (CITATION_FIELDS) and the
+rules' RULES_VERSION, so an entry is never served once the Citation row has
+changed or the rules have been updated: the new inputs hash to a new key, and
+the stale entry ages out of the cache.
+'''
+import hashlib
+
+from django.conf import settings
+from django.utils.safestring import SafeString
+
+from .cache import LocalLRUCache
+from .mcgill_jurisprudence_rules import (CITATION_FIELDS, RULES_VERSION,
+                                         generate_citation, sort_citations)
+from .metrics import GENERATE_CITATION, SORT_CITATIONS, count_cache_lookup, timed
+
+formatted_cache = LocalLRUCache(settings.FORMATTED_CACHE_SIZE,
+                                settings.FORMATTED_CACHE_TIMEOUT)
+
+
+def formatted_cache_key(citation_data: dict, parallel_citations: str,
+                        pinpoint_result: str) -> str:
+    '''
+    Hashes everything a formatted citation depends on into a fixed-length key.
+    '''
+    inputs = (
+        RULES_VERSION,
+        citation_data.get("canonical_key"),
+        tuple(citation_data.get(field) for field in CITATION_FIELDS),
+        parallel_citations,
+        pinpoint_result,
+    )
+    return hashlib.sha1(repr(inputs).encode()).hexdigest()
+
+
+def format_citation(citation_data: dict, parallel_citations: str,
+                    pinpoint_result: str) -> tuple[tuple[SafeString, SafeString], dict]:
+    '''
+    Returns the (citation, pinpoint citation) pair and the sorted citations
+    for a case, generating them only if they aren't memoized yet. The sorted
+    citations are shared between requests and must not be modified.
+    '''
+    key = formatted_cache_key(citation_data, parallel_citations, pinpoint_result)
+    formatted = formatted_cache.get(key)
+    count_cache_lookup("formatted", formatted is not None)
+    if formatted is not None:
+        return formatted
+
+    with timed(SORT_CITATIONS):
+        sorted_citations = sort_citations(citation_data, parallel_citations)
+    with timed(GENERATE_CITATION):
+        result = generate_citation(citation_data, sorted_citations, pinpoint_result)
+
+    formatted = (result, sorted_citations)
+    formatted_cache.set(key, formatted)
+    return formatted
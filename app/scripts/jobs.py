@@ -0,0 +1,288 @@
+'''
+Background resolution of long case lists.
+
+A bibliography of a few hundred cases can take longer to resolve than a request
+is allowed to run. Instead, the list is stored as a CitationJob with one
+CitationJobItem per case, and the run_citation_jobs command resolves the items
+in the background. No broker is needed: workers claim batches of ready items
+straight from the database, with SELECT ... FOR UPDATE SKIP LOCKED where the
+database supports it, so several workers can share the queue without claiming
+the same items.
+
+Items that keep failing are given up on after JOB_MAX_ATTEMPTS attempts,
+including items whose worker died or whose batch raised, so a single bad item
+can't stall the queue.
+
+Each batch is resolved with resolve_citations, which fetches misses in
+parallel through the shared CanLII rate limiter, and every item's citation is
+written back as soon as its batch finishes. Batches are never larger than the
+CanLII budget left for the day.
+'''
+import logging
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from ..models import CitationJob, CitationJobItem
+from .rate_limit import quota_status
+from .resolver import clean_item, resolve_citations
+from .submission_log import log_submission
+
+logger = logging.getLogger(__name__)
+
+
+def create_job(items: list, ip_address: str = "") -> CitationJob:
+    '''
+    Queues a list of batch items (see resolver.clean_item) as a new job.
+    '''
+    items = [clean_item(item) for item in items]
+    with transaction.atomic():
+        job = CitationJob.objects.create(ip_address=ip_address)
+        CitationJobItem.objects.bulk_create(
+            CitationJobItem(
+                job=job, position=position,
+                # Values this long can't be valid; the item fails as usual
+                url=item["url"][:500], pinpoint=item["pinpoint"][:50],
+                pinpoint_type=item["pinpoint_type"],
+                parallel_citations=item["parallel_citations"])
+            for position, item in enumerate(items))
+    return job
+
+
+def claim_items(limit: int) -> list[CitationJobItem]:
+    '''
+    Claims up to limit items that are ready to run, oldest first: queued
+    items whose retry delay has passed, and running items whose worker's
+    lease has run out. The claimed items are leased for JOB_LEASE seconds.
+    Items whose lease ran out after their last attempt are failed instead.
+    '''
+    now = timezone.now()
+    expired = Q(status=CitationJobItem.RUNNING, locked_until__lt=now)
+    ready = Q(status=CitationJobItem.QUEUED, available_at__lte=now) | \
+        (expired & Q(attempts__lt=settings.JOB_MAX_ATTEMPTS))
+    lease = now + timedelta(seconds=settings.JOB_LEASE)
+
+    with transaction.atomic():
+        exhausted = CitationJobItem.objects.filter(
+            expired, attempts__gte=settings.JOB_MAX_ATTEMPTS)
+        job_ids = set(exhausted.values_list('job_id', flat=True))
+        if job_ids:
+            exhausted.update(status=CitationJobItem.FAILED, locked_until=None,
+                             error="Stopped before finishing", finished=now)
+            finish_jobs(job_ids)
+
+        items = list(CitationJobItem.objects
+                     .select_for_update(skip_locked=True, of=('self',))
+                     .select_related('job')
+                     .filter(ready)
+                     .order_by('available_at', 'id')[:limit])
+        if not items:
+            return []
+
+        CitationJobItem.objects.filter(pk__in=[item.pk for item in items]).update(
+            status=CitationJobItem.RUNNING, locked_until=lease,
+            attempts=F('attempts') + 1)
+        job_ids = {item.job_id for item in items}
+        CitationJob.objects.filter(pk__in=job_ids, started__isnull=True).update(started=now)
+        CitationJob.objects.filter(pk__in=job_ids).exclude(status=CitationJob.RUNNING)\
+            .update(status=CitationJob.RUNNING)
+
+    for item in items:
+        item.status = CitationJobItem.RUNNING
+        item.locked_until = lease
+        item.attempts += 1
+    return items
+
+
+def run_items(items: list[CitationJobItem]) -> Counter:
+    '''
+    Resolves claimed items and writes back their citations (see set_failed
+    for failures). Returns the number of items done, failed and requeued.
+    '''
+    results = resolve_citations([{
+        "url": item.url,
+        "pinpoint": item.pinpoint,
+        "pinpoint_type": item.pinpoint_type,
+        "parallel_citations": item.parallel_citations,
+    } for item in items])
+
+    now = timezone.now()
+    counts = Counter()
+    for item, result in zip(items, results):
+        if result["error"] is None:
+            item.status = CitationJobItem.DONE
+            item.citation = result["citation"]
+            item.pinpoint_citation = result["pinpoint_citation"]
+            item.error = ""
+            item.finished = now
+            item.locked_until = None
+            if item.job.ip_address:
+                log_submission(item.url, item.job.ip_address)
+        else:
+            set_failed(item, result["error"], result["retryable"], now)
+        counts[item.status] += 1
+
+    save_items(items)
+    return counts
+
+
+def set_failed(item: CitationJobItem, error: str, retryable: bool, now) -> None:
+    '''
+    Records a failed attempt. Items that may succeed later are queued again
+    after a delay that grows with each attempt, unless they have been tried
+    JOB_MAX_ATTEMPTS times.
+    '''
+    item.locked_until = None
+    item.error = error[:200]
+    if retryable and item.attempts < settings.JOB_MAX_ATTEMPTS:
+        item.status = CitationJobItem.QUEUED
+        item.available_at = now + timedelta(
+            seconds=settings.JOB_RETRY_DELAY * item.attempts)
+    else:
+        item.status = CitationJobItem.FAILED
+        item.finished = now
+
+
+def save_items(items: list[CitationJobItem]) -> None:
+    '''
+    Writes back the outcome of a batch and finishes the jobs it completed.
+    '''
+    CitationJobItem.objects.bulk_update(items, [
+        'status', 'citation', 'pinpoint_citation', 'error', 'finished',
+        'available_at', 'locked_until'])
+    finish_jobs({item.job_id for item in items})
+
+
+def release_items(items: list[CitationJobItem], error: str) -> Counter:
+    '''
+    Puts back the items of a batch that raised, as failed attempts that may
+    succeed later. Returns the number of items failed and requeued.
+    '''
+    now = timezone.now()
+    counts = Counter()
+    for item in items:
+        set_failed(item, error, True, now)
+        counts[item.status] += 1
+    save_items(items)
+    return counts
+
+
+def finish_jobs(job_ids: set) -> int:
+    '''
+    Marks the jobs that have no queued or running items left as done.
+    '''
+    unfinished = CitationJobItem.objects.filter(
+        job_id__in=job_ids,
+        status__in=[CitationJobItem.QUEUED, CitationJobItem.RUNNING],
+    ).values_list('job_id', flat=True)
+    return CitationJob.objects.filter(pk__in=job_ids)\
+        .exclude(pk__in=set(unfinished))\
+        .exclude(status=CitationJob.DONE)\
+        .update(status=CitationJob.DONE, finished=timezone.now())
+
+
+def retry_job(job: CitationJob, positions: list[int] | None = None) -> int:
+    '''
+    Queues a job's failed items (or those of them at the given positions)
+    again. Returns the number of items queued.
+    '''
+    items = job.items.filter(status=CitationJobItem.FAILED)
+    if positions is not None:
+        items = items.filter(position__in=positions)
+
+    with transaction.atomic():
+        requeued = items.update(status=CitationJobItem.QUEUED, attempts=0,
+                                available_at=timezone.now(), error="", finished=None)
+        if requeued:
+            CitationJob.objects.filter(pk=job.pk, status=CitationJob.DONE)\
+                .update(status=CitationJob.QUEUED, finished=None)
+    return requeued
+
+
+def job_status(job: CitationJob) -> dict:
+    '''
+    Returns a job's status and progress.
+    '''
+    counts = dict(job.items.order_by().values_list('status').annotate(Count('id')))
+    total = sum(counts.values())
+    finished = counts.get(CitationJobItem.DONE, 0) + counts.get(CitationJobItem.FAILED, 0)
+    return {
+        "id": str(job.id),
+        "status": job.status,
+        "total": total,
+        "queued": counts.get(CitationJobItem.QUEUED, 0),
+        "running": counts.get(CitationJobItem.RUNNING, 0),
+        "done": counts.get(CitationJobItem.DONE, 0),
+        "failed": counts.get(CitationJobItem.FAILED, 0),
+        "progress": finished / total if total else 1.0,
+        "created": job.created.isoformat(),
+        "started": job.started.isoformat() if job.started else None,
+        "finished": job.finished.isoformat() if job.finished else None,
+    }
+
+
+def job_results(job: CitationJob) -> list[dict]:
+    '''
+    Returns every item of a job, in input order, with its citation once it
+    is done.
+    '''
+    return [
+        {
+            "position": item.position,
+            "url": item.url,
+            "status": item.status,
+            "citation": item.citation or None,
+            "pinpoint_citation": item.pinpoint_citation or None,
+            "error": item.error or None,
+            "attempts": item.attempts,
+        }
+        for item in job.items.order_by('position')
+    ]
+
+
+def run_worker(batch_size: int | None = None, poll_interval: float | None = None,
+               once: bool = False, stop: threading.Event | None = None,
+               report=None) -> Counter:
+    '''
+    Claims and resolves batches of items until stop is set, or, with once,
+    until no items are ready. Sleeps for poll_interval seconds when the queue
+    is empty or the day's CanLII budget is spent. report, if given, is called
+    with the counts of each batch. Returns the total counts.
+    '''
+    batch_size = batch_size or settings.JOB_BATCH_SIZE
+    if poll_interval is None:
+        poll_interval = settings.JOB_POLL_INTERVAL
+    stop = stop or threading.Event()
+    totals = Counter()
+
+    while not stop.is_set():
+        close_old_connections()
+
+        # Never claim more items than CanLII calls are left today
+        remaining = quota_status()["remaining_budget"]
+        limit = batch_size if remaining is None else min(batch_size, remaining)
+        items = claim_items(limit) if limit > 0 else []
+
+        if not items:
+            if once:
+                break
+            stop.wait(poll_interval)
+            continue
+
+        try:
+            counts = run_items(items)
+        except Exception:
+            # Keep the worker running; the batch is tried again after a
+            # delay, and given up on once its items are out of attempts
+            logger.exception("Resolving %d job items failed", len(items))
+            counts = release_items(items, "Internal error")
+        totals.update(counts)
+        if report is not None:
+            report(counts)
+
+    return totals
@@ -0,0 +1,149 @@
+'''
+Load generator for a running deployment.
+
+Sends single-citation form submissions (process_text) or JSON batches
+(api/batch) from a pool of concurrent clients and reports throughput, latency
+percentiles and response counts. Pair it with the CanLII stand-in server
+(canlii_standin.py) so that cache misses don't spend CanLII quota.
+
+compare_load runs the same load against two deployments, eg the WSGI and ASGI
+request paths, giving each its own cases so that neither benefits from the
+other's cache.
+'''
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ERROR_MESSAGE = "Cannot get citation data"
+
+
+def case_urls(count: int, seed: int = 0, first_case: int = 1) -> list[str]:
+    '''
+    Returns count distinct CanLII case URLs, numbered from first_case. With
+    the stand-in server, every one of them resolves to a generated case.
+    '''
+    rng = random.Random(seed)
+    courts = (("on", "onca"), ("bc", "bcca"), ("ab", "abca"), ("qc", "qcca"),
+              ("ca", "fca"), ("ns", "nsca"))
+    urls = []
+    for number in range(first_case, first_case + count):
+        jurisdiction, court = rng.choice(courts)
+        year = rng.randint(2000, 2023)
+        case_id = f"{year}{court}{number}"
+        urls.append(f"https://www.canlii.org/en/{jurisdiction}/{court}/doc/"
+                    f"{year}/{case_id}/{case_id}.html")
+    return urls
+
+
+class LoadClient:
+    '''
+    A single simulated user with its own session (and CSRF cookie).
+    '''
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.csrf_token = None
+
+    def submit_text(self, url: str) -> tuple[int, bool]:
+        if self.csrf_token is None:
+            self.session.get(self.base_url + "/", timeout=self.timeout)
+            self.csrf_token = self.session.cookies.get("csrftoken", "")
+        response = self.session.post(
+            self.base_url + "/process_text/",
+            data={"csrfmiddlewaretoken": self.csrf_token, "url": url,
+                  "pinpoint": "12", "pinpoint_type": "para",
+                  "parallel_citations": ""},
+            headers={"Referer": self.base_url + "/"},
+            timeout=self.timeout)
+        return response.status_code, response.status_code == 200 and \
+            ERROR_MESSAGE not in response.text
+
+    def submit_batch(self, urls: list[str]) -> tuple[int, bool]:
+        response = self.session.post(
+            self.base_url + "/api/batch/", json={"citations": urls},
+            timeout=self.timeout)
+        ok = response.status_code == 200 and \
+            all(result["error"] is None for result in response.json()["results"])
+        return response.status_code, ok
+
+
+def percentile(sorted_values: list, fraction: float):
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def run_load(base_url: str, requests_count: int, concurrency: int, cases: int,
+             mode: str = "text", batch_size: int = 10, timeout: float = 60,
+             seed: int = 0, first_case: int = 1) -> dict:
+    '''
+    Sends requests_count requests from concurrency clients, each for a case
+    drawn at random from a pool of cases URLs (or batch_size of them in batch
+    mode), and returns the results.
+    '''
+    urls = case_urls(cases, seed, first_case)
+    rng = random.Random(seed)
+    plan = [rng.sample(urls, min(batch_size, len(urls))) if mode == "batch"
+            else [rng.choice(urls)] for _ in range(requests_count)]
+
+    local = threading.local()
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def send(request_urls):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = LoadClient(base_url, timeout)
+        started = time.perf_counter()
+        try:
+            if mode == "batch":
+                status, ok = client.submit_batch(request_urls)
+            else:
+                status, ok = client.submit_text(request_urls[0])
+            outcome = f"{status} (citation error)" if status == 200 and not ok \
+                else str(status)
+        except requests.RequestException as error:
+            outcome = error.__class__.__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[outcome] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, plan))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "requests": requests_count,
+        "concurrency": concurrency,
+        "duration": duration,
+        "throughput": requests_count / duration if duration else 0,
+        "p50": percentile(latencies, 0.5),
+        "p90": percentile(latencies, 0.9),
+        "p99": percentile(latencies, 0.99),
+        "statuses": dict(statuses),
+    }
+
+
+def compare_load(base_urls: dict[str, str], requests_count: int, concurrency: int,
+                 cases: int, mode: str = "text", batch_size: int = 10,
+                 timeout: float = 60, seed: int = 0) -> dict:
+    '''
+    Runs the same load against each deployment in base_urls, a dictionary of
+    labels to base URLs, one after the other. Each deployment gets its own
+    pool of cases, so both start with the same share of cache misses.
+    '''
+    return {
+        label: run_load(base_url, requests_count, concurrency, cases, mode,
+                        batch_size, timeout, seed, first_case=1 + number * cases)
+        for number, (label, base_url) in enumerate(base_urls.items())
+    }
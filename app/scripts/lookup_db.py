@@ -0,0 +1,351 @@
+'''
+Compiled McGill lookup database.
+
+The McGill 9e tables in data/mcgill are Python lists and dictionaries that every
+worker would otherwise load and index for itself. The build_lookup_db command
+validates them and compiles them into a single read-only SQLite file:
+
+    reporters       every normalized and folded reporter abbreviation, with
+                    its tier, name and jurisdiction (see reporter_index.py)
+    neutral_courts  neutral citation court codes and their courts
+    appendix        the rows of every appendix table (see appendices.py)
+    metadata        the schema version and a hash of the source data
+
+Workers open the file lazily, in read-only immutable mode, so lookups are
+indexed reads from pages that the OS shares between all workers. If the file
+is missing, or was built from different source data, callers fall back to the
+Python tables. Modules that memoize lookups register with on_attach, so that
+their memos are cleared whenever a database is attached.
+'''
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+DATA_DIR = Path(__file__).resolve().parent / "data" / "mcgill"
+DEFAULT_PATH = DATA_DIR / "mcgill.sqlite3"
+
+# The files the database is compiled from. reporter_index.py is included
+# because it decides how abbreviations are normalized.
+SOURCES = (
+    DATA_DIR / "reporter_data.py",
+    DATA_DIR / "_appendix_data.py",
+    Path(__file__).resolve().parent / "reporter_index.py",
+)
+
+SCHEMA = """
+CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE reporters (
+    key TEXT PRIMARY KEY,
+    abbreviation TEXT NOT NULL,
+    tier TEXT NOT NULL,
+    name TEXT NOT NULL,
+    jurisdiction TEXT
+) WITHOUT ROWID;
+CREATE TABLE neutral_courts (
+    code TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    jurisdiction TEXT NOT NULL,
+    court TEXT NOT NULL,
+    dates TEXT NOT NULL,
+    language TEXT,
+    PRIMARY KEY (code, position)
+) WITHOUT ROWID;
+CREATE INDEX neutral_courts_jurisdiction ON neutral_courts (jurisdiction);
+CREATE TABLE appendix (
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    key TEXT,
+    value TEXT NOT NULL,
+    PRIMARY KEY (name, position)
+) WITHOUT ROWID;
+CREATE INDEX appendix_key ON appendix (name, key);
+"""
+
+# "2000-", "2001-02" or "2003-07 - 2004-11"
+NEUTRAL_DATES = re.compile(r"\d{4}-(\d{2})?( - \d{4}-\d{2})?")
+
+_lookup_db = None
+_lookup_db_loaded = False
+_lookup_db_lock = threading.Lock()
+_attach_callbacks = []
+
+
+def source_hash() -> str:
+    '''
+    Hashes the source data, so that a database built from other data is
+    never used.
+    '''
+    digest = hashlib.sha256(str(SCHEMA_VERSION).encode())
+    for source in SOURCES:
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def check_sources() -> list[str]:
+    '''
+    Checks the McGill tables for mistakes that the Python data would only
+    reveal at request time. Returns a description of every problem found.
+    '''
+    from .data.mcgill import _appendix_data, reporter_data
+    from .data.mcgill.appendices import ARRAY_TABLES, DICT_TABLES
+
+    problems = []
+
+    def is_text(value):
+        return isinstance(value, str) and value.strip() != ""
+
+    reporter_tables = ("official_reporters", "preferred_reporters",
+                       "authoritative_reporters")
+    for table in reporter_tables:
+        for number, row in enumerate(getattr(reporter_data, table)):
+            if not 2 <= len(row) <= 4 or not all(is_text(field) for field in row[:2]):
+                problems.append(f"{table}[{number}]: expected an abbreviation "
+                                f"and a name, got {row!r}")
+
+    for number, row in enumerate(reporter_data.neutral_citations_ca):
+        where = f"neutral_citations_ca[{number}]"
+        if len(row) not in (4, 5) or not all(is_text(field) for field in row[:4]):
+            problems.append(f"{where}: expected a jurisdiction, court, code and "
+                            f"dates, got {row!r}")
+            continue
+        if not NEUTRAL_DATES.fullmatch(row[3]):
+            problems.append(f"{where}: unrecognized dates {row[3]!r}")
+        if len(row) == 5 and row[4] not in ("en", "fr"):
+            problems.append(f"{where}: unrecognized language {row[4]!r}")
+
+    for name in sorted(ARRAY_TABLES | DICT_TABLES):
+        table = getattr(_appendix_data, name, None)
+        expected = dict if name in DICT_TABLES else list
+        if not isinstance(table, expected):
+            problems.append(f"{name}: expected a {expected.__name__}, "
+                            f"got {type(table).__name__}")
+        elif expected is list and not all(isinstance(row, list) for row in table):
+            problems.append(f"{name}: every row should be a list")
+
+    return problems
+
+
+def appendix_rows(name: str, table) -> list[tuple]:
+    '''
+    Flattens an appendix table into (name, position, key, value) rows. The key
+    is the dictionary key, or the first column of a tabular row.
+    '''
+    if isinstance(table, dict):
+        items = table.items()
+    else:
+        items = ((row[0] if row else None, row) for row in table)
+    return [(name, position, key, json.dumps(value, ensure_ascii=False))
+            for position, (key, value) in enumerate(items)]
+
+
+def build_lookup_db(path: Path | str) -> dict:
+    '''
+    Validates the McGill tables and compiles them into a SQLite file at path.
+    The file is written next to path and moved into place, so workers never
+    see a half-written database. Raises ValueError if the tables don't
+    validate. Returns the number of rows written to each table.
+    '''
+    from .data.mcgill import _appendix_data
+    from .data.mcgill.appendices import __all__ as appendix_tables
+    from .reporter_index import build_neutral_court_index, build_reporter_index
+
+    problems = check_sources()
+    if problems:
+        raise ValueError("\n".join(problems))
+
+    reporters = [(key, *entry) for key, entry in build_reporter_index().items()]
+    neutral_courts = [
+        (code, position, court.jurisdiction, court.court, court.dates, court.language)
+        for code, courts in build_neutral_court_index().items()
+        for position, court in enumerate(courts)
+    ]
+    appendix = [row for name in appendix_tables
+                for row in appendix_rows(name, getattr(_appendix_data, name))]
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(descriptor)
+    try:
+        connection = sqlite3.connect(temporary)
+        try:
+            connection.executescript(SCHEMA)
+            connection.executemany("INSERT INTO reporters VALUES (?, ?, ?, ?, ?)",
+                                   reporters)
+            connection.executemany(
+                "INSERT INTO neutral_courts VALUES (?, ?, ?, ?, ?, ?)", neutral_courts)
+            connection.executemany("INSERT INTO appendix VALUES (?, ?, ?, ?)", appendix)
+            connection.executemany("INSERT INTO metadata VALUES (?, ?)", (
+                ("schema_version", str(SCHEMA_VERSION)),
+                ("source_hash", source_hash()),
+            ))
+            connection.commit()
+            connection.execute("VACUUM")
+        finally:
+            connection.close()
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+    return {
+        "reporters": len(reporters),
+        "neutral_courts": len(neutral_courts),
+        "appendix": len(appendix),
+    }
+
+
+class LookupDB:
+    '''
+    Read-only access to a compiled lookup database. Each thread gets its own
+    connection, opened on first use.
+    '''
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            uri = f"file:{quote(str(self.path))}?mode=ro&immutable=1"
+            connection = sqlite3.connect(uri, uri=True)
+            self._local.connection = connection
+        return connection
+
+    def metadata(self) -> dict:
+        return dict(self.connection().execute("SELECT key, value FROM metadata"))
+
+    def reporter(self, key: str) -> tuple | None:
+        '''
+        Returns (abbreviation, tier, name, jurisdiction) for a normalized
+        reporter abbreviation, or None.
+        '''
+        return self.connection().execute(
+            "SELECT abbreviation, tier, name, jurisdiction FROM reporters "
+            "WHERE key = ?", (key,)).fetchone()
+
+    def neutral_courts(self, code: str) -> list[tuple]:
+        '''
+        Returns (code, jurisdiction, court, dates, language) for every court
+        using a neutral citation code.
+        '''
+        return self.connection().execute(
+            "SELECT code, jurisdiction, court, dates, language FROM neutral_courts "
+            "WHERE code = ? ORDER BY position", (code,)).fetchall()
+
+    def appendix_table(self, name: str) -> list[tuple]:
+        '''
+        Returns the (key, value) rows of an appendix table, in order.
+        '''
+        return [(key, json.loads(value)) for key, value in self.connection().execute(
+            "SELECT key, value FROM appendix WHERE name = ? ORDER BY position",
+            (name,))]
+
+    def appendix_lookup(self, name: str, key: str):
+        '''
+        Returns the value of the first row of an appendix table with the given
+        key (eg an abbreviation), or None.
+        '''
+        row = self.connection().execute(
+            "SELECT value FROM appendix WHERE name = ? AND key = ? "
+            "ORDER BY position LIMIT 1", (name, key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def lookup_db_path() -> str:
+    '''
+    Returns the configured database path. An empty MCGILL_LOOKUP_DB setting
+    turns the database off.
+    '''
+    # Imported here so that the McGill tables don't depend on Django
+    from django.conf import settings
+
+    if settings.configured:
+        return settings.MCGILL_LOOKUP_DB
+    return str(DEFAULT_PATH)
+
+
+def open_lookup_db(path: Path | str) -> LookupDB | None:
+    '''
+    Opens a compiled database, or returns None if it is missing, unreadable
+    or was built from different source data.
+    '''
+    if not Path(path).exists():
+        return None
+    lookup_db = LookupDB(path)
+    try:
+        metadata = lookup_db.metadata()
+    except sqlite3.Error as error:
+        logger.warning("Cannot read the McGill lookup database %s: %s", path, error)
+        return None
+    if metadata.get("source_hash") != source_hash():
+        logger.warning("The McGill lookup database %s is out of date; run "
+                       "build_lookup_db to rebuild it", path)
+        return None
+    return lookup_db
+
+
+def on_attach(callback):
+    '''
+    Registers a function to call whenever a lookup database is attached, eg
+    to clear lookups memoized from the Python tables. Can be used as a
+    decorator.
+    '''
+    _attach_callbacks.append(callback)
+    return callback
+
+
+def notify_attached() -> None:
+    for callback in _attach_callbacks:
+        callback()
+
+
+def get_lookup_db() -> LookupDB | None:
+    '''
+    Returns this process's lookup database, opening it on first use. Returns
+    None if there is no usable database, in which case callers use the
+    Python tables.
+    '''
+    global _lookup_db, _lookup_db_loaded
+    if not _lookup_db_loaded:
+        with _lookup_db_lock:
+            if not _lookup_db_loaded:
+                path = lookup_db_path()
+                _lookup_db = open_lookup_db(path) if path else None
+                _lookup_db_loaded = True
+                attached = _lookup_db is not None
+            else:
+                attached = False
+        if attached:
+            notify_attached()
+    return _lookup_db
+
+
+def attach_lookup_db(path: Path | str | None = None) -> LookupDB | None:
+    '''
+    Opens the database at path (the configured one by default) and makes it
+    this process's lookup database, eg once build_lookup_db has rebuilt it.
+    Returns None, and falls back to the Python tables, if it isn't usable.
+    '''
+    global _lookup_db, _lookup_db_loaded
+    if path is None:
+        path = lookup_db_path()
+    lookup_db = open_lookup_db(path) if path else None
+    with _lookup_db_lock:
+        _lookup_db = lookup_db
+        _lookup_db_loaded = True
+    notify_attached()
+    return lookup_db
@@ -2,121 +2,72 @@
 This module generates McGill 9e Jurisprudence citations.
 '''
 import sys
-import re
 
 from django.utils.safestring import SafeString
-from .data.mcgill import reporter_data
 from .cache import serialize
+from .citation_parser import (ParsedCitation, parse_parallel_citations,
+                              scan_citation, split_parallel_citations)
+from .reporter_index import JURISDICTIONS
+
+# Increment whenever a change to these rules changes the citations they
+# generate, so that memoized citations are regenerated (see formatted_cache.py)
+RULES_VERSION = 2
+
+# The stored case fields that the rules read
+CITATION_FIELDS = ("citation", "decisionDate", "language", "title")
 
 # Functions for the McGill 9e Jurisprudence class
 
 # Determines whether the string contains a neutral citation
 
-def check_neutral_citation(neutral_citation: str) -> bool:
+def check_neutral_citation(neutral_citation: ParsedCitation | str,
+                           decision_date: str | None = None) -> bool:
     '''
     Checks to see if the citation is neutral. Neutral citations are always
-    preferred and obviate the need for a printed reporter citation. If the
-    citation is neutral, the function returns True. If not, it returns False.
+    preferred and obviate the need for a printed reporter citation. The court
+    code must match a neutral citation court exactly, and that court must
+    have issued neutral citations on the decision date (in the citation's
+    year if no date is given). If the citation is neutral, the function
+    returns True. If not, it returns False.
     '''
-    # Change to use the any() function
-    neutral_citation_list = [item[2] for item in reporter_data.neutral_citations_ca]
-    court_level = neutral_citation.split()[1]
-    for unclassified_citation in neutral_citation_list:
-        if court_level in unclassified_citation:
-            return True
-    return False
+    if isinstance(neutral_citation, str):
+        neutral_citation = ParsedCitation.parse(neutral_citation)
+    return neutral_citation.is_neutral_on(decision_date)
 
 # Takes a string of citations copied directly from CanLII, cleans the data,
 # and returns a list of parallel citations
 
-def process_parallel_citations(other_citations: str) -> tuple[str, str]:
+def process_parallel_citations(other_citations: str) -> tuple[list[str], list[str]]:
     '''
     The function returns a list of parallel citations inferred from a block
-    of text copied and pasted by the user.
+    of text copied and pasted by the user, along with the reporter named in
+    each citation.
 
-    When copied from CanLII, the function returns a list of (presumably
-    correct) parallel citations. The citations are separated by a long dash
-    (—) and are preceded by a space. The function splits the block of text
-    into a list of citations and removes the preceding space. The function
-    then removes any citation elements that are in the exclude list. So
-    far, this only includes the QuickLaw designation (QL). The function
-    must make a small adjustment to the year of the citation if Westlaw
-    reported the case.
+    When copied from CanLII, the citations are separated by a long dash (—).
+    Each citation is tokenized once into its year, volume, reporter, series,
+    page and court (see citation_parser.py). Citation elements in the exclude
+    list are removed; so far, this only includes the QuickLaw designation
+    (QL). The brackets around the year are removed if Westlaw (Carswell)
+    reported the case, and periods are removed from the reporter's name.
 
     For citations copied directly from Westlaw, the function will likely
     only need to remove superfluous periods, after which point the
-    citations will likely be correct. This functionality will be added in
-    the near future.
-
-    The function presently doesn't distinguish between the various
-    items inside the string (e.g. the reporter, the year, the volume,
-    etc.). This will be added in the near future.
+    citations will likely be correct.
     '''
-
-    # Creates (likely incomplete) sets of citation and reporter elements to
-    # exclude
-    excluded_citation_items = ("(QL)")
-    excluded_reporter_items = ("No", "no")
-
-    # Creates a list of parallel citations if the user copied the citations
-    # from CanLII. Assumes that the citations are separated by a long dash
-    # (—) and preceded by a space. Assumes perfect input.
-
-    # Separates the parallel citations, if any, into a list
-    if other_citations and "—" not in other_citations:
-        citation_list = [other_citations]
-    elif not other_citations:
-        citation_list = []
-    else:
-        citation_list = other_citations.split("—")
-        citation_list = [item.strip() for item in citation_list]
-
     citation_list_parsed = []
     parallel_reporter_list = []
 
-    # Parses the list of parallel citations
-    # Some reporters have names that are separated by a space (eg "Sask R")
-    # This function will need to be updated to handle these cases
-
-    for citation in citation_list:
-        # Splits the citation into a list
-        # Splits either by space or by dash
-        delimiters = " |-"
-        citation_split = re.split(delimiters, citation)
-        citation_joined = []
-        # Light formatting
-        for item in citation_split:
-
-            # Remove items that are in the exclude list
-            if item in excluded_citation_items:
-                citation_split.remove(item)
-                continue
-
-            # Adds the parallel reporter
-            if any(character.isalpha() for character in item) and item not in excluded_reporter_items:
-                # Remove the periods from the reporter
-                item = item.replace(".", "")
-                citation_joined.append(item)
-
-            # Remove brackets around a number if the next item is a string containing "Carswell"
-            # See McGill 9e 3.8.3
-            if item.startswith("[") and \
-                item.endswith("]") and \
-                citation_split[citation_split.index(item) + 1].startswith("Carswell"):
-                citation_split[citation_split.index(item)] = item[1:-1]
-                
-            citation = " ".join(citation_split)
-        
-        item = " ".join(citation_joined)
-        parallel_reporter_list.append(item)
-        citation_list_parsed.append(citation)
+    for citation in split_parallel_citations(other_citations):
+        _, text, reporter, *_ = scan_citation(citation)
+        citation_list_parsed.append(text)
+        parallel_reporter_list.append(reporter)
 
     return citation_list_parsed, parallel_reporter_list
 
 
 # Handles years for non-neutral citations
 
-def verify_year(citation: str, citation_data: dict) -> str:
+def verify_year(citation: ParsedCitation | str, citation_data: dict) -> tuple[str, str]:
     '''
     Some citations require a year to be added to the citation. This function
     adds the year to the citation if necessary. 
@@ -144,30 +95,16 @@ def verify_year(citation: str, citation_data: dict) -> str:
     a neutral citation, or when the citation is a parallel citation.
     '''
 
-    # Creates a list of citation elements
-    citation_list = citation.split()
+    # The citation's year, if it has one, has already been parsed out of it
+    # (see citation_parser.py). Note that many citations are enclosed in
+    # square brackets, which are stripped to compare to the decision year.
+    if isinstance(citation, str):
+        citation = ParsedCitation.parse(citation)
     decision_year = citation_data["decisionDate"].split("-")[0]
-    style_of_cause = citation_data["title"].replace(".", "") 
-    reporter_year = None
-
-    # Check to see if the first element of the citation is a year. Note that 
-    # many citations are enclosed in square brackets that will need to be 
-    # stripped to compare to the decision year. Where a citation contains a 
-    # year, it is (almost always) the first element of the citation.
-
-    check_brackets = re.search(r"\[\d{4}\]", citation_list[0])
-    check_year = re.search(r"\b\d{4}\b", citation_list[0])
+    style_of_cause = citation_data["title"].replace(".", "")
+    reporter_year = citation.year
 
-    if check_year:
-        reporter_year = citation_list[0]
-
-    if check_brackets:
-        reporter_year = "".join(char for char in citation_list[0] if char.isdigit())
-        
-    if reporter_year == decision_year:
-        citation_year_corresponds = True
-    else:
-        citation_year_corresponds = False
+    citation_year_corresponds = reporter_year == decision_year
 
     # When a decision has a neutral citation or when the decision year is the
     # same as the year in the main citation, the year isn't added to the style
@@ -186,32 +123,15 @@ def verify_year(citation: str, citation_data: dict) -> str:
 
 # Handles court and jurisdiction for non-neutral citations
 
-def verify_court(citation: str, citation_data: dict) -> str:
+def verify_court(citation: ParsedCitation | str, citation_data: dict) -> str:
 
     '''
     This function adds the court and jurisdiction to the citation if necessary.
     '''
 
-    # Creates a list of citation elements
-    citation_list = citation.split()
-    court_jurisdiction_list = []
-
-    # CanLII abbreviation | en | fr | full name
-    jurisdiction_list = [
-        ("BC", "BC", "BC", "British Columbia"),
-        ("AB", "Alta", "Alta", "Alberta"),
-        ("SK", "Sask", "Sask", "Saskatchewan"),
-        ("MB", "Man", "Man", "Manitoba"),
-        ("ON", "Ont", "Ont", "Ontario"),
-        ("QC", "Qc", "Qc", "Quebec"),
-        ("NB", "NB", "N-B", "New Brunswick"),
-        ("NS", "NS", "NS", "Nova Scotia"),
-        ("PE", "PEI", "PEI", "Prince Edward Island"),
-        ("NL", "NL", "Nfld", "Newfoundland and Labrador"),
-        ("YT", "Y", "Y", "Yukon"),
-        ("NT", "NWT", "TN-O", "Northwest Territories"),
-        ("NU", "Nunavut", "Nvt", "Nunavut"),
-    ]
+    if isinstance(citation, str):
+        citation = ParsedCitation.parse(citation)
+
     implicit_court_jurisidiction_list = [
         ("AAS", "QCSAT"),
         ("ACF", "FCC"),
@@ -220,11 +140,8 @@ def verify_court(citation: str, citation_data: dict) -> str:
     # Replaces the CanLII jurisdiction/court identifiers with the McGill 9e-
     # compliant jurisdiction/court identifiers.
 
-    if "CanLII" in citation_list:
-        for item in citation_list:
-            if "(" in item or ")" in item:
-                item = ''.join(filter(str.isalnum, item))
-                court_jurisdiction_list.append(item)
+    if citation.reporter == "CanLII" and citation.court:
+        court_jurisdiction_list = citation.court.split()
 
         # No formatting needed if there is only one jurisdiction identifier
         if len(court_jurisdiction_list) == 1:
@@ -235,14 +152,11 @@ def verify_court(citation: str, citation_data: dict) -> str:
         # function at some point, as it is likely to be repeated again.
 
         else:
-            for tuple_item in jurisdiction_list:
-                for item in tuple_item:
-                    if court_jurisdiction_list[0] == tuple_item[0] and \
-                        citation_data["language"] == "en":
-                        return f"({tuple_item[1]} {court_jurisdiction_list[1]})"
-                    elif court_jurisdiction_list[0] == tuple_item[0] and \
-                        citation_data["language"] == "fr":
-                        return f"({tuple_item[2]} {court_jurisdiction_list[1]})"
+            jurisdiction = JURISDICTIONS.get(court_jurisdiction_list[0])
+            if jurisdiction is not None and citation_data["language"] == "en":
+                return f"({jurisdiction.en} {court_jurisdiction_list[1]})"
+            elif jurisdiction is not None and citation_data["language"] == "fr":
+                return f"({jurisdiction.fr} {court_jurisdiction_list[1]})"
         
     # If the citation is not from CanLII, the citation will need to be checked 
     # to see if it identifies the court and jurisdiction. If it does, the
@@ -262,10 +176,11 @@ def sort_citations(citation_data: dict, user_citations: str) -> dict:
     '''
     This function takes a list of citations and sorts them into official,
     preferred, authoritative, and unofficial citations. It returns a dictionary
-    containing the sorted citations.
+    containing the sorted citations. Each citation is a ParsedCitation, which
+    displays as the citation's text.
     '''
     
-    citation_list = process_parallel_citations(user_citations)
+    parallel_citations = parse_parallel_citations(user_citations)
     
     neutral_citations = []
     official_reporters = []
@@ -273,54 +188,39 @@ def sort_citations(citation_data: dict, user_citations: str) -> dict:
     authoritative_reporters = []
     unofficial_reporters = []
     canlii_citation = citation_data["citation"]
-    canlii_citation_list = canlii_citation.split()
 
-    official_reporters_list = [reporter[0] for reporter in reporter_data.official_reporters]
-    preferred_reporters_list = [reporter[0] for reporter in reporter_data.preferred_reporters]
-    authoritative_reporters_list = [reporter[0] for reporter in reporter_data.authoritative_reporters]
+    sorted_reporters = {
+        "official": official_reporters,
+        "preferred": preferred_reporters,
+        "authoritative": authoritative_reporters,
+        "unofficial": unofficial_reporters,
+    }
 
-    
     # Checks for an official reportercitation in the CanLII citation. If there 
     # is one, it is added to the citation list. The CanlII citation is then
     # added to the unofficial reporters list.
     if "SCR" in canlii_citation:
+        canlii_citation_list = canlii_citation.split()
         official_reporter_citation = " ".join(canlii_citation_list[-4:])
         formatted_canlii_citation = " ".join(canlii_citation_list[:-4])
-        official_reporters.append(official_reporter_citation)
-        unofficial_reporters.append(formatted_canlii_citation)
+        official_reporters.append(ParsedCitation.parse(official_reporter_citation))
+        canlii = ParsedCitation.parse(formatted_canlii_citation)
     else:
-        unofficial_reporters.append(canlii_citation)
+        canlii = ParsedCitation.parse(canlii_citation)
+    unofficial_reporters.append(canlii)
     
-    # Checks to see if the citation is a neutral citation
-    if check_neutral_citation(canlii_citation) is True:
-        # Generates the neutral citation
-        neutral_citation = " ".join(canlii_citation_list[:3])
-        neutral_citations.append(neutral_citation)
-
-    # Cycle through citation_list if it is not empty
-    if citation_list == []:
-        return {"neutral": neutral_citations,\
-                "official": official_reporters,\
-                "preferred": preferred_reporters,\
-                "authoritative": authoritative_reporters,\
-                "unofficial": unofficial_reporters}
-    else:
-
-        citations = citation_list[1]
-        reporters = citation_list[0]
+    # Checks to see if the citation is a neutral citation, and if so,
+    # generates it from the year, court and number
+    if check_neutral_citation(canlii, citation_data.get("decisionDate")) is True:
+        neutral_citations.append(ParsedCitation(
+            f"{canlii.year} {canlii.reporter} {canlii.page}", canlii.year, None,
+            canlii.reporter, canlii.page, None, canlii.tier))
+
+    # Each reporter is classified by the tier found when it was parsed (see
+    # reporter_index.py)
+    for citation in parallel_citations:
+        sorted_reporters[citation.tier].append(citation)
 
-        for citation in citations:
-            citation_index = citations.index(citation)
-            if citation in official_reporters_list:
-                official_reporters.append(reporters[citation_index])
-            elif citation in preferred_reporters_list:
-                preferred_reporters.append(reporters[citation_index])
-            elif citation in authoritative_reporters_list:
-                authoritative_reporters.append(reporters[citation_index])
-            else:
-                unofficial_reporters.append(reporters[citation_index])
-
-    
     return {"neutral": neutral_citations,\
         "official": official_reporters,\
         "preferred": preferred_reporters,\
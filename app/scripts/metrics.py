@@ -0,0 +1,162 @@
+'''
+Request instrumentation.
+
+Collects per-stage timings, citation cache hits and misses, CanLII call
+latencies and error counts with prometheus_client. They are exposed in the
+Prometheus text format at /metrics and summarized on the admin metrics page.
+
+Each metric update is an in-memory increment. When PROMETHEUS_MULTIPROC_DIR is
+set, the metrics are written to that directory instead, and /metrics combines
+every gunicorn worker's values. The directory has to exist and be emptied
+before the server starts (see gunicorn.conf.py).
+'''
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry,
+                               Counter, Histogram, generate_latest, multiprocess)
+
+# Stages timed in STAGE_SECONDS
+DB_LOOKUP = "db_lookup"
+API_CALL = "api_call"
+SORT_CITATIONS = "sort_citations"
+GENERATE_CITATION = "generate_citation"
+TEMPLATE_RENDER = "template_render"
+STAGES = (DB_LOOKUP, API_CALL, SORT_CITATIONS, GENERATE_CITATION, TEMPLATE_RENDER)
+
+STAGE_SECONDS = Histogram(
+    "citator_stage_seconds", "Time spent in each stage of generating a citation",
+    ["stage"],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+CACHE_LOOKUPS = Counter(
+    "citator_cache_lookups_total", "Citation cache lookups", ["tier", "result"])
+CANLII_SECONDS = Histogram(
+    "citator_canlii_request_seconds", "Latency of each CanLII HTTP request",
+    ["status"],
+    buckets=(.05, .1, .25, .5, .75, 1, 1.5, 2, 3, 5, 7.5, 10, 15))
+CANLII_ERRORS = Counter(
+    "citator_canlii_errors_total", "Failed CanLII calls", ["reason"])
+
+
+@contextmanager
+def timed(stage: str):
+    '''
+    Records how long the with block takes under the given stage.
+    '''
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - started)
+
+
+def count_cache_lookup(tier: str, hit: bool, amount: int = 1) -> None:
+    CACHE_LOOKUPS.labels(tier, "hit" if hit else "miss").inc(amount)
+
+
+def observe_canlii_request(status: int | None, elapsed: float) -> None:
+    '''
+    Records a single CanLII HTTP request. Requests that got no response are
+    recorded with a status of "none".
+    '''
+    CANLII_SECONDS.labels(str(status) if status else "none").observe(elapsed)
+
+
+def count_canlii_error(reason: str) -> None:
+    CANLII_ERRORS.labels(reason).inc()
+
+
+def get_registry():
+    '''
+    Returns the registry to export: every worker's metrics in multiprocess
+    mode, or this process's otherwise.
+    '''
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def export_metrics() -> tuple[bytes, str]:
+    '''
+    Returns the metrics in the Prometheus text format and its content type.
+    '''
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
+
+
+def _samples(name: str) -> list:
+    for metric in get_registry().collect():
+        if metric.name == name:
+            return metric.samples
+    return []
+
+
+def stage_summary() -> list[dict]:
+    '''
+    Returns the number of calls, total time and mean time of each stage, for
+    the admin metrics page.
+    '''
+    totals = {stage: {"count": 0, "sum": 0.0} for stage in STAGES}
+    for sample in _samples("citator_stage_seconds"):
+        stage = sample.labels.get("stage")
+        if stage not in totals:
+            continue
+        if sample.name.endswith("_count"):
+            totals[stage]["count"] += sample.value
+        elif sample.name.endswith("_sum"):
+            totals[stage]["sum"] += sample.value
+
+    return [{
+        "stage": stage,
+        "count": int(total["count"]),
+        "total": total["sum"],
+        "mean": total["sum"] / total["count"] if total["count"] else None,
+    } for stage, total in totals.items()]
+
+
+def canlii_summary() -> dict:
+    '''
+    Returns the CanLII request counts and mean latency by status, and the
+    error counts by reason.
+    '''
+    requests = {}
+    for sample in _samples("citator_canlii_request_seconds"):
+        status = sample.labels.get("status")
+        entry = requests.setdefault(status, {"count": 0, "sum": 0.0})
+        if sample.name.endswith("_count"):
+            entry["count"] += sample.value
+        elif sample.name.endswith("_sum"):
+            entry["sum"] += sample.value
+
+    errors = {}
+    for sample in _samples("citator_canlii_errors"):
+        if sample.name.endswith("_total"):
+            reason = sample.labels.get("reason")
+            errors[reason] = errors.get(reason, 0) + int(sample.value)
+
+    return {
+        "requests": {status: {
+            "count": int(entry["count"]),
+            "mean": entry["sum"] / entry["count"] if entry["count"] else None,
+        } for status, entry in sorted(requests.items())},
+        "errors": errors,
+    }
+
+
+def cache_summary() -> dict:
+    '''
+    Returns the hits, misses and hit ratio of each cache tier.
+    '''
+    tiers = {}
+    for sample in _samples("citator_cache_lookups"):
+        if not sample.name.endswith("_total"):
+            continue
+        tier = tiers.setdefault(sample.labels["tier"], {"hits": 0, "misses": 0})
+        key = "hits" if sample.labels["result"] == "hit" else "misses"
+        tier[key] += int(sample.value)
+    for tier in tiers.values():
+        lookups = tier["hits"] + tier["misses"]
+        tier["hit_ratio"] = tier["hits"] / lookups if lookups else None
+    return tiers
@@ -0,0 +1,143 @@
+'''
+Bulk prefetch of CanLII databases.
+
+A case is normally only stored once someone asks for it, so the first request
+for every case waits on CanLII. prefetch_database walks a database's paginated
+caseBrowse list (caseBrowse/{language}/{databaseId}/?offset=...&resultCount=...),
+fetches the metadata of every listed case that isn't stored yet and
+bulk-inserts the new Citation rows a page at a time. Requests for those cases
+are then served from the database on the first hit.
+
+Progress is recorded in a PrefetchCheckpoint after every page, in the same
+transaction as the page's rows, so an interrupted prefetch resumes at the
+first page it hadn't finished. Every call goes through the fetcher, so a
+prefetch shares the CanLII rate limiter, daily budget and circuit breaker with
+requests.
+'''
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Citation, PrefetchCheckpoint
+from .api_calls import case_databases_url, case_list_url, case_url, get_database_id
+from .database_functions import citation_attributes
+from .fetcher import RETRY_STATUSES, fetch_api, fetch_cases
+from .rate_limit import quota_status
+from .single_flight import base_citation
+
+# Cases listed per caseBrowse call, and rows per INSERT
+PAGE_SIZE = 100
+CHUNK_SIZE = 500
+
+
+class PrefetchError(Exception):
+    '''
+    Raised when a prefetch has to stop before the end of a database's list,
+    eg because CanLII is unavailable or the day's budget is spent. The
+    checkpoint is left at the unfinished page.
+    '''
+
+
+def case_databases(language: str = "en") -> dict[str, str]:
+    '''
+    Returns the jurisdiction of every CanLII case database, keyed by
+    databaseId.
+    '''
+    result = fetch_api(f"caseBrowse/{language}", case_databases_url(language))
+    if not result.ok:
+        raise PrefetchError(f"Cannot list the case databases: {result.error}")
+    return {database["databaseId"]: database["jurisdiction"]
+            for database in result.data.get("caseDatabases", [])}
+
+
+def listed_case_id(case: dict, language: str) -> str:
+    '''
+    Returns a listed case's caseId, which the API gives per language.
+    '''
+    case_id = case["caseId"]
+    if isinstance(case_id, dict):
+        return case_id.get(language) or next(iter(case_id.values()))
+    return case_id
+
+
+def prefetch_database(database_id: str, jurisdiction: str, language: str = "en",
+                      page_size: int = PAGE_SIZE, chunk_size: int = CHUNK_SIZE,
+                      max_pages: int | None = None, restart: bool = False,
+                      report=None) -> PrefetchCheckpoint:
+    '''
+    Stores every case in a CanLII database that isn't stored yet, resuming
+    from the database's checkpoint (or from the start, with restart). Reads at
+    most max_pages pages if given. report, if given, is called with the
+    checkpoint after every page. Returns the checkpoint.
+
+    Cases that CanLII can't return are skipped. If a call fails in a way that
+    may pass (see fetcher.RETRY_STATUSES), the cases fetched so far are saved
+    and PrefetchError is raised; the next run repeats that page, skipping the
+    cases that were saved.
+    '''
+    database_id = get_database_id(database_id)
+    checkpoint, _ = PrefetchCheckpoint.objects.get_or_create(
+        language=language, database_id=database_id)
+    if restart:
+        checkpoint.offset = 0
+        checkpoint.cases_listed = checkpoint.cases_saved = checkpoint.cases_failed = 0
+        checkpoint.started = timezone.now()
+        checkpoint.finished = None
+        checkpoint.save()
+
+    pages = 0
+    while checkpoint.finished is None and (max_pages is None or pages < max_pages):
+        if quota_status()["remaining_budget"] == 0:
+            raise PrefetchError("The day's CanLII budget is spent")
+
+        listing = fetch_api(f"caseBrowse/{language}/{database_id}", case_list_url(
+            language, database_id, checkpoint.offset, page_size))
+        if not listing.ok:
+            raise PrefetchError(f"Cannot list {database_id} from case "
+                                f"{checkpoint.offset}: {listing.error}")
+        cases = listing.data.get("cases", [])
+
+        # Long URLs keyed by canonical key; only the cases that aren't stored
+        # yet are fetched
+        urls = {}
+        for case in cases:
+            case_id = listed_case_id(case, language)
+            urls[f"{language}/{database_id}/{case_id}"] = \
+                case_url(language, jurisdiction, database_id, case_id)
+        stored = set(Citation.objects.filter(canonical_key__in=urls)
+                     .values_list('canonical_key', flat=True))
+        missing = {key: url for key, url in urls.items() if key not in stored}
+        results = fetch_cases(list(missing.values()))
+
+        citations = []
+        failed = retry = 0
+        for key, url in missing.items():
+            result = results[url]
+            if result.ok:
+                citations.append(Citation(canonical_key=key, **citation_attributes(
+                    result.data, url, base_citation(result.data))))
+            elif result.status is None or result.status in RETRY_STATUSES:
+                retry += 1
+            else:
+                failed += 1
+
+        with transaction.atomic():
+            Citation.objects.bulk_create(citations, batch_size=chunk_size,
+                                         ignore_conflicts=True)
+            checkpoint.cases_saved += len(citations)
+            if not retry:
+                checkpoint.offset += len(cases)
+                checkpoint.cases_listed += len(cases)
+                checkpoint.cases_failed += failed
+                if len(cases) < page_size:
+                    checkpoint.finished = timezone.now()
+            checkpoint.save()
+
+        if retry:
+            raise PrefetchError(f"{retry} cases in {database_id} from case "
+                                f"{checkpoint.offset} couldn't be fetched; run "
+                                f"the prefetch again to resume")
+        pages += 1
+        if report is not None:
+            report(checkpoint)
+
+    return checkpoint
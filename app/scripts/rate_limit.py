@@ -0,0 +1,143 @@
+'''
+Client-side rate limiting for the CanLII API.
+
+CanLII enforces a per-key request rate and daily quota. To stay inside them,
+every call takes a token from a token bucket stored in the ApiQuota table. The
+bucket refills at CANLII_RATE_LIMIT tokens per second up to CANLII_RATE_BURST
+tokens, and calls made today are counted against CANLII_DAILY_CAP. Because the
+bucket lives in the database, every gunicorn worker draws from the same budget.
+'''
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import ApiQuota
+
+CANLII_QUOTA = "canlii"
+
+
+class RateLimitExceeded(Exception):
+    '''
+    Raised when a call can't be made without exceeding the rate limit or the
+    daily budget.
+    '''
+
+
+def _take_token(name: str) -> tuple[bool, float]:
+    '''
+    Tries to take a token from the bucket. Returns (True, 0) if a token was
+    taken, (False, wait) if the caller should try again after wait seconds,
+    and (False, None) if the daily budget is spent.
+    '''
+    rate = settings.CANLII_RATE_LIMIT
+    burst = settings.CANLII_RATE_BURST
+    daily_cap = settings.CANLII_DAILY_CAP
+
+    with transaction.atomic():
+        quota, _ = ApiQuota.objects.select_for_update().get_or_create(
+            name=name, defaults={"tokens": burst})
+
+        now = timezone.now()
+        today = timezone.localdate(now)
+        elapsed = max((now - quota.updated).total_seconds(), 0)
+        quota.tokens = min(burst, quota.tokens + elapsed * rate)
+        quota.updated = now
+        if quota.day != today:
+            quota.day = today
+            quota.calls_today = 0
+
+        if daily_cap and quota.calls_today >= daily_cap:
+            quota.save()
+            return False, None
+
+        if quota.tokens >= 1:
+            quota.tokens -= 1
+            quota.calls_today += 1
+            quota.calls_made += 1
+            quota.save()
+            return True, 0
+
+        quota.save()
+        return False, (1 - quota.tokens) / rate
+
+
+def acquire(name: str = CANLII_QUOTA, max_wait: float | None = None) -> None:
+    '''
+    Blocks until a call may be made, waiting at most max_wait seconds
+    (CANLII_RATE_MAX_WAIT by default). Raises RateLimitExceeded if the daily
+    budget is spent or if no token becomes available in time.
+    '''
+    if max_wait is None:
+        max_wait = settings.CANLII_RATE_MAX_WAIT
+    deadline = time.monotonic() + max_wait
+    throttled = False
+
+    while True:
+        taken, wait = _take_token(name)
+        if taken:
+            break
+
+        if not throttled:
+            throttled = True
+            ApiQuota.objects.filter(name=name).update(
+                calls_throttled=F("calls_throttled") + 1)
+
+        if wait is None:
+            raise RateLimitExceeded("CanLII daily budget exhausted")
+        if time.monotonic() + wait > deadline:
+            raise RateLimitExceeded("CanLII rate limit exceeded")
+        time.sleep(wait)
+
+
+async def aacquire(name: str = CANLII_QUOTA, max_wait: float | None = None) -> None:
+    '''
+    Async version of acquire, for the ASGI request path. Waits for a token
+    without holding a thread.
+    '''
+    if max_wait is None:
+        max_wait = settings.CANLII_RATE_MAX_WAIT
+    deadline = time.monotonic() + max_wait
+    throttled = False
+    take_token = sync_to_async(_take_token)
+
+    while True:
+        taken, wait = await take_token(name)
+        if taken:
+            break
+
+        if not throttled:
+            throttled = True
+            await ApiQuota.objects.filter(name=name).aupdate(
+                calls_throttled=F("calls_throttled") + 1)
+
+        if wait is None:
+            raise RateLimitExceeded("CanLII daily budget exhausted")
+        if time.monotonic() + wait > deadline:
+            raise RateLimitExceeded("CanLII rate limit exceeded")
+        await asyncio.sleep(wait)
+
+
+def quota_status(name: str = CANLII_QUOTA) -> dict:
+    '''
+    Returns the quota's counters: calls made, calls throttled, calls made
+    today and the budget remaining today (None if there is no daily cap).
+    '''
+    daily_cap = settings.CANLII_DAILY_CAP
+    quota = ApiQuota.objects.filter(name=name).first()
+    today = timezone.localdate()
+
+    calls_today = 0
+    if quota is not None and quota.day == today:
+        calls_today = quota.calls_today
+
+    return {
+        "calls_made": quota.calls_made if quota else 0,
+        "calls_throttled": quota.calls_throttled if quota else 0,
+        "calls_today": calls_today,
+        "remaining_budget": max(daily_cap - calls_today, 0) if daily_cap else None,
+    }
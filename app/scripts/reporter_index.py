@@ -0,0 +1,264 @@
+'''
+Reporter lookup index.
+
+The McGill 9e reporter tables in reporter_data are stored as lists, which makes
+them easy to maintain by hand but slow to search. This module flattens them into
+hash maps once, at import, so that classifying a parallel citation is a single
+dictionary lookup rather than a scan of every reporter in every tier.
+
+When the compiled lookup database is available (see lookup_db.py), lookups are
+read from it instead, and the hash maps are only built if something asks for
+REPORTER_INDEX or NEUTRAL_COURTS directly. Memoized lookups are cleared when a
+database is attached, so that none read before it are kept.
+'''
+import unicodedata
+from functools import lru_cache
+from typing import NamedTuple
+
+from .data.mcgill import reporter_data
+from .lookup_db import get_lookup_db, on_attach
+
+# Reporter tiers, in McGill 9e order of precedence (see McGill 9e 2.2.2)
+OFFICIAL = "official"
+PREFERRED = "preferred"
+AUTHORITATIVE = "authoritative"
+UNOFFICIAL = "unofficial"
+
+TIERS = (OFFICIAL, PREFERRED, AUTHORITATIVE, UNOFFICIAL)
+
+
+class ReporterEntry(NamedTuple):
+    abbreviation: str
+    tier: str
+    name: str
+    jurisdiction: str | None
+
+
+class NeutralCourt(NamedTuple):
+    code: str
+    jurisdiction: str
+    court: str
+    dates: str
+    language: str | None
+    # The first and, for courts that no longer use the code, last month the
+    # court issued neutral citations, as (year, month)
+    start: tuple[int, int]
+    end: tuple[int, int] | None
+
+    def in_force(self, year: int, month: int | None = None) -> bool:
+        '''
+        Checks whether the court issued neutral citations in a given month,
+        or at any time in a given year if no month is given.
+        '''
+        if month is None:
+            return self.start[0] <= year and (self.end is None or year <= self.end[0])
+        return self.start <= (year, month) and (self.end is None or (year, month) <= self.end)
+
+
+class Jurisdiction(NamedTuple):
+    canlii: str
+    en: str
+    fr: str
+    name: str
+
+
+def normalize_abbreviation(abbreviation: str) -> str:
+    '''
+    Normalizes a reporter abbreviation for lookups. Periods are dropped and
+    runs of whitespace are collapsed, so that "Sask. R." and "Sask R" share a
+    key.
+    '''
+    return " ".join(abbreviation.replace(".", "").split())
+
+
+def fold_abbreviation(abbreviation: str) -> str:
+    '''
+    Strips accents and normalizes apostrophes. French reporter names are often
+    pasted without their accents (eg "RC de l'E" for "RC de l'É"), so the index
+    also stores a folded form of every abbreviation.
+    '''
+    abbreviation = abbreviation.replace("’", "'")
+    decomposed = unicodedata.normalize("NFKD", abbreviation)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def parse_month(text: str) -> tuple[int, int]:
+    '''
+    Parses "2001-02" as (2001, 2). A year without a month ("2000-") is read as
+    January.
+    '''
+    year, _, month = text.strip().partition("-")
+    return int(year), int(month or 1)
+
+
+def make_neutral_court(code: str, jurisdiction: str, court: str, dates: str,
+                       language: str | None) -> NeutralCourt:
+    '''
+    Builds a NeutralCourt, parsing its effective dates: "2000-" (since 2000),
+    "2001-02" (since February 2001) or "2003-07 - 2004-11" (from July 2003
+    until November 2004).
+    '''
+    start, _, end = dates.partition(" - ")
+    return NeutralCourt(code, jurisdiction, court, dates, language,
+                        parse_month(start), parse_month(end) if end else None)
+
+
+def decision_month(decision_date: str | None) -> tuple[int, int] | None:
+    '''
+    Reads (year, month) from a CanLII decision date such as "2019-01-15".
+    Returns None if the date can't be read.
+    '''
+    try:
+        return parse_month(decision_date[:7])
+    except (TypeError, ValueError):
+        return None
+
+
+def build_reporter_index() -> dict[str, ReporterEntry]:
+    '''
+    Builds a dictionary mapping every normalized reporter abbreviation, English
+    and French, to its tier and metadata. Some reporters are listed in more
+    than one table (eg "Ex CR" is both official and preferred); the
+    highest-ranked tier wins.
+    '''
+    tiers = (
+        (OFFICIAL, reporter_data.official_reporters),
+        (PREFERRED, reporter_data.preferred_reporters),
+        (AUTHORITATIVE, reporter_data.authoritative_reporters),
+    )
+
+    index = {}
+    for tier, reporters in tiers:
+        for reporter in reporters:
+            abbreviation = reporter[0]
+            jurisdiction = reporter[2] if len(reporter) > 2 else None
+            entry = ReporterEntry(abbreviation, tier, reporter[1], jurisdiction)
+            key = normalize_abbreviation(abbreviation)
+            index.setdefault(key, entry)
+            index.setdefault(fold_abbreviation(key), entry)
+
+    return index
+
+
+def build_neutral_court_index() -> dict[str, tuple[NeutralCourt, ...]]:
+    '''
+    Builds a dictionary mapping every neutral citation court code to the
+    courts that use it. Codes with English and French variants written as a
+    single entry (eg "CF/CFPI") are split into separate keys.
+    '''
+    index = {}
+    for court in reporter_data.neutral_citations_ca:
+        language = court[4] if len(court) > 4 else None
+        for code in court[2].split("/"):
+            entry = make_neutral_court(code, court[0], court[1], court[3], language)
+            index.setdefault(code, []).append(entry)
+
+    return {code: tuple(entries) for code, entries in index.items()}
+
+
+# CanLII abbreviation | en | fr | full name
+JURISDICTIONS = {
+    item[0]: Jurisdiction(*item) for item in (
+        ("BC", "BC", "BC", "British Columbia"),
+        ("AB", "Alta", "Alta", "Alberta"),
+        ("SK", "Sask", "Sask", "Saskatchewan"),
+        ("MB", "Man", "Man", "Manitoba"),
+        ("ON", "Ont", "Ont", "Ontario"),
+        ("QC", "Qc", "Qc", "Quebec"),
+        ("NB", "NB", "N-B", "New Brunswick"),
+        ("NS", "NS", "NS", "Nova Scotia"),
+        ("PE", "PEI", "PEI", "Prince Edward Island"),
+        ("NL", "NL", "Nfld", "Newfoundland and Labrador"),
+        ("YT", "Y", "Y", "Yukon"),
+        ("NT", "NWT", "TN-O", "Northwest Territories"),
+        ("NU", "Nunavut", "Nvt", "Nunavut"),
+    )
+}
+
+@lru_cache(maxsize=None)
+def get_reporter_index() -> dict[str, ReporterEntry]:
+    return build_reporter_index()
+
+
+@lru_cache(maxsize=None)
+def get_neutral_courts() -> dict[str, tuple[NeutralCourt, ...]]:
+    return build_neutral_court_index()
+
+
+def __getattr__(name: str):
+    # REPORTER_INDEX and NEUTRAL_COURTS are built on first use
+    if name == "REPORTER_INDEX":
+        return get_reporter_index()
+    if name == "NEUTRAL_COURTS":
+        return get_neutral_courts()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def find_reporter(key: str) -> ReporterEntry | None:
+    '''
+    Looks up a normalized abbreviation in the lookup database, or in the
+    reporter index if there is no database.
+    '''
+    lookup_db = get_lookup_db()
+    if lookup_db is None:
+        return get_reporter_index().get(key)
+    row = lookup_db.reporter(key)
+    return ReporterEntry(*row) if row is not None else None
+
+
+@lru_cache(maxsize=2048)
+def lookup_reporter(abbreviation: str) -> ReporterEntry | None:
+    '''
+    Returns the index entry for a reporter abbreviation, or None if the
+    reporter isn't listed in McGill 9e. Lookups are memoized, since the same
+    few reporters (and the same unlisted ones, which need the slower folded
+    lookup) come up again and again.
+    '''
+    key = normalize_abbreviation(abbreviation)
+    entry = find_reporter(key)
+    if entry is None:
+        entry = find_reporter(fold_abbreviation(key))
+    return entry
+
+
+def reporter_tier(abbreviation: str) -> str:
+    '''
+    Returns the tier of a reporter abbreviation. Reporters that aren't listed
+    in McGill 9e are unofficial.
+    '''
+    entry = lookup_reporter(abbreviation)
+    if entry is None:
+        return UNOFFICIAL
+    return entry.tier
+
+
+@lru_cache(maxsize=512)
+def lookup_neutral_courts(code: str) -> tuple[NeutralCourt, ...]:
+    '''
+    Returns the courts that use a neutral citation court code, if any.
+    '''
+    lookup_db = get_lookup_db()
+    if lookup_db is None:
+        return get_neutral_courts().get(code, ())
+    return tuple(make_neutral_court(*row) for row in lookup_db.neutral_courts(code))
+
+
+def is_neutral_court(code: str, year: int | None = None, month: int | None = None) -> bool:
+    '''
+    Checks whether a court code is used in neutral citations. If a year, and
+    optionally a month, is given, also checks that a court using the code
+    issued neutral citations at the time.
+    '''
+    courts = lookup_neutral_courts(code)
+    if year is None:
+        return bool(courts)
+    return any(court.in_force(year, month) for court in courts)
+
+
+@on_attach
+def clear_lookups() -> None:
+    '''
+    Forgets memoized lookups, eg when the lookup database is attached.
+    '''
+    lookup_reporter.cache_clear()
+    lookup_neutral_courts.cache_clear()
@@ -0,0 +1,182 @@
+'''
+Resolves batches of CanLII URLs into McGill citations.
+
+A bibliography can contain hundreds of cases, many of them repeated. Rather than
+running the single-citation flow once per URL, the batch is deduplicated by
+canonical key (see api_calls.canonical_key), cached cases are read from the
+citation cache, every other case that is already stored is fetched with a
+single query, and only the misses are fetched from the CanLII API in parallel.
+'''
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from ..models import Citation
+from .api_calls import canonical_key
+from .cache import get_cached_citations, set_cached_citations
+from .fetcher import RETRY_STATUSES, fetch_cases
+from .formatted_cache import format_citation
+from .mcgill_jurisprudence_rules import generate_pinpoint
+from .metrics import API_CALL, DB_LOOKUP, timed
+from .single_flight import fetch_citation
+from .submission_log import log_submission
+
+PINPOINT_TYPES = ("para", "page", "none")
+
+
+def clean_item(item) -> dict:
+    '''
+    Normalizes a batch item. Items can be bare URLs or dictionaries with a
+    url and, optionally, a pinpoint, pinpoint_type and parallel_citations.
+    '''
+    if isinstance(item, str):
+        item = {"url": item}
+
+    pinpoint_type = item.get("pinpoint_type") or "none"
+    if pinpoint_type not in PINPOINT_TYPES:
+        pinpoint_type = "none"
+
+    return {
+        "url": str(item.get("url", "")).strip(),
+        "pinpoint": str(item.get("pinpoint") or "").strip(),
+        "pinpoint_type": pinpoint_type,
+        "parallel_citations": str(item.get("parallel_citations") or "").strip(),
+    }
+
+
+def parse_batch_text(text: str, default_pinpoint_type: str = "para") -> list[dict]:
+    '''
+    Parses the batch form's text box. Each non-empty line holds one case in the
+    form:
+
+        url | pinpoint | parallel citations
+
+    The pinpoint and parallel citations are optional. A pinpoint can be written
+    as "para 12", "page 4" or as a bare number, in which case the form's
+    default pinpoint type is used.
+    '''
+    items = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        fields = [field.strip() for field in line.split("|", 2)]
+        fields += [""] * (3 - len(fields))
+        url, pinpoint, parallel_citations = fields
+
+        pinpoint_type = "none"
+        if pinpoint:
+            pinpoint_split = pinpoint.split()
+            if len(pinpoint_split) == 2 and pinpoint_split[0] in ("para", "page"):
+                pinpoint_type, pinpoint = pinpoint_split
+            else:
+                pinpoint_type = default_pinpoint_type
+
+        items.append(clean_item({
+            "url": url,
+            "pinpoint": pinpoint,
+            "pinpoint_type": pinpoint_type,
+            "parallel_citations": parallel_citations,
+        }))
+    return items
+
+
+def format_item(citation_data: dict, item: dict) -> dict:
+    '''
+    Runs the McGill rules over a case's data for a single batch item. Repeated
+    items reuse the memoized citation (see formatted_cache.py).
+    '''
+    pinpoint_result = generate_pinpoint(item["pinpoint"], item["pinpoint_type"])
+    result, sorted_citations = format_citation(
+        citation_data, item["parallel_citations"], pinpoint_result)
+    return {
+        "url": item["url"],
+        "citation": result[0],
+        "pinpoint_citation": result[1],
+        "sorted_citations": sorted_citations,
+        "error": None,
+        "retryable": False,
+    }
+
+
+def resolve_citations(items: list[dict], ip_address: str | None = None) -> list[dict]:
+    '''
+    Resolves a list of batch items and returns one result per item, in input
+    order. Items are deduplicated by canonical key, so the same case written
+    as different URLs is only looked up once. Known cases are read from the
+    citation cache or, failing that, from the database in one query; unknown
+    cases are fetched concurrently from the CanLII API and saved. Failed items
+    are flagged as retryable if they may succeed later.
+    '''
+    items = [clean_item(item) for item in items]
+
+    # Maps each canonical key to the first URL given for it
+    keys = {}
+    key_urls = {}
+    for item in items:
+        key = keys.setdefault(item["url"], canonical_key(item["url"]))
+        if key is not None:
+            key_urls.setdefault(key, item["url"])
+
+    # Cached cases first, then one query for every other case that is
+    # already stored
+    citation_data = get_cached_citations(list(key_urls))
+    stored_keys = [key for key in key_urls if key not in citation_data]
+    stored_citations = {}
+    with timed(DB_LOOKUP):
+        for citation in Citation.objects.filter(canonical_key__in=stored_keys):
+            stored_citations[citation.canonical_key] = model_to_dict(citation)
+    citation_data.update(stored_citations)
+
+    # Only the misses are sent to the API, in parallel. Misses are fetched
+    # and saved through single_flight, so a case that another request is
+    # already fetching isn't fetched twice.
+    misses = [url for key, url in key_urls.items() if key not in citation_data]
+    with timed(API_CALL):
+        fetch_results = fetch_cases(misses, fetch=fetch_citation)
+    for url, fetch_result in fetch_results.items():
+        if fetch_result.ok:
+            citation_data[keys[url]] = fetch_result.data
+            stored_citations[keys[url]] = fetch_result.data
+
+    set_cached_citations(stored_citations)
+
+    results = []
+    for item in items:
+        key = keys[item["url"]]
+        data = citation_data.get(key)
+        if data is None:
+            if key is None:
+                error = "Invalid CanLII URL"
+                retryable = False
+            else:
+                fetch_result = fetch_results[key_urls[key]]
+                error = fetch_result.error
+                # No response (eg a timeout, or the rate limiter or circuit
+                # breaker turned the call away) or a response worth retrying
+                retryable = fetch_result.status is None or \
+                    fetch_result.status in RETRY_STATUSES
+            results.append({
+                "url": item["url"],
+                "citation": None,
+                "pinpoint_citation": None,
+                "sorted_citations": None,
+                "error": error,
+                "retryable": retryable,
+            })
+            continue
+        results.append(format_item(data, item))
+
+    if ip_address is not None:
+        log_submissions(results, ip_address)
+
+    return results
+
+
+def log_submissions(results: list[dict], ip_address: str) -> None:
+    '''
+    Records a Submission for every successfully resolved batch item. The
+    submissions are buffered and written in the background.
+    '''
+    today = timezone.localdate()
+    for result in results:
+        if result["error"] is None:
+            log_submission(result["url"], ip_address, today)
@@ -0,0 +1,236 @@
+'''
+Single-flight fetching for cases that aren't stored yet.
+
+When several requests miss on the same case at once (eg a class all citing the
+same new SCC decision), only one of them should call CanLII. Within a worker,
+concurrent callers for the same canonical key wait on the first caller's
+result. Across workers, the first caller takes a lock in the shared cache and
+the others wait for the Citation row it saves, polling with backoff. The lock
+expires after CANLII_SINGLE_FLIGHT_TIMEOUT seconds, so if its owner dies, one
+of the waiters takes it over.
+
+afetch_citation does the same for the ASGI request path: coroutines on the
+same event loop share one task, and waits don't hold a thread.
+'''
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.forms.models import model_to_dict
+
+from ..models import Citation
+from .api_calls import canonical_key
+from .cache import citation_cache_key
+from .database_functions import save_citation
+from .fetcher import FetchResult, afetch_case, fetch_case
+from .mcgill_jurisprudence_rules import generate_citation, sort_citations
+
+# How soon a waiting worker first checks whether the leader has finished. The
+# wait doubles after each check, up to POLL_INTERVAL_MAX, so that workers
+# waiting on a slow fetch don't keep querying the database.
+POLL_INTERVAL = 0.05
+POLL_INTERVAL_MAX = 1.0
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+# Tasks in flight, keyed by (event loop, key)
+_async_in_flight = {}
+
+
+def single_flight(key: str, function):
+    '''
+    Calls function() unless another thread in this worker is already calling
+    it for the same key, in which case that call's result is shared.
+    '''
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _in_flight[key] = future
+
+    if not leader:
+        return future.result()
+
+    try:
+        result = function()
+        future.set_result(result)
+        return result
+    except BaseException as error:
+        future.set_exception(error)
+        raise
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+
+
+async def asingle_flight(key: str, function):
+    '''
+    Async version of single_flight: awaits function() unless another
+    coroutine on this event loop is already awaiting it for the same key, in
+    which case that call's result is shared. A caller that is cancelled (eg
+    because its client disconnected) doesn't cancel the shared call.
+    '''
+    flight = (asyncio.get_running_loop(), key)
+    task = _async_in_flight.get(flight)
+    if task is None:
+        task = asyncio.ensure_future(function())
+        _async_in_flight[flight] = task
+        task.add_done_callback(lambda _: _async_in_flight.pop(flight, None))
+    return await asyncio.shield(task)
+
+
+def base_citation(citation_data: dict) -> str:
+    '''
+    Generates the citation stored in Citation.mcgill_citation: the McGill
+    citation without parallel citations or a pinpoint.
+    '''
+    sorted_citations = sort_citations(citation_data, "")
+    return generate_citation(citation_data, sorted_citations, "")[0]
+
+
+def stored_citation(url: str, key: str, started: float) -> FetchResult | None:
+    '''
+    Returns the stored row for a case as a FetchResult, if there is one.
+    '''
+    citation = Citation.objects.filter(canonical_key=key).first()
+    if citation is None:
+        return None
+    return FetchResult(url, model_to_dict(citation), None, None,
+                       time.monotonic() - started)
+
+
+async def astored_citation(url: str, key: str, started: float) -> FetchResult | None:
+    '''
+    Async version of stored_citation.
+    '''
+    citation = await Citation.objects.filter(canonical_key=key).afirst()
+    if citation is None:
+        return None
+    return FetchResult(url, model_to_dict(citation), None, None,
+                       time.monotonic() - started)
+
+
+def fetch_and_save(url: str, key: str) -> FetchResult:
+    '''
+    Fetches a case from CanLII and saves it, making sure only one worker does
+    so at a time. Workers that find the lock taken wait for the row to appear.
+    '''
+    started = time.monotonic()
+    timeout = settings.CANLII_SINGLE_FLIGHT_TIMEOUT
+    lock_key = "single-flight:" + citation_cache_key(key)
+    error_key = "single-flight-error:" + citation_cache_key(key)
+    deadline = started + timeout
+    delay = POLL_INTERVAL
+
+    while True:
+        if cache.add(lock_key, True, timeout=timeout):
+            try:
+                cache.delete(error_key)
+
+                # Another worker may have saved the case since our miss
+                result = stored_citation(url, key, started)
+                if result is not None:
+                    return result
+
+                result = fetch_case(url)
+                if not result.ok:
+                    cache.set(error_key, (result.status, result.error),
+                              timeout=settings.CANLII_NEGATIVE_CACHE_TIMEOUT)
+                    return result
+
+                citation = save_citation(result.data, url, base_citation(result.data))
+                return result._replace(data=model_to_dict(citation))
+            finally:
+                cache.delete(lock_key)
+
+        # Another worker holds the lock; wait for its row or its error
+        time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+        delay = min(delay * 2, POLL_INTERVAL_MAX)
+        result = stored_citation(url, key, started)
+        if result is not None:
+            return result
+        error = cache.get(error_key)
+        if error is not None:
+            status, message = error
+            return FetchResult(url, None, status, message, time.monotonic() - started)
+        if time.monotonic() >= deadline:
+            return FetchResult(url, None, None, "Timed out waiting for CanLII",
+                               time.monotonic() - started)
+
+
+def fetch_citation(url: str) -> FetchResult:
+    '''
+    Fetches and stores a case that isn't in the cache or the database yet.
+    Concurrent calls for the same case, in this worker or in others, share a
+    single CanLII call. On success, data holds the stored Citation row as a
+    dictionary.
+    '''
+    key = canonical_key(url)
+    if key is None:
+        return FetchResult(url, None, None, "Invalid CanLII URL", 0)
+    return single_flight(key, lambda: fetch_and_save(url, key))
+
+
+async def afetch_and_save(url: str, key: str) -> FetchResult:
+    '''
+    Async version of fetch_and_save, sharing its cache lock with synchronous
+    workers.
+    '''
+    started = time.monotonic()
+    timeout = settings.CANLII_SINGLE_FLIGHT_TIMEOUT
+    lock_key = "single-flight:" + citation_cache_key(key)
+    error_key = "single-flight-error:" + citation_cache_key(key)
+    deadline = started + timeout
+    delay = POLL_INTERVAL
+
+    while True:
+        if await cache.aadd(lock_key, True, timeout=timeout):
+            try:
+                await cache.adelete(error_key)
+
+                # Another worker may have saved the case since our miss
+                result = await astored_citation(url, key, started)
+                if result is not None:
+                    return result
+
+                result = await afetch_case(url)
+                if not result.ok:
+                    await cache.aset(error_key, (result.status, result.error),
+                                     timeout=settings.CANLII_NEGATIVE_CACHE_TIMEOUT)
+                    return result
+
+                citation = await sync_to_async(save_citation)(
+                    result.data, url, base_citation(result.data))
+                return result._replace(data=model_to_dict(citation))
+            finally:
+                await cache.adelete(lock_key)
+
+        # Another worker holds the lock; wait for its row or its error
+        await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+        delay = min(delay * 2, POLL_INTERVAL_MAX)
+        result = await astored_citation(url, key, started)
+        if result is not None:
+            return result
+        error = await cache.aget(error_key)
+        if error is not None:
+            status, message = error
+            return FetchResult(url, None, status, message, time.monotonic() - started)
+        if time.monotonic() >= deadline:
+            return FetchResult(url, None, None, "Timed out waiting for CanLII",
+                               time.monotonic() - started)
+
+
+async def afetch_citation(url: str) -> FetchResult:
+    '''
+    Async version of fetch_citation.
+    '''
+    key = canonical_key(url)
+    if key is None:
+        return FetchResult(url, None, None, "Invalid CanLII URL", 0)
+    return await asingle_flight(key, lambda: afetch_and_save(url, key))
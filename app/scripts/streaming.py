@@ -0,0 +1,77 @@
+'''
+Async streaming responses under ASGI.
+
+Django 4.1 iterates a StreamingHttpResponse synchronously on the event loop,
+where the ORM can't run, so a streamed download that reads the database would
+have to read everything before the response starts. AsyncStreamingHttpResponse
+takes an async iterator instead, and StreamingASGIHandler (the handler served by
+citator/asgi.py) sends it with async for, so that each chunk can be read in a
+thread with sync_to_async while the event loop serves other requests. Django
+4.2 supports async iterators in StreamingHttpResponse itself; both can go once
+the project is upgraded.
+'''
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.http import StreamingHttpResponse
+
+
+class AsyncStreamingHttpResponse(StreamingHttpResponse):
+    '''
+    A StreamingHttpResponse whose content is an async iterator. Only
+    StreamingASGIHandler can send it.
+    '''
+    is_async = True
+
+    @property
+    def streaming_content(self):
+        return self._stream()
+
+    @streaming_content.setter
+    def streaming_content(self, value):
+        self._iterator = aiter(value)
+        self._aclose = getattr(value, "aclose", None)
+
+    async def _stream(self):
+        async for part in self._iterator:
+            yield self.make_bytes(part)
+
+    def __iter__(self):
+        raise TypeError("An AsyncStreamingHttpResponse can only be sent under ASGI")
+
+    async def aclose(self):
+        '''
+        Closes the async iterator, eg when the client disconnected before the
+        end of the response.
+        '''
+        if self._aclose is not None:
+            await self._aclose()
+        await sync_to_async(self.close, thread_sensitive=True)()
+
+
+def encode_header(value) -> bytes:
+    return bytes(value.encode("latin1") if isinstance(value, str) else value)
+
+
+class StreamingASGIHandler(ASGIHandler):
+    '''
+    Django's ASGI handler, able to send AsyncStreamingHttpResponse too.
+    '''
+
+    async def send_response(self, response, send):
+        if not getattr(response, "is_async", False):
+            return await super().send_response(response, send)
+
+        headers = [(encode_header(header), encode_header(value))
+                   for header, value in response.items()]
+        headers.extend((b"Set-Cookie", cookie.output(header="").encode("ascii").strip())
+                       for cookie in response.cookies.values())
+        await send({"type": "http.response.start", "status": response.status_code,
+                    "headers": headers})
+        try:
+            async for part in response.streaming_content:
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({"type": "http.response.body", "body": chunk,
+                                "more_body": True})
+            await send({"type": "http.response.body"})
+        finally:
+            await response.aclose()
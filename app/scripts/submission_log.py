@@ -0,0 +1,156 @@
+'''
+Buffered Submission logging.
+
+Writing a Submission row on every request puts a database round trip, and any
+contention on the Submission table, on the request path. Instead, submissions
+are appended to an in-memory buffer and a background thread writes them with
+bulk_create, either every SUBMISSION_FLUSH_INTERVAL seconds or as soon as
+SUBMISSION_BATCH_SIZE are waiting. The buffer is bounded: once it holds
+SUBMISSION_BUFFER_SIZE submissions, the oldest are dropped and counted. Anything
+still buffered is flushed when the worker exits. Each batch also updates the
+daily counts in analytics.py.
+
+If a batch can't be written, its submissions are retried one at a time, so
+that a single bad row can't hold up the rest. Submissions that still fail are
+put back in the buffer, and given up on after SUBMISSION_MAX_ATTEMPTS
+attempts.
+'''
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import date
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from ..models import Submission
+from .analytics import record_submissions
+
+logger = logging.getLogger(__name__)
+
+_buffer = deque(maxlen=settings.SUBMISSION_BUFFER_SIZE)
+_buffer_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wake = threading.Event()
+_flusher = None
+
+# Counters for this worker
+submission_counters = {'logged': 0, 'flushed': 0, 'dropped': 0, 'failed': 0}
+
+URL_MAX_LENGTH = Submission._meta.get_field('url').max_length
+IP_ADDRESS_MAX_LENGTH = Submission._meta.get_field('ip_address').max_length
+
+
+def log_submission(url: str, ip_address: str, day: date | None = None) -> None:
+    '''
+    Queues a Submission to be written by the background flusher. Never
+    touches the database. Query terms and fragments, which don't change the
+    case, are removed from the URL, and anything still too long for the
+    Submission table is cut off.
+    '''
+    url = url.strip().split('?')[0].split('#')[0][:URL_MAX_LENGTH]
+    submission = Submission(url=url, ip_address=ip_address[:IP_ADDRESS_MAX_LENGTH],
+                            date=day or timezone.localdate())
+    with _buffer_lock:
+        if len(_buffer) == _buffer.maxlen:
+            submission_counters['dropped'] += 1
+        # Buffered as [submission, failed attempts]
+        _buffer.append([submission, 0])
+        submission_counters['logged'] += 1
+        pending = len(_buffer)
+
+    _start_flusher()
+    if pending >= settings.SUBMISSION_BATCH_SIZE:
+        _wake.set()
+
+
+def _write(submissions: list[Submission]) -> None:
+    with transaction.atomic():
+        Submission.objects.bulk_create(
+            submissions, batch_size=settings.SUBMISSION_BATCH_SIZE)
+        record_submissions(submissions)
+
+
+def flush_submissions() -> int:
+    '''
+    Writes every buffered submission to the database, along with its daily
+    counts, and returns how many were written. If the batch can't be written,
+    each submission is retried on its own; those that still fail are put back
+    in the buffer to be retried on the next flush, or counted as failed once
+    they have been tried SUBMISSION_MAX_ATTEMPTS times.
+    '''
+    with _flush_lock:
+        with _buffer_lock:
+            entries = list(_buffer)
+            _buffer.clear()
+        if not entries:
+            return 0
+
+        try:
+            _write([submission for submission, _ in entries])
+            written, retry = len(entries), []
+        except Exception:
+            logger.exception("Could not write %d submissions; retrying them one at a time",
+                             len(entries))
+            written, retry = 0, []
+            for entry in entries:
+                try:
+                    _write([entry[0]])
+                    written += 1
+                except Exception as error:
+                    entry[1] += 1
+                    retry.append(entry)
+                    logger.warning("Could not write the submission of %s (attempt %d): %s",
+                                   entry[0].url, entry[1], error)
+
+        with _buffer_lock:
+            submission_counters['flushed'] += written
+            failed = [entry for entry in retry
+                      if entry[1] >= settings.SUBMISSION_MAX_ATTEMPTS]
+            retry = [entry for entry in retry
+                     if entry[1] < settings.SUBMISSION_MAX_ATTEMPTS]
+            submission_counters['failed'] += len(failed)
+            # Newer submissions win if the buffer has filled up since
+            room = _buffer.maxlen - len(_buffer)
+            submission_counters['dropped'] += max(len(retry) - room, 0)
+            _buffer.extendleft(reversed(retry[-room:] if room else []))
+        return written
+
+
+def pending_submissions() -> int:
+    '''
+    Returns the number of submissions waiting to be written.
+    '''
+    return len(_buffer)
+
+
+def _flush_loop() -> None:
+    while True:
+        _wake.wait(settings.SUBMISSION_FLUSH_INTERVAL)
+        _wake.clear()
+        try:
+            flush_submissions()
+        finally:
+            connections.close_all()
+
+
+def _start_flusher() -> None:
+    '''
+    Starts the background flusher the first time a submission is logged in
+    this process. Started lazily so that it is created after gunicorn forks
+    its workers.
+    '''
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _buffer_lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_flush_loop, name="submission-flusher",
+                                    daemon=True)
+        _flusher.start()
+
+
+atexit.register(flush_submissions)
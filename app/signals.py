@@ -0,0 +1,15 @@
+'''
+Keeps the citation cache in step with the Citation table.
+'''
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Citation
+from .scripts.cache import delete_cached_citation
+
+
+@receiver(post_save, sender=Citation)
+@receiver(post_delete, sender=Citation)
+def invalidate_cached_citation(sender, instance, **kwargs):
+    if instance.canonical_key:
+        delete_cached_citation(instance.canonical_key)
@@ -1,3 +1,1323 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import tempfile
+import threading
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+import requests
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DataError
+from django.test import (AsyncClient, AsyncRequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from . import views
+from .models import (ApiQuota, CaseDailyCount, CircuitBreaker, Citation, CitationJob,
+                     CitationJobItem, JurisdictionDailyCount, PrefetchCheckpoint,
+                     StoredCitation, Submission)
+from .scripts import (analytics, api_calls, bibliography, circuit_breaker, fetcher, jobs,
+                      lookup_db, prefetch, rate_limit, reporter_index, single_flight,
+                      submission_log)
+from .scripts.bibliography import (HISTORY_SESSION_KEY, export_bibliography,
+                                   remember_citations, rtf_text)
+from .scripts.cache import (cache_stats, check_stored_citations, citation_cache_key,
+                            get_cached_citation, get_cached_citations, local_cache,
+                            serialize, set_cached_citation)
+from .scripts.citation_transfer import export_citations, import_citations
+from .scripts.data.mcgill import _appendix_data, appendices
+from .scripts.database_functions import citation_attributes
+from .scripts.fetcher import FetchResult
+from .scripts.formatted_cache import format_citation, formatted_cache
+from .scripts.mcgill_jurisprudence_rules import (RULES_VERSION, generate_citation,
+                                                process_parallel_citations, sort_citations,
+                                                verify_court)
+from .scripts.metrics import cache_summary
+from .scripts.streaming import AsyncStreamingHttpResponse, StreamingASGIHandler
+
+URL = "https://www.canlii.org/en/on/onca/doc/2019/2019onca{}/2019onca{}.html"
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_citation(number, **fields):
+    '''
+    Stores a Court of Appeal for Ontario case.
+    '''
+    url = URL.format(number, number)
+    attributes = {
+        "url": url,
+        "canonical_key": f"en/onca/2019onca{number}",
+        "short_url": f"https://canlii.ca/t/{number}",
+        "language": "en",
+        "databaseId": "onca",
+        "case_jurisdiction": "on",
+        "court": "onca",
+        "caseId": f"2019onca{number}",
+        "citation": f"2019 ONCA {number} (CanLII)",
+        "decisionDate": "2019-01-15",
+        "title": f"R. v. Case {number}",
+        "docketNumber": str(number),
+        "keywords": "",
+        "mcgill_citation": f"<em>R v Case {number}</em>, 2019 ONCA {number}",
+    }
+    attributes.update(fields)
+    return Citation.objects.create(**attributes)
+
+
+def case_data(case_id):
+    '''
+    CanLII API metadata for a Court of Appeal for Ontario case.
+    '''
+    return {
+        "url": f"https://canlii.ca/t/{case_id}",
+        "language": "en",
+        "databaseId": "onca",
+        "caseId": {"en": case_id},
+        "citation": f"2019 ONCA {case_id[8:]} (CanLII)",
+        "decisionDate": "2019-01-15",
+        "title": f"R. v. Case {case_id[8:]}",
+        "docketNumber": case_id[8:],
+        "keywords": "criminal law — sentencing",
+    }
+
+
+def canlii_response(status, data=None, headers=None):
+    '''
+    A mocked response from the CanLII API.
+    '''
+    return mock.Mock(status_code=status, headers=headers or {},
+                     **{"json.return_value": data})
+
+
+def resolved(url, error=None, retryable=False):
+    '''
+    A resolve_citations result for url: a citation, or the given error.
+    '''
+    return {
+        "url": url,
+        "citation": None if error else f"<em>R v {url[-9:-5]}</em>",
+        "pinpoint_citation": None if error else f"<em>R v {url[-9:-5]}</em>.",
+        "sorted_citations": None,
+        "error": error,
+        "retryable": retryable,
+    }
+
+
+class CitationFormattingTests(SimpleTestCase):
+    '''
+    Formatted citations for representative cases, pinned so that changes to
+    the parsing and lookup code can't change the output unnoticed.
+    '''
+
+    # CanLII citation, decision date, pasted parallel citations and pinpoint,
+    # then the citation and pinpoint citation
+    GOLDEN = [
+        # Neutral citation, with the official reporter taken from CanLII
+        ("2016 SCC 27 (CanLII), [2016] 1 SCR 631", "2016-07-08", "", " at para 5",
+         "<em>R v Smith</em>, 2016 SCC 27, [2016] 1 SCR 631",
+         "<em>R v Smith</em>, 2016 SCC 27 at para 5, [2016] 1 SCR 631."),
+        ("2019 ONCA 31 (CanLII)", "2019-01-15", "146 OR (3d) 1 — 2019 CarswellOnt 345", "",
+         "<em>R v Smith</em>, 2019 ONCA 31",
+         "<em>R v Smith</em>, 2019 ONCA 31."),
+        # Preferred reporter, ahead of Quicklaw
+        ("1998 CanLII 1234 (ON CA)", "1998-06-01",
+         "(1998), 40 OR (3d) 1 — [1998] OJ No 2345 (QL)", " at 5",
+         "<em>R v Smith</em>, (1998), 40 OR (3d) 1",
+         "<em>R v Smith</em>, (1998), 40 OR (3d) 1 at 5."),
+        # Reported in a different year than it was decided
+        ("1997 CanLII 77 (ON CA)", "1998-01-10", "[1997] OJ No 77 (QL) — 1997 CarswellOnt 88",
+         "", "<em>R v Smith</em> (1998), 1997 CarswellOnt 88",
+         "<em>R v Smith</em> (1998), 1997 CarswellOnt 88."),
+        ("1999 CanLII 13 (QC CA)", "1999-03-02", "", "",
+         "<em>R v Smith</em>, 1999 CanLII 13 (QC CA)",
+         "<em>R v Smith</em>, 1999 CanLII 13 (QC CA)."),
+        # NLSCTD was a neutral citation from July 2003 to November 2004 only
+        ("2003 NLSCTD 120 (CanLII)", "2003-06-10", "", "",
+         "<em>R v Smith</em>, 2003 NLSCTD 120 (CanLII)",
+         "<em>R v Smith</em>, 2003 NLSCTD 120 (CanLII)."),
+        ("2003 NLSCTD 120 (CanLII)", "2003-08-05", "", "",
+         "<em>R v Smith</em>, 2003 NLSCTD 120",
+         "<em>R v Smith</em>, 2003 NLSCTD 120."),
+        ("2004 NLSCTD 200 (CanLII)", "2004-11-30", "", "",
+         "<em>R v Smith</em>, 2004 NLSCTD 200",
+         "<em>R v Smith</em>, 2004 NLSCTD 200."),
+        ("2004 NLSCTD 200 (CanLII)", "2004-12-01", "", "",
+         "<em>R v Smith</em>, 2004 NLSCTD 200 (CanLII)",
+         "<em>R v Smith</em>, 2004 NLSCTD 200 (CanLII)."),
+    ]
+
+    def test_golden_citations(self):
+        for canlii_citation, decided, parallel_citations, pinpoint, *expected in self.GOLDEN:
+            with self.subTest(citation=canlii_citation, decided=decided):
+                citation_data = {"citation": canlii_citation, "decisionDate": decided,
+                                 "title": "R. v. Smith", "language": "en"}
+                sorted_citations = sort_citations(citation_data, parallel_citations)
+                self.assertEqual(
+                    list(generate_citation(citation_data, sorted_citations, pinpoint)),
+                    expected)
+
+    def test_parallel_citations(self):
+        # The (QL) designation is dropped, and so are the periods and the
+        # court in the reporter's name
+        self.assertEqual(
+            process_parallel_citations(
+                "[2016] 1 SCR 631 — 398 DLR (4th) 381 — [2016] OJ No 2345 (QL)"),
+            (["[2016] 1 SCR 631", "398 DLR (4th) 381", "[2016] OJ No 2345"],
+             ["SCR", "DLR (4th)", "OJ"]))
+        self.assertEqual(process_parallel_citations("(1998), 40 O.R. (3d) 1 (C.A.)"),
+                         (["(1998), 40 O.R. (3d) 1 (C.A.)"], ["OR (3d)"]))
+        self.assertEqual(process_parallel_citations(""), ([], []))
+
+    def test_court(self):
+        self.assertEqual(verify_court("1999 CanLII 13 (QC CA)", {"language": "fr"}), "(Qc CA)")
+        self.assertEqual(verify_court("2019 CanLII 5 (SCC)", {"language": "en"}), "(SCC)")
+
+
+class FormattedCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        formatted_cache.clear()
+        self.addCleanup(formatted_cache.clear)
+        self.citation_data = {"citation": "2019 ONCA 31 (CanLII)", "decisionDate": "2019-01-15",
+                              "title": "R. v. Smith", "language": "en",
+                              "canonical_key": "onca/2019onca31"}
+
+    def format(self, citation_data, pinpoint=""):
+        with mock.patch("app.scripts.formatted_cache.generate_citation",
+                        wraps=generate_citation) as generate:
+            (citation, _), _ = format_citation(citation_data, "", pinpoint)
+        return citation, generate.called
+
+    def test_memoized(self):
+        self.assertEqual(self.format(self.citation_data),
+                         ("<em>R v Smith</em>, 2019 ONCA 31", True))
+        self.assertEqual(self.format(dict(self.citation_data)),
+                         ("<em>R v Smith</em>, 2019 ONCA 31", False))
+        # Fields the rules don't read aren't part of the key
+        self.assertFalse(self.format(dict(self.citation_data, docketNumber="C1"))[1])
+
+    def test_changed_inputs_are_regenerated(self):
+        self.format(self.citation_data)
+        self.assertEqual(self.format(dict(self.citation_data, title="R. v. Jones")),
+                         ("<em>R v Jones</em>, 2019 ONCA 31", True))
+        self.assertTrue(self.format(self.citation_data, " at para 5")[1])
+
+    def test_new_rules_version_is_regenerated(self):
+        self.format(self.citation_data)
+        with mock.patch("app.scripts.formatted_cache.RULES_VERSION", RULES_VERSION + 1):
+            self.assertTrue(self.format(self.citation_data)[1])
+
+
+class LookupDBTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = str(Path(directory.name) / "mcgill.sqlite3")
+        lookup_db.build_lookup_db(self.path)
+
+        # Every test starts with no database loaded, and leaves none behind
+        for name, value in (("_lookup_db", None), ("_lookup_db_loaded", False)):
+            patcher = mock.patch.object(lookup_db, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        reporter_index.clear_lookups()
+        self.addCleanup(reporter_index.clear_lookups)
+
+    def test_opened_on_first_use(self):
+        with override_settings(MCGILL_LOOKUP_DB=self.path):
+            database = lookup_db.get_lookup_db()
+            self.assertIs(lookup_db.get_lookup_db(), database)
+        self.assertEqual(database.reporter("SCR"),
+                         ("SCR", "official", "Canada Supreme Court Reports", None))
+        self.assertEqual(reporter_index.lookup_reporter("S.C.R.").tier, reporter_index.OFFICIAL)
+
+    def test_unusable_database_falls_back(self):
+        self.assertIsNone(lookup_db.open_lookup_db(self.path + ".missing"))
+        with mock.patch.object(lookup_db, "source_hash", return_value="other"), \
+                self.assertLogs("app.scripts.lookup_db", "WARNING"):
+            self.assertIsNone(lookup_db.open_lookup_db(self.path))
+
+        with override_settings(MCGILL_LOOKUP_DB=""):
+            self.assertIsNone(lookup_db.get_lookup_db())
+            self.assertEqual(reporter_index.lookup_reporter("S.C.R.").tier,
+                             reporter_index.OFFICIAL)
+
+    def test_attaching_clears_memoized_lookups(self):
+        with override_settings(MCGILL_LOOKUP_DB=""):
+            self.assertIsNone(lookup_db.get_lookup_db())
+            reporter_index.lookup_reporter("S.C.R.")
+            reporter_index.is_neutral_court("ONCA")
+        self.assertEqual(reporter_index.lookup_reporter.cache_info().currsize, 1)
+
+        database = lookup_db.attach_lookup_db(self.path)
+        self.assertIs(lookup_db.get_lookup_db(), database)
+        self.assertEqual(reporter_index.lookup_reporter.cache_info().currsize, 0)
+        self.assertEqual(reporter_index.lookup_neutral_courts.cache_info().currsize, 0)
+        with mock.patch.object(database, "reporter", wraps=database.reporter) as reporter:
+            self.assertEqual(reporter_index.lookup_reporter("S.C.R.").tier,
+                             reporter_index.OFFICIAL)
+        reporter.assert_called_once_with("SCR")
+
+    def test_tables_built_on_first_use(self):
+        reporter_index.get_reporter_index.cache_clear()
+        self.addCleanup(reporter_index.get_reporter_index.cache_clear)
+        with mock.patch.object(reporter_index, "build_reporter_index",
+                               wraps=reporter_index.build_reporter_index) as build:
+            self.assertEqual(reporter_index.REPORTER_INDEX["SCR"].tier, reporter_index.OFFICIAL)
+            self.assertIs(reporter_index.REPORTER_INDEX, reporter_index.get_reporter_index())
+        build.assert_called_once_with()
+        with self.assertRaises(AttributeError):
+            reporter_index.OTHER_INDEX
+
+    def test_appendix_tables_loaded_on_first_use(self):
+        lookup_db.attach_lookup_db(self.path)
+        with mock.patch.dict(vars(appendices)):
+            self.assertNotIn("b2_3_uk_courts", vars(appendices))
+            self.assertEqual(appendices.b2_3_uk_courts, _appendix_data.b2_3_uk_courts)
+            self.assertIn("b2_3_uk_courts", vars(appendices))
+            self.assertEqual(appendices.c2_unofficial_reporters.tolist(),
+                             _appendix_data.c2_unofficial_reporters)
+
+
+class BatchApiTests(TestCase):
+
+    def post_json(self, body):
+        return self.client.post(reverse('api_batch'), json.dumps(body),
+                                content_type='application/json')
+
+    def test_rejects_invalid_lists(self):
+        self.assertEqual(self.post_json({"citations": []}).status_code, 400)
+        self.assertEqual(self.post_json({"citations": [1]}).status_code, 400)
+        response = self.client.post(reverse('api_batch'), "{", content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(BATCH_MAX_ITEMS=1)
+    def test_rejects_long_batches(self):
+        response = self.post_json({"citations": [URL.format(1, 1), URL.format(2, 2)]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("limited to 1 cases", response.json()["error"])
+
+
+@override_settings(CANLII_RATE_LIMIT=2, CANLII_RATE_BURST=2, CANLII_DAILY_CAP=5)
+class RateLimitTests(TestCase):
+
+    def rewind(self, seconds):
+        ApiQuota.objects.update(updated=timezone.now() - timedelta(seconds=seconds))
+
+    def test_burst_then_wait(self):
+        self.assertEqual(rate_limit._take_token("canlii"), (True, 0))
+        self.assertEqual(rate_limit._take_token("canlii"), (True, 0))
+        taken, wait = rate_limit._take_token("canlii")
+        self.assertFalse(taken)
+        self.assertAlmostEqual(wait, 0.5, delta=0.01)
+
+    def test_refills_at_rate_up_to_burst(self):
+        rate_limit._take_token("canlii")
+        rate_limit._take_token("canlii")
+
+        self.rewind(0.5)
+        self.assertEqual(rate_limit._take_token("canlii"), (True, 0))
+        self.assertFalse(rate_limit._take_token("canlii")[0])
+
+        # Ten idle seconds still only refill the burst
+        self.rewind(10)
+        self.assertEqual(rate_limit._take_token("canlii"), (True, 0))
+        self.assertAlmostEqual(ApiQuota.objects.get().tokens, 1, delta=0.01)
+
+    def test_daily_cap(self):
+        for _ in range(5):
+            self.rewind(1)
+            self.assertTrue(rate_limit._take_token("canlii")[0])
+        self.rewind(1)
+        self.assertEqual(rate_limit._take_token("canlii"), (False, None))
+        self.assertEqual(rate_limit.quota_status()["remaining_budget"], 0)
+
+        with self.assertRaisesMessage(rate_limit.RateLimitExceeded, "daily budget"):
+            rate_limit.acquire()
+        self.assertEqual(rate_limit.quota_status()["calls_throttled"], 1)
+
+        ApiQuota.objects.update(day=timezone.localdate() - timedelta(days=1))
+        self.assertEqual(rate_limit._take_token("canlii"), (True, 0))
+
+    def test_acquire_gives_up_after_max_wait(self):
+        rate_limit.acquire()
+        rate_limit.acquire()
+        with self.assertRaisesMessage(rate_limit.RateLimitExceeded, "rate limit"):
+            rate_limit.acquire(max_wait=0.1)
+
+
+@override_settings(CANLII_BREAKER_THRESHOLD=2, CANLII_BREAKER_COOLDOWN=30,
+                   CANLII_BREAKER_TRIAL_TIMEOUT=60)
+class CircuitBreakerTests(TestCase):
+
+    def state(self):
+        return circuit_breaker.breaker_status()["state"]
+
+    def age(self, seconds):
+        CircuitBreaker.objects.update(opened_at=timezone.now() - timedelta(seconds=seconds))
+
+    def open_breaker(self):
+        circuit_breaker.record_failure("CanLII timed out")
+        circuit_breaker.record_failure("CanLII timed out")
+
+    def test_opens_after_threshold(self):
+        self.assertTrue(circuit_breaker.allow_request())
+        circuit_breaker.record_failure("CanLII timed out")
+        self.assertEqual(self.state(), CircuitBreaker.CLOSED)
+        self.assertTrue(circuit_breaker.allow_request())
+
+        circuit_breaker.record_failure("CanLII returned 503")
+        self.assertEqual(circuit_breaker.breaker_status(), {
+            "state": CircuitBreaker.OPEN, "failure_count": 2,
+            "times_opened": 1, "last_error": "CanLII returned 503"})
+        self.assertFalse(circuit_breaker.allow_request())
+
+    def test_success_resets_failure_count(self):
+        circuit_breaker.record_failure("CanLII timed out")
+        circuit_breaker.record_success()
+        circuit_breaker.record_failure("CanLII timed out")
+        self.assertEqual(self.state(), CircuitBreaker.CLOSED)
+
+    def test_single_trial_after_cooldown(self):
+        self.open_breaker()
+        self.age(31)
+
+        self.assertTrue(circuit_breaker.allow_request())
+        self.assertEqual(self.state(), CircuitBreaker.HALF_OPEN)
+        self.assertFalse(circuit_breaker.allow_request())
+        self.assertFalse(circuit_breaker.allow_request())
+
+    def test_trial_success_closes(self):
+        self.open_breaker()
+        self.age(31)
+        circuit_breaker.allow_request()
+
+        circuit_breaker.record_success()
+        self.assertEqual(self.state(), CircuitBreaker.CLOSED)
+        self.assertTrue(circuit_breaker.allow_request())
+
+    def test_trial_failure_reopens(self):
+        self.open_breaker()
+        self.age(31)
+        circuit_breaker.allow_request()
+
+        circuit_breaker.record_failure("CanLII timed out")
+        status = circuit_breaker.breaker_status()
+        self.assertEqual((status["state"], status["times_opened"]), (CircuitBreaker.OPEN, 2))
+        self.assertFalse(circuit_breaker.allow_request())
+
+    def test_lost_trial_is_replaced_after_timeout(self):
+        self.open_breaker()
+        self.age(31)
+        circuit_breaker.allow_request()
+
+        self.age(61)
+        self.assertTrue(circuit_breaker.allow_request())
+        self.assertFalse(circuit_breaker.allow_request())
+
+    def test_released_trial_lets_next_call_through(self):
+        self.open_breaker()
+        self.age(31)
+        started = circuit_breaker.allow_request()
+
+        circuit_breaker.release_trial(started)
+        self.assertEqual(self.state(), CircuitBreaker.OPEN)
+        self.assertTrue(circuit_breaker.allow_request())
+        self.assertFalse(circuit_breaker.allow_request())
+
+    def test_release_ignores_other_calls(self):
+        circuit_breaker.release_trial(circuit_breaker.allow_request())
+        self.open_breaker()
+        self.age(31)
+        circuit_breaker.allow_request()
+
+        # A replaced trial can't release its replacement's slot
+        self.age(61)
+        lost = CircuitBreaker.objects.get().opened_at
+        circuit_breaker.allow_request()
+        circuit_breaker.release_trial(lost)
+        self.assertEqual(self.state(), CircuitBreaker.HALF_OPEN)
+        self.assertFalse(circuit_breaker.allow_request())
+
+    @mock.patch("app.scripts.fetcher.acquire",
+                side_effect=rate_limit.RateLimitExceeded("CanLII rate limit exceeded"))
+    def test_rate_limited_trial_is_released(self, acquire):
+        self.open_breaker()
+        self.age(31)
+
+        result = fetcher.fetch_api(URL.format(1, 1), "https://api.canlii.org/v1/caseBrowse")
+        self.assertEqual(result.error, "CanLII rate limit exceeded")
+        self.assertEqual(self.state(), CircuitBreaker.OPEN)
+        self.assertTrue(circuit_breaker.allow_request())
+
+
+@override_settings(CANLII_FETCH_WORKERS=4, CANLII_MAX_RETRIES=2, CANLII_BACKOFF=0.5,
+                   CANLII_BACKOFF_MAX=5)
+@mock.patch("app.scripts.fetcher.acquire")
+class FetcherTests(TestCase):
+
+    def fetch(self, *responses):
+        session = mock.Mock(**{"get.side_effect": responses})
+        with mock.patch.object(fetcher, "get_session", return_value=session), \
+                mock.patch.object(fetcher.time, "sleep") as sleep:
+            result = fetcher.fetch_case(URL.format(1, 1))
+        return result, session, sleep
+
+    def test_session_is_shared_and_pooled(self, acquire):
+        with mock.patch.object(fetcher, "_session", None):
+            session = fetcher.get_session()
+            self.assertIs(fetcher.get_session(), session)
+        adapter = session.get_adapter("https://api.canlii.org/v1/caseBrowse")
+        self.assertEqual(adapter._pool_maxsize, 4)
+
+    def test_retries_unavailable(self, acquire):
+        result, session, sleep = self.fetch(
+            canlii_response(503), canlii_response(200, case_data("2019onca1")))
+        self.assertTrue(result.ok)
+        self.assertEqual(result.data["caseId"], {"en": "2019onca1"})
+        self.assertEqual((session.get.call_count, acquire.call_count), (2, 2))
+        self.assertTrue(0.25 <= sleep.call_args.args[0] <= 0.5)
+
+    def test_respects_retry_after(self, acquire):
+        result, _, sleep = self.fetch(
+            canlii_response(429, headers={"Retry-After": "3"}),
+            canlii_response(200, case_data("2019onca1")))
+        self.assertTrue(result.ok)
+        sleep.assert_called_once_with(3)
+
+        # Longer than a request can afford: gives up rather than waiting
+        result, session, sleep = self.fetch(
+            canlii_response(429, headers={"Retry-After": "60"}))
+        self.assertEqual((result.status, result.error), (429, "CanLII returned 429"))
+        self.assertEqual(session.get.call_count, 1)
+        sleep.assert_not_called()
+
+    def test_gives_up_after_retries(self, acquire):
+        result, session, _ = self.fetch(requests.Timeout(), requests.Timeout(),
+                                        requests.Timeout())
+        self.assertEqual(result.error, "CanLII timed out")
+        self.assertEqual(session.get.call_count, 3)
+        self.assertEqual(circuit_breaker.breaker_status()["failure_count"], 1)
+
+    def test_client_errors_are_not_retried(self, acquire):
+        result, session, _ = self.fetch(canlii_response(404))
+        self.assertEqual((result.status, result.error), (404, "CanLII returned 404"))
+        self.assertEqual(session.get.call_count, 1)
+
+    def test_fetch_cases_dedupes_in_parallel(self, acquire):
+        urls = [URL.format(1, number) for number in (1, 2, 3, 1, 2)]
+        # Every fetch waits for the other two, so they must run at the same time
+        barrier = threading.Barrier(3, timeout=5)
+
+        def fetch(url):
+            barrier.wait()
+            return FetchResult(url, {}, 200, None, 0)
+
+        results = fetcher.fetch_cases(urls, fetch=fetch)
+        self.assertEqual(list(results), list(dict.fromkeys(urls)))
+        self.assertTrue(all(result.ok for result in results.values()))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StoredCitationTests(TestCase):
+
+    def test_serializes_once(self):
+        url = URL.format(1, 1)
+        self.assertFalse(check_stored_citations(url))
+        serialized = serialize(url, case_data("2019onca1"))
+        self.assertEqual((serialized["style_of_cause"], serialized["canlii_citation"]),
+                         ("R v Case 1", "2019onca1"))
+        self.assertTrue(check_stored_citations(url))
+
+        serialize(url, dict(case_data("2019onca1"), title="R. v. Other"))
+        stored = StoredCitation.objects.get()
+        self.assertEqual(stored.data["style_of_cause"], "R v Case 1")
+
+    def test_fills_in_imported_urls(self):
+        url = URL.format(1, 1)
+        StoredCitation.objects.create(url=url)
+        serialize(url, case_data("2019onca1"))
+        self.assertEqual(StoredCitation.objects.get().data["docket_number"], "1")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CitationCacheTests(TestCase):
+
+    def setUp(self):
+        local_cache.clear()
+
+    def test_both_tiers(self):
+        set_cached_citation("en/onca/2019onca1", {"title": "R. v. Case 1"})
+        self.assertEqual(get_cached_citation("en/onca/2019onca1"), {"title": "R. v. Case 1"})
+
+        # The shared tier refills the local one
+        local_cache.clear()
+        self.assertEqual(get_cached_citations(["en/onca/2019onca1", "en/onca/2019onca2"]),
+                         {"en/onca/2019onca1": {"title": "R. v. Case 1"}})
+
+    def test_stats_follow_lookup_metric(self):
+        before = cache_stats()
+        get_cached_citation("en/onca/2019onca1")
+        set_cached_citation("en/onca/2019onca1", {"title": "R. v. Case 1"})
+        get_cached_citation("en/onca/2019onca1")
+
+        stats = cache_stats()
+        self.assertEqual(
+            [(stats[tier]["hits"] - before[tier]["hits"],
+              stats[tier]["misses"] - before[tier]["misses"]) for tier in ("local", "shared")],
+            [(1, 1), (0, 1)])
+        self.assertEqual(stats["shared"], cache_summary()["shared"])
+        self.assertEqual(stats["local"]["size"], 1)
+
+    def test_save_clears_cached_citation(self):
+        citation = make_citation(1)
+        set_cached_citation(citation.canonical_key, {"title": "R. v. Stale"})
+
+        citation.title = "R. v. Corrected"
+        citation.save()
+        self.assertIsNone(get_cached_citation(citation.canonical_key))
+
+    def test_delete_clears_cached_citation(self):
+        citation = make_citation(1)
+        set_cached_citation(citation.canonical_key, {"title": "R. v. Case 1"})
+
+        citation.delete()
+        self.assertIsNone(get_cached_citation(citation.canonical_key))
+
+
+class CanonicalKeyTests(SimpleTestCase):
+
+    def test_url_forms(self):
+        for url in ("https://www.canlii.org/en/sk/skca/doc/2019/2019skca31/2019skca31.html",
+                    "https://www.canlii.org/en/sk/skca/doc/2019/2019skca31/",
+                    "https://www.canlii.org/en/sk/skca/doc/2019/2019skca31",
+                    "www.canlii.org/en/sk/skca/doc/2019/2019skca31/2019skca31.html#par12",
+                    "canlii.org/en/sk/skca/doc/2019/2019skca31/?resultIndex=1"):
+            with self.subTest(url=url):
+                self.assertEqual(api_calls.case_info(url), ("en", "skca", "2019skca31"))
+                self.assertEqual(api_calls.canonical_key(url), "en/skca/2019skca31")
+                self.assertEqual(api_calls.case_jurisdiction(url), "sk")
+
+    def test_hyphenated_database_id(self):
+        url = "https://www.canlii.org/en/ca/scc/doc/2019/2019scc1/2019scc1.html"
+        self.assertEqual(api_calls.canonical_key(url), "en/csc-scc/2019scc1")
+
+    def test_invalid_urls(self):
+        for url in ("https://canlii.ca/t/j0c5z",
+                    "https://www.canlii.org/en/sk/skca/",
+                    "https://www.canlii.org/en/sk/skca/nav/2019/2019skca31/",
+                    "https://www.canlii.org/en/sk/skca/doc/2019/skca31/"):
+            with self.subTest(url=url):
+                self.assertIsNone(api_calls.canonical_key(url))
+
+    def test_citation_attributes(self):
+        data = dict(case_data("2019skca31"), databaseId="skca")
+        for url in ("https://www.canlii.org/en/sk/skca/doc/2019/2019skca31/",
+                    "https://www.canlii.org/en/sk/skca/doc/2019/2019skca31/2019skca31.html"):
+            with self.subTest(url=url):
+                attributes = citation_attributes(data, url, {})
+                self.assertEqual((attributes["case_jurisdiction"], attributes["court"]),
+                                 ("sk", "skca"))
+
+
+class CanonicalKeyBackfillTests(TestCase):
+
+    migration = importlib.import_module("app.migrations.0022_citation_canonical_key")
+
+    def test_frozen_key_matches(self):
+        for url in (URL.format(1, 1), URL.format(1, 1)[:-len("2019onca1.html")],
+                    "https://www.canlii.org/en/ca/scc/doc/2019/2019scc1/2019scc1.html",
+                    "https://canlii.ca/t/j0c5z", "https://www.canlii.org/en/sk/skca/"):
+            with self.subTest(url=url):
+                self.assertEqual(self.migration.canonical_key(url), api_calls.canonical_key(url))
+
+    def test_duplicates_are_merged(self):
+        original = make_citation(1, canonical_key=None)
+        copy = make_citation(1, canonical_key=None, url=URL.format(1, 1)[:-len("2019onca1.html")],
+                             keywords="criminal law")
+        other = make_citation(2, canonical_key=None)
+        invalid = make_citation(3, canonical_key=None, url="https://canlii.ca/t/3")
+
+        with self.assertLogs(self.migration.logger, "WARNING") as logs:
+            self.migration.set_canonical_keys(apps, None)
+        self.assertIn(str(copy.id), logs.output[0])
+
+        self.assertEqual(dict(Citation.objects.values_list("id", "canonical_key")),
+                         {original.id: "en/onca/2019onca1", other.id: "en/onca/2019onca2",
+                          invalid.id: None})
+        original.refresh_from_db()
+        self.assertEqual((original.url, original.keywords), (URL.format(1, 1), "criminal law"))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, CANLII_SINGLE_FLIGHT_TIMEOUT=10)
+class SingleFlightTests(TestCase):
+
+    url = URL.format(1, 1)
+    lock_key = "single-flight:" + citation_cache_key("en/onca/2019onca1")
+    error_key = "single-flight-error:" + citation_cache_key("en/onca/2019onca1")
+
+    def setUp(self):
+        cache.clear()
+        self.clock = 0.0
+        self.sleeps = []
+
+    def sleep(self, seconds):
+        # Stands in for time.sleep, advancing a fake clock
+        self.sleeps.append(seconds)
+        self.clock += seconds
+
+    def fake_time(self):
+        return mock.patch.multiple(single_flight.time, sleep=self.sleep,
+                                   monotonic=lambda: self.clock)
+
+    def test_threads_share_one_call(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def leader():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "result"
+
+        results = []
+        first = threading.Thread(
+            target=lambda: results.append(single_flight.single_flight("key", leader)))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(
+            target=lambda: results.append(single_flight.single_flight("key", leader)))
+        second.start()
+        release.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertEqual((calls, results), ([1], ["result", "result"]))
+        self.assertEqual(single_flight._in_flight, {})
+
+    def test_waiter_reads_the_leaders_row(self):
+        cache.add(self.lock_key, True, timeout=60)
+
+        def sleep(seconds):
+            # The worker holding the lock saves the case while we wait
+            self.sleep(seconds)
+            if len(self.sleeps) == 3:
+                make_citation(1)
+
+        with mock.patch.object(single_flight, "fetch_case") as fetch_case, \
+                mock.patch.object(single_flight.time, "sleep", sleep):
+            result = single_flight.fetch_and_save(self.url, "en/onca/2019onca1")
+        fetch_case.assert_not_called()
+        self.assertEqual(result.data["title"], "R. v. Case 1")
+
+    def test_waiter_times_out_with_backoff(self):
+        cache.add(self.lock_key, True, timeout=60)
+        with mock.patch.object(single_flight, "fetch_case") as fetch_case, self.fake_time():
+            result = single_flight.fetch_and_save(self.url, "en/onca/2019onca1")
+        fetch_case.assert_not_called()
+        self.assertEqual(result.error, "Timed out waiting for CanLII")
+
+        self.assertEqual(self.sleeps[:7], [0.05, 0.1, 0.2, 0.4, 0.8, 1.0, 1.0])
+        self.assertAlmostEqual(self.clock, 10)
+
+    def test_crashed_leader_releases_lock(self):
+        with mock.patch.object(single_flight, "fetch_case", side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            single_flight.fetch_citation(self.url)
+        self.assertIsNone(cache.get(self.lock_key))
+
+        failed = FetchResult(self.url, None, 503, "CanLII is unavailable", 0)
+        with mock.patch.object(single_flight, "fetch_case", return_value=failed) as fetch_case:
+            self.assertEqual(single_flight.fetch_citation(self.url), failed)
+        fetch_case.assert_called_once()
+
+    def test_expired_lock_is_taken_over(self):
+        # A leader that died without releasing its lock holds it until it
+        # expires; a waiter then fetches the case itself
+        cache.add(self.lock_key, True, timeout=60)
+        failed = FetchResult(self.url, None, 503, "CanLII is unavailable", 0)
+
+        def sleep(seconds):
+            self.sleep(seconds)
+            cache.delete(self.lock_key)
+
+        with mock.patch.object(single_flight, "fetch_case", return_value=failed) as fetch_case, \
+                mock.patch.object(single_flight.time, "sleep", sleep):
+            self.assertEqual(single_flight.fetch_and_save(self.url, "en/onca/2019onca1"),
+                             failed)
+        fetch_case.assert_called_once()
+        self.assertEqual(cache.get(self.error_key), (503, "CanLII is unavailable"))
+
+
+class SubmissionLogTests(TestCase):
+
+    def setUp(self):
+        submission_log._buffer.clear()
+        # Flush by hand rather than from the background thread
+        patcher = mock.patch.object(submission_log, '_start_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(submission_log._buffer.clear)
+
+    def test_buffers_until_flushed(self):
+        submission_log.log_submission(URL.format(1, 1), "127.0.0.1")
+        submission_log.log_submission(URL.format(2, 2), "127.0.0.1")
+        self.assertEqual(submission_log.pending_submissions(), 2)
+        self.assertFalse(Submission.objects.exists())
+
+        self.assertEqual(submission_log.flush_submissions(), 2)
+        self.assertEqual(submission_log.pending_submissions(), 0)
+        self.assertEqual(Submission.objects.count(), 2)
+
+    def test_failed_flush_keeps_submissions(self):
+        submission_log.log_submission(URL.format(1, 1), "127.0.0.1")
+        with mock.patch.object(Submission.objects, 'bulk_create', side_effect=RuntimeError), \
+                self.assertLogs('app.scripts.submission_log', 'ERROR'):
+            self.assertEqual(submission_log.flush_submissions(), 0)
+        self.assertEqual(submission_log.pending_submissions(), 1)
+
+        self.assertEqual(submission_log.flush_submissions(), 1)
+        self.assertEqual(Submission.objects.count(), 1)
+
+    @override_settings(SUBMISSION_MAX_ATTEMPTS=2)
+    def test_bad_row_is_retried_alone(self):
+        bad_url = URL.format(2, 2)
+        bulk_create = Submission.objects.bulk_create
+
+        def reject_bad_row(submissions, **kwargs):
+            if any(submission.url == bad_url for submission in submissions):
+                raise DataError("value too long")
+            return bulk_create(submissions, **kwargs)
+
+        for number in (1, 2, 3):
+            submission_log.log_submission(URL.format(number, number), "127.0.0.1")
+        failed = submission_log.submission_counters['failed']
+        with mock.patch.object(Submission.objects, 'bulk_create', side_effect=reject_bad_row), \
+                self.assertLogs('app.scripts.submission_log', 'WARNING'):
+            self.assertEqual(submission_log.flush_submissions(), 2)
+            self.assertEqual(submission_log.pending_submissions(), 1)
+
+            # Given up on after the second attempt
+            self.assertEqual(submission_log.flush_submissions(), 0)
+            self.assertEqual(submission_log.pending_submissions(), 0)
+        self.assertEqual(submission_log.submission_counters['failed'], failed + 1)
+        self.assertEqual(set(Submission.objects.values_list("url", flat=True)),
+                         {URL.format(1, 1), URL.format(3, 3)})
+
+    def test_urls_are_shortened(self):
+        submission_log.log_submission(f" {URL.format(1, 1)}?resultIndex=1#par12 ", "127.0.0.1")
+        submission_log.log_submission(URL.format(2, 2) + "x" * 300, "127.0.0.1")
+        submission_log.flush_submissions()
+        urls = Submission.objects.values_list("url", flat=True)
+        self.assertEqual(sorted(map(len, urls)), [len(URL.format(1, 1)), 200])
+        self.assertTrue(Submission.objects.filter(url=URL.format(1, 1)).exists())
+
+    @override_settings(SUBMISSION_BATCH_SIZE=2)
+    def test_full_batch_wakes_flusher(self):
+        submission_log._wake.clear()
+        submission_log.log_submission(URL.format(1, 1), "127.0.0.1")
+        self.assertFalse(submission_log._wake.is_set())
+        submission_log.log_submission(URL.format(2, 2), "127.0.0.1")
+        self.assertTrue(submission_log._wake.is_set())
+
+
+class RollupTests(TestCase):
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.submissions = [
+            Submission(url=URL.format(1, 1), ip_address="127.0.0.1", date=self.today),
+            Submission(url=URL.format(1, 1), ip_address="127.0.0.1", date=self.today),
+            Submission(url=URL.format(2, 2), ip_address="127.0.0.1", date=self.today),
+            Submission(url=URL.format(1, 1), ip_address="127.0.0.1",
+                       date=self.today - timedelta(days=100)),
+            Submission(url="https://example.com/", ip_address="127.0.0.1", date=self.today),
+        ]
+        Submission.objects.bulk_create(self.submissions)
+
+    def counts(self):
+        return (set(CaseDailyCount.objects.values_list("day", "canonical_key", "count")),
+                set(JurisdictionDailyCount.objects.values_list("day", "jurisdiction", "count")))
+
+    def test_record_matches_rebuild(self):
+        analytics.record_submissions(self.submissions)
+        recorded = self.counts()
+        self.assertIn((self.today, "en/onca/2019onca1", 2), recorded[0])
+        self.assertIn((self.today, "on", 3), recorded[1])
+
+        self.assertEqual(analytics.rebuild_rollups(), 2)
+        self.assertEqual(self.counts(), recorded)
+
+    def test_compaction_keeps_counts(self):
+        analytics.rebuild_rollups()
+        counts = self.counts()
+
+        deleted = analytics.compact_submissions(self.today - timedelta(days=90), chunk_size=1)
+        self.assertEqual(deleted, 1)
+        # Days whose submissions are gone are left alone by a rebuild
+        analytics.rebuild_rollups()
+        self.assertEqual(self.counts(), counts)
+
+    def test_top_cases(self):
+        make_citation(1)
+        analytics.record_submissions(self.submissions)
+        top = analytics.top_cases(days=30)
+        self.assertEqual([(case["canonical_key"], case["count"]) for case in top],
+                         [("en/onca/2019onca1", 2), ("en/onca/2019onca2", 1)])
+        self.assertTrue(top[0]["citation"])
+        self.assertIsNone(top[1]["citation"])
+
+
+class MetricsAccessTests(TestCase):
+
+    def test_private_by_default(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION="Bearer wrong")
+                         .status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION="Bearer secret")
+                         .status_code, 200)
+
+    def test_staff(self):
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    @override_settings(METRICS_PUBLIC=True)
+    def test_public_opt_in(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+class AsyncUrls:
+    # The URLs with process_text/ served by the async view, as with ASYNC_VIEWS
+    urlpatterns = [
+        path('process_text/', views.aprocess_text, name='process_text'),
+        path('', include('app.urls')),
+    ]
+
+
+@override_settings(ROOT_URLCONF=AsyncUrls, CACHES=LOCMEM_CACHES,
+                   STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class AsyncProcessTextTests(TestCase):
+
+    def setUp(self):
+        local_cache.clear()
+        make_citation(1)
+        patcher = mock.patch.object(submission_log, '_start_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(submission_log._buffer.clear)
+
+    async def post(self, url):
+        # Urlencoded, as browsers send the form; Django 4.1's AsyncClient can't
+        # read multipart bodies
+        body = urlencode({"url": url, "pinpoint": "12", "pinpoint_type": "para",
+                          "parallel_citations": ""})
+        return await AsyncClient().post(reverse('process_text'), body,
+                                        content_type="application/x-www-form-urlencoded")
+
+    async def test_stored_case(self):
+        response = await self.post(URL.format(1, 1))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "<em>R v Case 1</em>, 2019 ONCA 1 at para 12.")
+
+    async def test_unstored_case_is_fetched(self):
+        failed = FetchResult(URL.format(2, 2), None, 503, "CanLII is unavailable", 0)
+        with mock.patch.object(views, "afetch_citation", return_value=failed) as fetch:
+            response = await self.post(URL.format(2, 2))
+        fetch.assert_awaited_once_with(URL.format(2, 2))
+        self.assertContains(response, "Cannot get citation data: CanLII is unavailable")
+
+    async def test_invalid_url(self):
+        response = await self.post("https://example.com/not-canlii")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Invalid CanLII URL")
+
+
+@override_settings(JOB_LEASE=300, JOB_MAX_ATTEMPTS=3, JOB_RETRY_DELAY=30)
+class CitationJobTests(TestCase):
+
+    def setUp(self):
+        self.job = jobs.create_job([URL.format(n, n) for n in range(3)])
+
+    def items(self):
+        return list(self.job.items.order_by('position'))
+
+    def expire_leases(self):
+        CitationJobItem.objects.filter(status=CitationJobItem.RUNNING)\
+            .update(locked_until=timezone.now() - timedelta(seconds=1))
+
+    def test_claim_leases_items_once(self):
+        claimed = jobs.claim_items(2)
+        self.assertEqual([item.position for item in claimed], [0, 1])
+        self.assertTrue(all(item.status == CitationJobItem.RUNNING and
+                            item.attempts == 1 for item in self.items()[:2]))
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, CitationJob.RUNNING)
+        self.assertIsNotNone(self.job.started)
+
+        self.assertEqual([item.position for item in jobs.claim_items(10)], [2])
+        self.assertEqual(jobs.claim_items(10), [])
+
+    def test_run_items_completes_job(self):
+        with mock.patch.object(jobs, 'resolve_citations',
+                               side_effect=lambda items: [resolved(item["url"]) for item in items]):
+            counts = jobs.run_items(jobs.claim_items(10))
+
+        self.assertEqual(counts, {CitationJobItem.DONE: 3})
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, CitationJob.DONE)
+        self.assertIsNotNone(self.job.finished)
+        status = jobs.job_status(self.job)
+        self.assertEqual((status["done"], status["progress"]), (3, 1.0))
+        self.assertTrue(all(result["citation"] for result in jobs.job_results(self.job)))
+
+    def test_retryable_failure_is_requeued_after_delay(self):
+        def resolve(items):
+            return [resolved(items[0]["url"]),
+                    resolved(items[1]["url"], "CanLII returned 503", retryable=True),
+                    resolved(items[2]["url"], "CanLII returned 404")]
+
+        with mock.patch.object(jobs, 'resolve_citations', side_effect=resolve):
+            counts = jobs.run_items(jobs.claim_items(10))
+
+        self.assertEqual(counts, {CitationJobItem.DONE: 1, CitationJobItem.QUEUED: 1,
+                                  CitationJobItem.FAILED: 1})
+        done, queued, failed = self.items()
+        self.assertGreater(queued.available_at, timezone.now())
+        self.assertEqual(failed.error, "CanLII returned 404")
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, CitationJob.RUNNING)
+        # Not ready again until the retry delay has passed
+        self.assertEqual(jobs.claim_items(10), [])
+
+    def test_retryable_failure_gives_up_after_max_attempts(self):
+        CitationJobItem.objects.update(attempts=2)
+        with mock.patch.object(jobs, 'resolve_citations', side_effect=lambda items: [
+                resolved(item["url"], "CanLII timed out", retryable=True) for item in items]):
+            counts = jobs.run_items(jobs.claim_items(10))
+
+        self.assertEqual(counts, {CitationJobItem.FAILED: 3})
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, CitationJob.DONE)
+
+    def test_expired_lease_is_claimed_again(self):
+        jobs.claim_items(1)
+        self.assertEqual([item.position for item in jobs.claim_items(1)], [1])
+
+        self.expire_leases()
+        reclaimed = jobs.claim_items(2)
+        self.assertEqual(sorted(item.position for item in reclaimed), [0, 1])
+        self.assertEqual(sorted(item.attempts for item in reclaimed), [2, 2])
+
+    def test_expired_lease_after_last_attempt_fails(self):
+        CitationJobItem.objects.update(attempts=2)
+        jobs.claim_items(10)
+        self.expire_leases()
+
+        self.assertEqual(jobs.claim_items(10), [])
+        self.assertTrue(all(item.status == CitationJobItem.FAILED
+                            for item in self.items()))
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, CitationJob.DONE)
+
+    def test_worker_survives_a_batch_that_raises(self):
+        with mock.patch.object(jobs, 'resolve_citations', side_effect=RuntimeError), \
+                self.assertLogs('app.scripts.jobs', 'ERROR'):
+            totals = jobs.run_worker(batch_size=10, once=True)
+
+        self.assertEqual(totals, {CitationJobItem.QUEUED: 3})
+        for item in self.items():
+            self.assertEqual((item.status, item.attempts, item.error),
+                             (CitationJobItem.QUEUED, 1, "Internal error"))
+            self.assertIsNone(item.locked_until)
+            self.assertGreater(item.available_at, timezone.now())
+
+    def test_batch_that_keeps_raising_is_failed(self):
+        CitationJobItem.objects.update(attempts=2)
+        with mock.patch.object(jobs, 'resolve_citations', side_effect=RuntimeError), \
+                self.assertLogs('app.scripts.jobs', 'ERROR'):
+            totals = jobs.run_worker(batch_size=10, once=True)
+
+        self.assertEqual(totals, {CitationJobItem.FAILED: 3})
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, CitationJob.DONE)
+
+    def test_worker_stops_when_asked(self):
+        stop = threading.Event()
+        stop.set()
+        self.assertEqual(jobs.run_worker(stop=stop), {})
+        self.assertEqual(len(jobs.claim_items(10)), 3)
+
+    def test_retry_job_requeues_failed_items(self):
+        with mock.patch.object(jobs, 'resolve_citations', side_effect=lambda items: [
+                resolved(item["url"], "CanLII returned 404") for item in items]):
+            jobs.run_items(jobs.claim_items(10))
+
+        self.assertEqual(jobs.retry_job(self.job, [1]), 1)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, CitationJob.QUEUED)
+        item = self.items()[1]
+        self.assertEqual((item.status, item.attempts, item.error),
+                         (CitationJobItem.QUEUED, 0, ""))
+        self.assertEqual(jobs.retry_job(self.job), 2)
+
+
+class CitationJobApiTests(TestCase):
+
+    def post_json(self, path, body):
+        return self.client.post(path, json.dumps(body), content_type='application/json')
+
+    def test_submit_poll_and_retry(self):
+        response = self.post_json(reverse('api_jobs'),
+                                  {"citations": [URL.format(1, 1), "not a url"]})
+        self.assertEqual(response.status_code, 202)
+        submitted = response.json()
+        self.assertEqual((submitted["status"], submitted["total"]), (CitationJob.QUEUED, 2))
+
+        status = self.client.get(submitted["status_url"]).json()
+        self.assertEqual(status["queued"], 2)
+        results = self.client.get(submitted["results_url"]).json()["results"]
+        self.assertEqual([result["position"] for result in results], [0, 1])
+
+        response = self.post_json(reverse('api_job_retry', args=[submitted["id"]]),
+                                  {"positions": "all"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('api_job_retry', args=[submitted["id"]]))
+        self.assertEqual(response.json()["requeued"], 0)
+
+    def test_rejects_invalid_lists(self):
+        self.assertEqual(self.post_json(reverse('api_jobs'), {"citations": []}).status_code, 400)
+        with override_settings(JOB_MAX_ITEMS=1):
+            response = self.post_json(reverse('api_jobs'),
+                                      {"citations": [URL.format(1, 1), URL.format(2, 2)]})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(BATCH_MAX_ITEMS=1)
+    def test_long_batches_point_to_jobs(self):
+        response = self.post_json(reverse('api_batch'),
+                                  {"citations": [URL.format(1, 1), URL.format(2, 2)]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(reverse('api_jobs'), response.json()["error"])
+
+    def test_unknown_job(self):
+        response = self.client.get(reverse('api_job', args=['00000000-0000-0000-0000-000000000000']))
+        self.assertEqual(response.status_code, 404)
+
+
+class PrefetchTests(TestCase):
+
+    def setUp(self):
+        self.case_ids = ["2019onca1", "2019onca2", "2019onca3"]
+        self.unavailable = set()
+        for name, fake in (("fetch_api", self.fetch_api), ("fetch_cases", self.fetch_cases),
+                           ("base_citation", lambda data: f"<em>{data['title']}</em>")):
+            patcher = mock.patch.object(prefetch, name, side_effect=fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fetch_api(self, url, api_url):
+        offset = int(api_url.split("offset=")[1].split("&")[0])
+        count = int(api_url.split("resultCount=")[1].split("&")[0])
+        cases = [{"caseId": {"en": case_id}} for case_id in self.case_ids[offset:offset + count]]
+        return FetchResult(url, {"cases": cases}, 200, None, 0)
+
+    def fetch_cases(self, urls):
+        results = {}
+        for url in urls:
+            case_id = url.split("/")[-2]
+            if case_id in self.unavailable:
+                results[url] = FetchResult(url, None, 503, "CanLII returned 503", 0)
+            else:
+                results[url] = FetchResult(url, case_data(case_id), 200, None, 0)
+        return results
+
+    def test_stores_missing_cases(self):
+        make_citation(2)
+        checkpoint = prefetch.prefetch_database("onca", "on", page_size=2)
+
+        self.assertIsNotNone(checkpoint.finished)
+        self.assertEqual((checkpoint.offset, checkpoint.cases_listed, checkpoint.cases_saved),
+                         (3, 3, 2))
+        self.assertEqual(set(Citation.objects.values_list("canonical_key", flat=True)),
+                         {"en/onca/2019onca1", "en/onca/2019onca2", "en/onca/2019onca3"})
+        self.assertEqual(Citation.objects.get(canonical_key="en/onca/2019onca1").title,
+                         "R. v. Case 1")
+
+    def test_resumes_unfinished_page(self):
+        self.unavailable = {"2019onca2"}
+        with self.assertRaises(prefetch.PrefetchError):
+            prefetch.prefetch_database("onca", "on", page_size=2)
+        checkpoint = PrefetchCheckpoint.objects.get()
+        self.assertEqual((checkpoint.offset, checkpoint.cases_saved), (0, 1))
+        self.assertIsNone(checkpoint.finished)
+
+        self.unavailable = set()
+        checkpoint = prefetch.prefetch_database("onca", "on", page_size=2)
+        self.assertEqual((checkpoint.offset, checkpoint.cases_saved), (3, 3))
+        self.assertIsNotNone(checkpoint.finished)
+        # The case saved before the failure wasn't fetched again
+        fetched = [url for call in prefetch.fetch_cases.call_args_list for url in call.args[0]]
+        self.assertEqual(sum("2019onca1" in url for url in fetched), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CitationTransferTests(TestCase):
+
+    def setUp(self):
+        local_cache.clear()
+
+    def export(self) -> str:
+        f = io.StringIO()
+        export_citations(f, chunk_size=2)
+        return f.getvalue()
+
+    def test_round_trip(self):
+        for number in range(5):
+            make_citation(number, title=f"Québec c. Case {number}")
+        exported = self.export()
+
+        Citation.objects.all().delete()
+        self.assertEqual(import_citations(io.StringIO(exported), chunk_size=2), (5, 0, 0))
+        self.assertEqual(self.export(), exported)
+
+    def test_import_updates_and_skips(self):
+        make_citation(1)
+        lines = [
+            json.dumps({"url": URL.format(1, 1), "title": "R. v. Updated"}),
+            json.dumps({"url": "https://example.com/not-canlii"}),
+        ]
+        self.assertEqual(import_citations(io.StringIO("\n".join(lines))), (1, 1, 0))
+        self.assertEqual(Citation.objects.get(canonical_key="en/onca/2019onca1").title,
+                         "R. v. Updated")
+
+        import_citations(io.StringIO(json.dumps({"url": URL.format(1, 1), "title": "Kept"})),
+                         skip_existing=True)
+        self.assertEqual(Citation.objects.get(canonical_key="en/onca/2019onca1").title,
+                         "R. v. Updated")
+
+    def test_partial_lines_keep_stored_fields(self):
+        make_citation(1, keywords="Criminal law")
+        lines = [
+            json.dumps({"url": URL.format(1, 1), "title": "R. v. Corrected"}),
+            json.dumps({"url": URL.format(1, 1), "docketNumber": "C12345"}),
+        ]
+        self.assertEqual(import_citations(io.StringIO("\n".join(lines))), (1, 0, 0))
+
+        stored = Citation.objects.get(canonical_key="en/onca/2019onca1")
+        self.assertEqual((stored.title, stored.docketNumber, stored.keywords, stored.citation),
+                         ("R. v. Corrected", "C12345", "Criminal law", "2019 ONCA 1 (CanLII)"))
+
+    def test_partial_lines_for_new_cases_are_skipped(self):
+        make_citation(1)
+        full = json.loads(self.export())
+        lines = [
+            json.dumps({"url": URL.format(2, 2), "title": "R. v. New"}),
+            # Partial lines that add up to a full row are kept
+            json.dumps({field: value for field, value in full.items() if field != "title"}),
+            json.dumps({"url": full["url"], "title": full["title"]}),
+        ]
+        for skip_existing in (False, True):
+            with self.subTest(skip_existing=skip_existing):
+                Citation.objects.all().delete()
+                self.assertEqual(import_citations(io.StringIO("\n".join(lines)),
+                                                  skip_existing=skip_existing), (1, 0, 1))
+                self.assertEqual(list(Citation.objects.values_list("canonical_key", "title")),
+                                 [("en/onca/2019onca1", "R. v. Case 1")])
+
+    def test_import_clears_cached_citations(self):
+        citation = make_citation(1)
+        set_cached_citation(citation.canonical_key, {"title": "R. v. Stale"})
+
+        import_citations(io.StringIO(json.dumps(
+            {"url": citation.url, "title": "R. v. Corrected"})))
+        self.assertIsNone(get_cached_citation(citation.canonical_key))
+
+    def test_rejects_invalid_lines(self):
+        with self.assertRaisesMessage(ValueError, "Line 2"):
+            import_citations(io.StringIO('{"url": "x"}\n[1, 2]\n'))
+
+
+class BibliographyTests(TestCase):
+
+    def setUp(self):
+        make_citation(1, title="Smith v. Jones")
+        make_citation(2, title="Attorney General v. Québec")
+
+    def test_history_keeps_latest_cases(self):
+        session = {}
+        remember_citations(session, ["a", "b", None])
+        remember_citations(session, ["c", "a"])
+        self.assertEqual(session[HISTORY_SESSION_KEY], ["b", "c", "a"])
+        with override_settings(BIBLIOGRAPHY_HISTORY_SIZE=2):
+            remember_citations(session, ["d"])
+        self.assertEqual(session[HISTORY_SESSION_KEY], ["a", "d"])
+
+    def test_rtf_text(self):
+        self.assertEqual(rtf_text("<em>Québec {v}</em>, 2019 \\ 𝄞"),
+                         "{\\i Qu\\u233?bec \\{v\\}}, 2019 \\\\ \\u-10188?\\u-8930?")
+
+    def test_formats(self):
+        keys = ["en/onca/2019onca1", "en/onca/2019onca2", "en/onca/2019onca3"]
+        text = "".join(export_bibliography(keys, "txt")).splitlines()
+        # Sorted by style of cause; cases that aren't stored are left out
+        self.assertEqual(len(text), 2)
+        self.assertIn("Attorney General", text[0])
+        self.assertNotIn("<em>", text[0])
+
+        rows = "".join(export_bibliography(keys, "csv")).splitlines()
+        self.assertEqual(rows[0], "citation,title,decision_date,url")
+        self.assertEqual(len(rows), 3)
+
+        rtf = "".join(export_bibliography(keys, "rtf"))
+        self.assertTrue(rtf.startswith("{\\rtf1") and rtf.endswith("}\n"))
+        self.assertEqual(rtf.count("\\par}"), 2)
+
+    def test_view_uses_session_history(self):
+        self.assertEqual(self.client.get(reverse('bibliography')).status_code, 400)
+
+        session = self.client.session
+        session[HISTORY_SESSION_KEY] = ["en/onca/2019onca1"]
+        session.save()
+        response = self.client.get(reverse('bibliography'), {"format": "csv"})
+        self.assertEqual(response["Content-Disposition"],
+                         'attachment; filename="bibliography.csv"')
+        self.assertIn("Smith", b"".join(response.streaming_content).decode())
+
+        response = self.client.get(reverse('bibliography'), {"url": URL.format(2, 2)})
+        self.assertIn("Attorney General", b"".join(response.streaming_content).decode())
+        self.assertEqual(self.client.get(reverse('bibliography'), {"format": "pdf"})
+                         .status_code, 400)
+
+    async def test_asgi_streams_in_chunks(self):
+        request = AsyncRequestFactory().get(
+            reverse('bibliography'), {"url": [URL.format(1, 1), URL.format(2, 2)]})
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        with mock.patch.object(bibliography, "CHUNK_SIZE", 1):
+            response = views.bibliography(request)
+            self.assertIsInstance(response, AsyncStreamingHttpResponse)
+            await StreamingASGIHandler().send_response(response, send)
+
+        start, *body = messages
+        self.assertEqual(start["status"], 200)
+        self.assertIn((b"Content-Disposition", b'attachment; filename="bibliography.txt"'),
+                      start["headers"])
+        # One message per line, then the closing one
+        self.assertEqual(len(body), 3)
+        lines = b"".join(message.get("body", b"") for message in body).decode().splitlines()
+        self.assertEqual([line.split(",")[0] for line in lines],
+                         ["Attorney General v Québec", "Smith v Jones"])
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
@@ -5,6 +6,17 @@ from . import views
 urlpatterns = [
     path('', views.index, name='index'),
     path('changelog/', views.changelog, name='changelog'),
-    path('process_text/', views.process_text, name='process_text'),
+    path('process_text/', views.aprocess_text if settings.ASYNC_VIEWS else views.process_text,
+         name='process_text'),
+    path('batch/', views.process_batch, name='process_batch'),
+    path('bibliography/', views.bibliography, name='bibliography'),
+    path('api/batch/', views.api_batch, name='api_batch'),
+    path('api/jobs/', views.api_jobs, name='api_jobs'),
+    path('api/jobs/<uuid:job_id>/', views.api_job, name='api_job'),
+    path('api/jobs/<uuid:job_id>/results/', views.api_job_results, name='api_job_results'),
+    path('api/jobs/<uuid:job_id>/retry/', views.api_job_retry, name='api_job_retry'),
+    path('cache/stats/', views.citation_cache_stats, name='citation_cache_stats'),
+    path('submissions/stats/', views.submission_stats, name='submission_stats'),
+    path('metrics', views.metrics, name='metrics'),
 ]
 
@@ -1,14 +1,40 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render
 from django.forms.models import model_to_dict
+from django.core.handlers.asgi import ASGIRequest
 from django.http import Http404
 from django.http import HttpResponse
+from django.http import HttpResponseBadRequest
+from django.http import StreamingHttpResponse
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
-from .models import Changelog, Citation, Submission
-from .scripts.mcgill_jurisprudence_rules import generate_citation, generate_pinpoint, sort_citations
-from .scripts.api_calls import call_api_jurisprudence
-from .scripts.database_functions import save_citation
-from datetime import datetime
+from .models import Changelog, Citation, CitationJob
+from .scripts.mcgill_jurisprudence_rules import generate_pinpoint
+from .scripts.analytics import daily_totals, jurisdiction_totals, top_cases
+from .scripts.api_calls import canonical_key
+from .scripts.bibliography import (FORMATS, MAX_CASES, aexport_bibliography, citation_history,
+                                   export_bibliography, remember_citations)
+from .scripts.cache import (aget_cached_citation, aset_cached_citation, cache_stats,
+                            get_cached_citation, set_cached_citation)
+from .scripts.circuit_breaker import breaker_status
+from .scripts.formatted_cache import format_citation
+from .scripts.jobs import create_job, job_results, job_status, retry_job
+from .scripts.metrics import (API_CALL, DB_LOOKUP, TEMPLATE_RENDER, cache_summary,
+                              canlii_summary, export_metrics, stage_summary, timed)
+from .scripts.rate_limit import quota_status
+from .scripts.resolver import parse_batch_text, resolve_citations
+from .scripts.single_flight import afetch_citation, fetch_citation
+from .scripts.streaming import AsyncStreamingHttpResponse
+from .scripts.submission_log import log_submission, pending_submissions, submission_counters
 
 def index(request):
     return render(request, 'app/index.html')
@@ -28,42 +54,364 @@ def process_text(request):
         parallel_citations = request.POST['parallel_citations']
         pinpoint_result = generate_pinpoint(pinpoint_number, pinpoint_type)
 
-        # Check to see if the result is already in the database
+        # The same case can be written as several different URLs; lookups use
+        # the canonical key instead
+        key = canonical_key(url)
+        if key is None:
+            messages.error(request, "Cannot get citation data: Invalid CanLII URL")
+            return render(request, 'app/index.html')
+
+        # Check to see if the result is already cached or in the database
+        citation_data = get_cached_citation(key)
         try:
-            citation_model = Citation.objects.get(url=url)
-            citation_data = model_to_dict(citation_model)
-            sorted_citations = sort_citations(citation_data, parallel_citations)
-            result = generate_citation(citation_data, sorted_citations, pinpoint_result)
-            get_user_info(request)
-            return render(request, 'app/result.html', {'result': result[1], 'sorted_citations': sorted_citations})
+            if citation_data is None:
+                with timed(DB_LOOKUP):
+                    citation_model = Citation.objects.get(canonical_key=key)
+                citation_data = model_to_dict(citation_model)
+                set_cached_citation(key, citation_data)
+            return render_citation(request, citation_data, parallel_citations, pinpoint_result)
 
-        # Call the API if it is not
+        # Call the API if it is not. Concurrent misses on the same case share
+        # one API call, which also saves the citation data to the database
+        # (see single_flight.py)
         except Citation.DoesNotExist:
-            citation_data = call_api_jurisprudence(url)
+            with timed(API_CALL):
+                fetch_result = fetch_citation(url)
+            citation_data = fetch_result.data
             if citation_data is None:
-                messages.error(request, "Cannot get citation data")
+                messages.error(request, f"Cannot get citation data: {fetch_result.error}")
                 return render(request, 'app/index.html')
             else:
-                # Save the citation data to the database
-                sorted_citations = sort_citations(citation_data, parallel_citations)
-                result = generate_citation(citation_data, sorted_citations, pinpoint_result)
-                citation = save_citation(citation_data, url, result[0])
-                get_user_info(request)
-                return render(request, 'app/result.html', {'result': result[1], 'sorted_citations': sorted_citations})
+                set_cached_citation(key, citation_data)
+                return render_citation(request, citation_data, parallel_citations, pinpoint_result)
 
     else:
         return render(request, 'app/index.html')
 
 
+def render_citation(request, citation_data, parallel_citations, pinpoint_result):
+    '''
+    Generates the citation for a single case, or reuses it if the same
+    citation was generated recently (see formatted_cache.py), and renders the
+    result page, timing each stage (see metrics.py).
+    '''
+    result, sorted_citations = format_citation(citation_data, parallel_citations,
+                                               pinpoint_result)
+    get_user_info(request)
+    remember_citations(request.session, [citation_data.get('canonical_key')])
+    with timed(TEMPLATE_RENDER):
+        return render(request, 'app/result.html', {'result': result[1], 'sorted_citations': sorted_citations})
+
+
+async def aprocess_text(request):
+    '''
+    Async version of process_text, served at process_text/ when ASYNC_VIEWS
+    is on. Waits on the cache, the database and CanLII suspend the request
+    instead of holding a worker, so an ASGI worker can have many CanLII calls
+    in flight at once.
+    '''
+    if request.method != 'POST':
+        return await sync_to_async(render)(request, 'app/index.html')
+
+    url = request.POST['url']
+    pinpoint_number = request.POST['pinpoint']
+    pinpoint_type = request.POST['pinpoint_type']
+    parallel_citations = request.POST['parallel_citations']
+    pinpoint_result = generate_pinpoint(pinpoint_number, pinpoint_type)
+
+    key = canonical_key(url)
+    if key is None:
+        messages.error(request, "Cannot get citation data: Invalid CanLII URL")
+        return await sync_to_async(render)(request, 'app/index.html')
+
+    citation_data = await aget_cached_citation(key)
+    if citation_data is None:
+        with timed(DB_LOOKUP):
+            citation_model = await Citation.objects.filter(canonical_key=key).afirst()
+        if citation_model is not None:
+            citation_data = model_to_dict(citation_model)
+        else:
+            with timed(API_CALL):
+                fetch_result = await afetch_citation(url)
+            citation_data = fetch_result.data
+            if citation_data is None:
+                messages.error(request, f"Cannot get citation data: {fetch_result.error}")
+                return await sync_to_async(render)(request, 'app/index.html')
+        await aset_cached_citation(key, citation_data)
+
+    result, sorted_citations = format_citation(citation_data, parallel_citations,
+                                               pinpoint_result)
+    get_user_info(request)
+    await sync_to_async(remember_citations)(request.session,
+                                            [citation_data.get('canonical_key')])
+    # Rendering can touch the session (eg for messages), which is sync-only
+    with timed(TEMPLATE_RENDER):
+        return await sync_to_async(render)(
+            request, 'app/result.html', {'result': result[1], 'sorted_citations': sorted_citations})
+
+
+def process_batch(request):
+    '''
+    Resolves a pasted list of CanLII URLs, one per line, and renders every
+    citation on a single page.
+    '''
+    if request.method == 'POST':
+        items = parse_batch_text(request.POST.get('citations', ''),
+                                 request.POST.get('pinpoint_type', 'para'))
+        if not items:
+            messages.error(request, "Enter at least one CanLII URL")
+            return render(request, 'app/batch.html')
+        if len(items) > settings.BATCH_MAX_ITEMS:
+            messages.error(request, f"Batches are limited to {settings.BATCH_MAX_ITEMS} "
+                                    "cases; split longer lists, or queue them through the API")
+            return render(request, 'app/batch.html')
+
+        results = resolve_citations(items, request.META['REMOTE_ADDR'])
+        remember_citations(request.session, [canonical_key(result['url'])
+                                             for result in results
+                                             if result['error'] is None])
+        with timed(TEMPLATE_RENDER):
+            return render(request, 'app/batch_result.html', {'results': results})
+
+    else:
+        return render(request, 'app/batch.html')
+
+
+def bibliography(request):
+    '''
+    Streams a bibliography as CSV, RTF or plain text (?format=csv, rtf or
+    txt). The cases are the CanLII URLs given as url parameters or, when
+    posted, in the citations field, one per line as in the batch form.
+    Without any, they're the cases cited in this session. See
+    scripts/bibliography.py.
+    '''
+    file_format = request.GET.get('format', 'txt')
+    if file_format not in FORMATS:
+        return HttpResponseBadRequest("The format must be csv, rtf or txt")
+
+    if request.method == 'POST':
+        urls = [item['url'] for item in parse_batch_text(request.POST.get('citations', ''))]
+    else:
+        urls = request.GET.getlist('url')
+    if len(urls) > MAX_CASES:
+        return HttpResponseBadRequest(f"Bibliographies are limited to {MAX_CASES} cases")
+
+    if urls:
+        keys = [key for key in map(canonical_key, urls) if key is not None]
+    else:
+        keys = citation_history(request.session)
+    if not keys:
+        return HttpResponseBadRequest("No cases to export")
+
+    content_type, extension = FORMATS[file_format]
+    if isinstance(request, ASGIRequest):
+        # The ORM can't run on the event loop, where ASGI responses are sent
+        response = AsyncStreamingHttpResponse(aexport_bibliography(keys, file_format),
+                                              content_type=content_type)
+    else:
+        response = StreamingHttpResponse(export_bibliography(keys, file_format),
+                                         content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="bibliography.{extension}"'
+    return response
+
+
+def read_citation_items(request, max_items: int,
+                        too_long: str = "") -> tuple[list | None, JsonResponse | None]:
+    '''
+    Reads the list of citations posted to api_batch or api_jobs. Returns the
+    items, or an error response if the body isn't a valid list of at most
+    max_items citations. too_long is added to the error for longer lists.
+    '''
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return None, JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+    items = body.get('citations') if isinstance(body, dict) else body
+    if not isinstance(items, list) or not items:
+        return None, JsonResponse({'error': 'Expected a list of citations'}, status=400)
+    if len(items) > max_items:
+        return None, JsonResponse(
+            {'error': f'Batches are limited to {max_items} cases{too_long}'}, status=400)
+    if not all(isinstance(item, (str, dict)) for item in items):
+        return None, JsonResponse({'error': 'Invalid citation item'}, status=400)
+    return items, None
+
+
+@csrf_exempt
+@require_POST
+def api_batch(request):
+    '''
+    JSON version of process_batch. Expects a body of the form
+
+        {"citations": [{"url": ..., "pinpoint": ..., "pinpoint_type": ...,
+                        "parallel_citations": ...}, ...]}
+
+    where every key but url is optional and items may also be bare URLs.
+    Returns the formatted citations in input order. Lists longer than
+    BATCH_MAX_ITEMS are rejected; queue them with api_jobs instead.
+    '''
+    items, error = read_citation_items(
+        request, settings.BATCH_MAX_ITEMS,
+        f"; queue longer lists at {request.build_absolute_uri(reverse('api_jobs'))}")
+    if error is not None:
+        return error
+
+    results = resolve_citations(items, request.META['REMOTE_ADDR'])
+    return JsonResponse({'results': [
+        {
+            'url': result['url'],
+            'citation': result['citation'],
+            'pinpoint_citation': result['pinpoint_citation'],
+            'error': result['error'],
+        }
+        for result in results
+    ]})
+
+
+def job_urls(request, job: CitationJob) -> dict:
+    return {
+        'status_url': request.build_absolute_uri(reverse('api_job', args=[job.id])),
+        'results_url': request.build_absolute_uri(reverse('api_job_results', args=[job.id])),
+    }
+
+
+@csrf_exempt
+@require_POST
+def api_jobs(request):
+    '''
+    Queues a list of citations, in the same form as api_batch, to be resolved
+    in the background (see app/scripts/jobs.py). Lists can be longer than a
+    batch. Returns the job's id and the URLs to poll for its progress and
+    results.
+    '''
+    items, error = read_citation_items(request, settings.JOB_MAX_ITEMS)
+    if error is not None:
+        return error
+
+    job = create_job(items, request.META['REMOTE_ADDR'])
+    return JsonResponse({**job_status(job), **job_urls(request, job)}, status=202)
+
+
+def api_job(request, job_id):
+    '''
+    Reports a job's status and progress.
+    '''
+    job = CitationJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return JsonResponse({'error': 'Unknown job'}, status=404)
+    return JsonResponse({**job_status(job), **job_urls(request, job)})
+
+
+def api_job_results(request, job_id):
+    '''
+    Returns a job's citations in input order. Items that haven't finished yet
+    have no citation.
+    '''
+    job = CitationJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return JsonResponse({'error': 'Unknown job'}, status=404)
+    return JsonResponse({'id': str(job.id), 'status': job.status,
+                         'results': job_results(job)})
+
+
+@csrf_exempt
+@require_POST
+def api_job_retry(request, job_id):
+    '''
+    Queues a job's failed items again. The body may give the positions of the
+    items to retry as {"positions": [...]}; by default every failed item is
+    retried.
+    '''
+    job = CitationJob.objects.filter(pk=job_id).first()
+    if job is None:
+        return JsonResponse({'error': 'Unknown job'}, status=404)
+
+    positions = None
+    if request.content_type == 'application/json' and request.body:
+        try:
+            body = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        positions = body.get('positions') if isinstance(body, dict) else None
+        if positions is not None and not (
+                isinstance(positions, list)
+                and all(isinstance(position, int) for position in positions)):
+            return JsonResponse({'error': 'Expected a list of positions'}, status=400)
+
+    requeued = retry_job(job, positions)
+    job.refresh_from_db()
+    return JsonResponse({'requeued': requeued, **job_status(job),
+                         **job_urls(request, job)})
+
+
+@staff_member_required
+def citation_cache_stats(request):
+    '''
+    Reports the citation cache's hit ratio for each tier, from the same
+    counters as /metrics, and the size of this worker's local tier.
+    '''
+    return JsonResponse(cache_stats())
+
+
+@staff_member_required
+def submission_stats(request):
+    '''
+    Reports usage over the last 30 days (or ?days=N) from the daily counts.
+    '''
+    try:
+        days = max(int(request.GET.get('days', 30)), 1)
+    except ValueError:
+        days = 30
+    return JsonResponse({
+        'days': days,
+        'top_cases': top_cases(days),
+        'jurisdictions': jurisdiction_totals(days),
+        'daily': daily_totals(days),
+    })
+
+
+def metrics(request):
+    '''
+    Exports the metrics in metrics.py in the Prometheus text format, to
+    staff and to scrapers that send METRICS_TOKEN as a bearer token. Anyone
+    may read them if METRICS_PUBLIC is set.
+    '''
+    token = settings.METRICS_TOKEN
+    authorized = bool(token) and constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not (settings.METRICS_PUBLIC or authorized or request.user.is_staff):
+        return HttpResponse(status=403)
+    body, content_type = export_metrics()
+    return HttpResponse(body, content_type=content_type)
+
+
+def metrics_dashboard(request):
+    '''
+    Admin page summarizing where request time goes, the citation cache, and
+    the state of the CanLII quota and circuit breaker. Served through
+    admin.site.admin_view, so only staff can see it.
+    '''
+    return render(request, 'admin/metrics.html', {
+        'title': 'Metrics',
+        'stages': stage_summary(),
+        'canlii': canlii_summary(),
+        'cache': cache_summary(),
+        'local_cache': cache_stats()['local'],
+        'quota': quota_status(),
+        'breaker': breaker_status(),
+        'submissions': dict(submission_counters, pending=pending_submissions()),
+    })
+
+
 def get_user_info(request):
     '''
     This function gets and stores information about the user's request using
-    the Submissions class in models.py
+    the Submissions class in models.py. The submission is buffered and written
+    in the background (see submission_log.py).
     '''
     url = request.POST['url']
     ip_address = request.META['REMOTE_ADDR']
-    date = datetime.now()
 
-    submission = Submission(url=url, ip_address=ip_address, date=date)
-    submission.save()
+    log_submission(url, ip_address)
 
@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'citator.settings')
 
-application = get_asgi_application()
+# As get_asgi_application(), with a handler that can also send async streaming
+# responses (see app/scripts/streaming.py)
+django.setup(set_prefix=False)
+
+from app.scripts.streaming import StreamingASGIHandler  # noqa: E402
+
+application = StreamingASGIHandler()
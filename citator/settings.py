@@ -79,6 +79,155 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+
+# The default cache is shared by every worker. It uses a database table out of
+# the box (see `python manage.py createcachetable`); point CACHE_BACKEND and
+# CACHE_LOCATION at Redis or a directory to use those instead.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND',
+                          default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('CACHE_LOCATION', default='citator_cache'),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=60 * 60 * 24, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=50000, cast=int),
+        },
+    }
+}
+
+# Citation cache: an in-process LRU in front of the shared cache. Bump
+# CITATION_CACHE_VERSION to invalidate every cached citation at once.
+CITATION_CACHE_VERSION = config('CITATION_CACHE_VERSION', default=1, cast=int)
+CITATION_CACHE_TIMEOUT = config('CITATION_CACHE_TIMEOUT', default=60 * 60 * 24 * 7, cast=int)
+CITATION_CACHE_LOCAL_SIZE = config('CITATION_CACHE_LOCAL_SIZE', default=1024, cast=int)
+CITATION_CACHE_LOCAL_TIMEOUT = config('CITATION_CACHE_LOCAL_TIMEOUT', default=300, cast=int)
+
+# Formatted citations are memoized in each worker, keyed by the case's data,
+# the parallel citations and the pinpoint (see app/scripts/formatted_cache.py)
+FORMATTED_CACHE_SIZE = config('FORMATTED_CACHE_SIZE', default=4096, cast=int)
+FORMATTED_CACHE_TIMEOUT = config('FORMATTED_CACHE_TIMEOUT', default=60 * 60, cast=int)
+
+# The compiled McGill lookup database, built by the build_lookup_db command
+# (see app/scripts/lookup_db.py). Set to an empty string to use the Python
+# tables instead.
+MCGILL_LOOKUP_DB = config('MCGILL_LOOKUP_DB',
+                          default=str(BASE_DIR / 'app' / 'scripts' / 'data' / 'mcgill' / 'mcgill.sqlite3'))
+
+
+# CanLII API
+
+# Serve process_text with its async view (see app/views.py). Off by default:
+# under an ASGI server, Django runs every other (sync) view one at a time on a
+# single thread per worker. Turn on for a separate ASGI process that only
+# serves process_text/, eg
+# gunicorn citator.asgi:application -k uvicorn.workers.UvicornWorker
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+# Base URL of the CanLII API. Point it at a stand-in server (see the
+# canlii_standin command) to load test without calling CanLII.
+CANLII_API_BASE_URL = config('CANLII_API_BASE_URL', default='https://api.canlii.org/v1')
+
+# Worker pool and timeouts (in seconds) for fetching cases from the CanLII API
+CANLII_FETCH_WORKERS = config('CANLII_FETCH_WORKERS', default=8, cast=int)
+CANLII_CONNECT_TIMEOUT = config('CANLII_CONNECT_TIMEOUT', default=3.05, cast=float)
+CANLII_READ_TIMEOUT = config('CANLII_READ_TIMEOUT', default=10, cast=float)
+
+# Connections each ASGI worker may have open to CanLII at once (see
+# fetcher.afetch_case). Calls beyond this wait for a free connection.
+CANLII_ASYNC_CONNECTIONS = config('CANLII_ASYNC_CONNECTIONS', default=100, cast=int)
+
+# Retries on timeouts, 429 and 5xx responses, with jittered exponential backoff
+CANLII_MAX_RETRIES = config('CANLII_MAX_RETRIES', default=2, cast=int)
+CANLII_BACKOFF = config('CANLII_BACKOFF', default=0.5, cast=float)
+CANLII_BACKOFF_MAX = config('CANLII_BACKOFF_MAX', default=5, cast=float)
+
+# The circuit breaker opens after CANLII_BREAKER_THRESHOLD consecutive failed
+# calls and fails fast for CANLII_BREAKER_COOLDOWN seconds. It then lets a
+# single trial call through, and lets another through if the first hasn't
+# finished within CANLII_BREAKER_TRIAL_TIMEOUT seconds.
+CANLII_BREAKER_THRESHOLD = config('CANLII_BREAKER_THRESHOLD', default=5, cast=int)
+CANLII_BREAKER_COOLDOWN = config('CANLII_BREAKER_COOLDOWN', default=30, cast=float)
+CANLII_BREAKER_TRIAL_TIMEOUT = config('CANLII_BREAKER_TRIAL_TIMEOUT', default=60, cast=float)
+
+# Concurrent misses on the same case share one fetch. Other workers wait up to
+# CANLII_SINGLE_FLIGHT_TIMEOUT seconds for it, and a failed fetch is remembered
+# for CANLII_NEGATIVE_CACHE_TIMEOUT seconds so that waiters don't repeat it.
+CANLII_SINGLE_FLIGHT_TIMEOUT = config('CANLII_SINGLE_FLIGHT_TIMEOUT', default=45, cast=float)
+CANLII_NEGATIVE_CACHE_TIMEOUT = config('CANLII_NEGATIVE_CACHE_TIMEOUT', default=10, cast=int)
+
+# Client-side rate limit (calls per second and burst size) and daily budget,
+# shared by every worker. A call that can't get a token within
+# CANLII_RATE_MAX_WAIT seconds is rejected. A daily cap of 0 disables the cap.
+CANLII_RATE_LIMIT = config('CANLII_RATE_LIMIT', default=2, cast=float)
+CANLII_RATE_BURST = config('CANLII_RATE_BURST', default=2, cast=int)
+CANLII_RATE_MAX_WAIT = config('CANLII_RATE_MAX_WAIT', default=10, cast=float)
+CANLII_DAILY_CAP = config('CANLII_DAILY_CAP', default=5000, cast=int)
+
+
+# Submission logging
+
+# Submissions are buffered in memory and written in batches by a background
+# thread every SUBMISSION_FLUSH_INTERVAL seconds, or sooner once
+# SUBMISSION_BATCH_SIZE are waiting. At most SUBMISSION_BUFFER_SIZE are held;
+# past that, the oldest are dropped.
+SUBMISSION_FLUSH_INTERVAL = config('SUBMISSION_FLUSH_INTERVAL', default=5, cast=float)
+SUBMISSION_BATCH_SIZE = config('SUBMISSION_BATCH_SIZE', default=200, cast=int)
+SUBMISSION_BUFFER_SIZE = config('SUBMISSION_BUFFER_SIZE', default=10000, cast=int)
+
+# A submission that can't be written is retried on later flushes, and counted as
+# failed after this many attempts
+SUBMISSION_MAX_ATTEMPTS = config('SUBMISSION_MAX_ATTEMPTS', default=3, cast=int)
+
+# Raw submissions older than this many days are deleted by compact_submissions;
+# their daily counts are kept
+SUBMISSION_RETENTION_DAYS = config('SUBMISSION_RETENTION_DAYS', default=90, cast=int)
+
+
+# Batches
+
+# Cases a batch (the batch form or api/batch) may hold. Batches are resolved
+# while the request waits, and CanLII is called at CANLII_RATE_LIMIT calls per
+# second, so at the defaults 20 uncached cases take about 10 seconds. Longer
+# lists go to the job queue (api/jobs) instead.
+BATCH_MAX_ITEMS = config('BATCH_MAX_ITEMS', default=20, cast=int)
+
+
+# Bibliographies
+
+# Number of cases remembered in each visitor's session for the bibliography
+# download (see app/scripts/bibliography.py)
+BIBLIOGRAPHY_HISTORY_SIZE = config('BIBLIOGRAPHY_HISTORY_SIZE', default=500, cast=int)
+
+
+# Background jobs (see app/scripts/jobs.py)
+
+# Workers started with the run_citation_jobs command resolve up to
+# JOB_BATCH_SIZE items at a time, and look for new items every
+# JOB_POLL_INTERVAL seconds when the queue is empty. A worker's claim on its
+# items lapses after JOB_LEASE seconds, so the items of a worker that dies are
+# picked up by another. Items that fail for reasons that may pass (eg CanLII
+# being unavailable) are tried up to JOB_MAX_ATTEMPTS times, waiting
+# JOB_RETRY_DELAY seconds longer after each attempt.
+JOB_MAX_ITEMS = config('JOB_MAX_ITEMS', default=5000, cast=int)
+JOB_BATCH_SIZE = config('JOB_BATCH_SIZE', default=20, cast=int)
+JOB_POLL_INTERVAL = config('JOB_POLL_INTERVAL', default=2, cast=float)
+JOB_LEASE = config('JOB_LEASE', default=300, cast=int)
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=3, cast=int)
+JOB_RETRY_DELAY = config('JOB_RETRY_DELAY', default=30, cast=int)
+
+
+# Metrics
+
+# /metrics is served to staff, and to scrapers that send an
+# "Authorization: Bearer <METRICS_TOKEN>" header. Set METRICS_PUBLIC to serve
+# it to anyone. Set PROMETHEUS_MULTIPROC_DIR in the environment to combine
+# every gunicorn worker's metrics (see app/scripts/metrics.py)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_PUBLIC = config('METRICS_PUBLIC', default=False, cast=bool)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
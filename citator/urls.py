@@ -16,7 +16,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from app import views
+
 urlpatterns = [
+    path('admin/metrics/', admin.site.admin_view(views.metrics_dashboard),
+         name='admin_metrics'),
     path('admin/', admin.site.urls),
     path('app/', include('app.urls')),
     path('', include('app.urls')),
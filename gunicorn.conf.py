@@ -0,0 +1,12 @@
+'''
+Gunicorn settings, loaded automatically from the working directory.
+'''
+import os
+
+
+def child_exit(server, worker):
+    # In prometheus_client's multiprocess mode, a dead worker's live gauges
+    # have to be cleaned up (see app/scripts/metrics.py)
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)